@@ -13,102 +13,130 @@
 日期：2024-12-28
 """
 
+import time
 import pygame
 import random
 import sqlite3
+import math
 from pygame.locals import *
 import os
+import sys
 import shutil
 from resource_creator import create_all_resources
-import json
-from sound_creator import create_all_sounds
+from config import Config
+from sound_creator import create_all_sounds, MusicStream
+from frame_capture import FrameDumper, FrameRecorder
+from board import Board, EMPTY
+from camera import Camera
+from array_renderer import ArrayRenderer
+from sprite_cache import SpriteCache, SpriteSet, MIN_CELL
+from scheduler import Scheduler
+from savegame import SaveGameWriter, load_savegame
+from autopilot import Autopilot
+from snake_server import ServerConnection
 from datetime import datetime
+import glob
+import gzip
+import logging
+import logging.handlers
+from collections import Counter, deque
 
 
-class Config:
-    """
-    游戏配置管理类
+class StartupTimer:
+    """记录启动各阶段的耗时，游戏初始化完成后打印一行汇总"""
     
-    负责从配置文件加载并管理所有游戏配置，包括：
-    - 窗口设置
-    - 游戏参数
-    - 界面布局
-    - 颜色定义
-    - 方向常量
-    - 资源路径
-    - 音频设置
-    """
+    def __init__(self):
+        self.phases = []
+        self.last = time.perf_counter()
+        self.reported = False
     
-    @classmethod
-    def load(cls):
-        """从config.json加载配置"""
-        with open('config.json', 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            
-        # 窗口设置
-        cls.WINDOW_WIDTH = config['window']['width']
-        cls.WINDOW_HEIGHT = config['window']['height']
-        cls.GRID_SIZE = config['window']['grid_size']
-        cls.GRID_WIDTH = cls.WINDOW_WIDTH // cls.GRID_SIZE
-        cls.GRID_HEIGHT = cls.WINDOW_HEIGHT // cls.GRID_SIZE
-        cls.WINDOW_TITLE = config['window']['title']
-        
-        # 游戏设置
-        cls.MIN_SPEED = config['game']['min_speed']
-        cls.MAX_SPEED = config['game']['max_speed']
-        cls.DEFAULT_SPEED = config['game']['default_speed']
-        
-        # 颜色定义
-        cls.WHITE = tuple(config['colors']['white'])
-        cls.RED = tuple(config['colors']['red'])
-        cls.GREEN = tuple(config['colors']['green'])
-        cls.BLACK = tuple(config['colors']['black'])
-        cls.DARK_GREEN = tuple(config['colors']['dark_green'])
-        cls.LIGHT_GREEN = tuple(config['colors']['light_green'])
-        cls.DARK_BG = tuple(config['colors']['dark_bg'])
-        cls.GRID_COLOR = tuple(config['colors']['grid_color'])
-        cls.GRAY = tuple(config['colors']['gray'])
-        
-        # 方向常量
-        cls.UP = tuple(config['directions']['up'])
-        cls.DOWN = tuple(config['directions']['down'])
-        cls.LEFT = tuple(config['directions']['left'])
-        cls.RIGHT = tuple(config['directions']['right'])
-        
-        # 资源设置
-        cls.RESOURCE_DIR = config['resources']['directory']
-        cls.DB_NAME = config['resources']['db_name']
-        
-        # UI配置
-        cls.UI = config['ui']
-        
-        # 音频配置
-        cls.AUDIO = config['audio']
-        
-        # 语录配置
-        cls.quotes = config['quotes']
+    def mark(self, name, elapsed_ms=None):
+        """记录从上一次标记到现在的耗时（或直接给出耗时）"""
+        now = time.perf_counter()
+        if elapsed_ms is None:
+            elapsed_ms = (now - self.last) * 1000
+        self.phases.append((name, elapsed_ms))
+        self.last = now
+    
+    def report(self):
+        if self.reported:
+            return
+        self.reported = True
+        total = sum(ms for _, ms in self.phases)
+        details = ' | '.join(f"{name} {ms:.1f}ms" for name, ms in self.phases)
+        print(f"启动耗时 {total:.1f}ms: {details}")
+
+startup_timer = StartupTimer()
 
 # 在程序开始时加载配置
 Config.load()
+startup_timer.mark('配置(缓存)' if Config.load_source == 'cache' else '配置(解析)', Config.load_time_ms)
+
+# 无头模式使用SDL的dummy驱动，必须在pygame.init之前设置
+if Config.HEADLESS_MODE:
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['SDL_AUDIODRIVER'] = 'dummy'
 
 # 初始化游戏
 pygame.init()
+startup_timer.mark('pygame')
+
+# 窗口可以拖动缩放时，格子大小随窗口变化（见Game.resize）
+WINDOW_FLAGS = pygame.RESIZABLE if Config.snapshot.window.resizable else 0
 
-# 初始化显示窗口
-screen = pygame.display.set_mode((Config.WINDOW_WIDTH, Config.WINDOW_HEIGHT))
-pygame.display.set_caption('贪吃蛇')
+# 初始化显示窗口（无头模式下由Game在离屏表面上渲染）
+if not Config.HEADLESS_MODE:
+    screen = pygame.display.set_mode((Config.WINDOW_WIDTH, Config.WINDOW_HEIGHT), WINDOW_FLAGS)
+    pygame.display.set_caption('贪吃蛇')
+
+# 字体缓存：键为配置快照中的FontSpec，同一字体只创建一次
+_font_cache = {}
+
+def get_font(spec):
+    """获取字体（优先使用首选字体，失败时使用备选字体）"""
+    font = _font_cache.get(spec)
+    if font is None:
+        try:
+            font = pygame.font.SysFont(spec.name, spec.size)
+        except:
+            font = pygame.font.SysFont(spec.fallback, spec.size)
+        _font_cache[spec] = font
+    return font
 
 # 设置中文字体
-try:
-    game_font = pygame.font.SysFont(
-        Config.UI['fonts']['default']['name'], 
-        Config.UI['fonts']['sizes']['score']
-    )
-except:
-    game_font = pygame.font.SysFont(
-        Config.UI['fonts']['default']['fallback'], 
-        Config.UI['fonts']['sizes']['score']
-    )
+game_font = get_font(Config.snapshot.hud.score_font)
+
+def make_overlay(size, color, alpha):
+    """创建一个整体半透明的纯色表面"""
+    surface = pygame.Surface(size)
+    surface.fill(color)
+    surface.set_alpha(alpha)
+    return surface
+
+class OverlayCache:
+    """
+    预先合成的静态覆盖层缓存
+    
+    每个覆盖层是一组(表面, 位置)，绘制时用一次blits输出，不再每帧创建表面和渲染文字。
+    键中包含窗口尺寸；依赖的配置段变化时由Config通知清空。
+    """
+    
+    def __init__(self, sections):
+        self.layers = {}
+        Config.subscribe(sections, self.clear)
+    
+    def get(self, key, build):
+        """获取键对应的覆盖层，不存在时调用build()生成"""
+        layers = self.layers.get(key)
+        if layers is None:
+            layers = self.layers[key] = build()
+        return layers
+    
+    def draw(self, screen, key, build):
+        screen.blits(self.get(key, build), doreturn=False)
+    
+    def clear(self, snapshot=None):
+        self.layers.clear()
 
 # 在初始化部分添加图片加载
 def load_image(name, size=None):
@@ -129,8 +157,18 @@ class ScoreDB:
     - 分数保存
     - 排行榜查询
     - 数据库初始化
+    - 玩家档案和统计（最高分、局数、平均分、分位数、每日最佳）
+    
+    统计表由scores表上的触发器在每次插入时增量维护，查询统计不需要扫描scores表：
+    - players: 玩家档案（首次出现的时间）
+    - player_stats: 每个玩家的局数、总分、最高分及其时间、最后一局的时间
+    - daily_best: 每个玩家每天的最高分
+    - score_histogram: 每个玩家每个分数出现的次数，用于计算分位数
+    统计只随插入累加，从scores表中删除或归档旧记录不会改变历史统计。
     """
     
+    SCHEMA_VERSION = 1
+    
     def __init__(self):
         """初始化数据库连接"""
         self.db_name = Config.DB_NAME
@@ -142,9 +180,90 @@ class ScoreDB:
             # 使用TEXT类型存储时间字符串
             c.execute('''CREATE TABLE IF NOT EXISTS scores
                      (player_name TEXT, score INTEGER, date TEXT)''')
+            version = c.execute("PRAGMA user_version").fetchone()[0]
+            if version < 1:
+                self._create_stats_tables(c)
+            c.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
             conn.commit()
     
-    def save_score(self, score):
+    def _create_stats_tables(self, c):
+        """创建统计表和维护它们的触发器，并用已有的分数记录回填一次"""
+        c.executescript("""
+            CREATE TABLE IF NOT EXISTS players (
+                name TEXT PRIMARY KEY,
+                created TEXT
+            );
+            CREATE TABLE IF NOT EXISTS player_stats (
+                player_name TEXT PRIMARY KEY,
+                games INTEGER NOT NULL DEFAULT 0,
+                total INTEGER NOT NULL DEFAULT 0,
+                best INTEGER NOT NULL DEFAULT 0,
+                best_date TEXT,
+                last_date TEXT
+            );
+            CREATE TABLE IF NOT EXISTS daily_best (
+                day TEXT,
+                player_name TEXT,
+                score INTEGER,
+                date TEXT,
+                PRIMARY KEY (day, player_name)
+            );
+            CREATE TABLE IF NOT EXISTS score_histogram (
+                player_name TEXT,
+                score INTEGER,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (player_name, score)
+            );
+            CREATE INDEX IF NOT EXISTS player_stats_best ON player_stats (best DESC);
+            
+            -- 旧版本SQLite不支持UPSERT，用 INSERT OR IGNORE + UPDATE 实现
+            CREATE TRIGGER IF NOT EXISTS scores_update_stats AFTER INSERT ON scores
+            BEGIN
+                INSERT OR IGNORE INTO players (name, created)
+                VALUES (NEW.player_name, NEW.date);
+                
+                INSERT OR IGNORE INTO player_stats (player_name) VALUES (NEW.player_name);
+                UPDATE player_stats SET
+                    games = games + 1,
+                    total = total + NEW.score,
+                    best_date = CASE WHEN games = 0 OR NEW.score > best
+                                     THEN NEW.date ELSE best_date END,
+                    best = MAX(best, NEW.score),
+                    last_date = NEW.date
+                WHERE player_name = NEW.player_name;
+                
+                INSERT OR IGNORE INTO daily_best (day, player_name, score, date)
+                VALUES (substr(NEW.date, 1, 10), NEW.player_name, NEW.score, NEW.date);
+                UPDATE daily_best SET score = NEW.score, date = NEW.date
+                WHERE day = substr(NEW.date, 1, 10) AND player_name = NEW.player_name
+                      AND score < NEW.score;
+                
+                INSERT OR IGNORE INTO score_histogram (player_name, score)
+                VALUES (NEW.player_name, NEW.score);
+                UPDATE score_histogram SET count = count + 1
+                WHERE player_name = NEW.player_name AND score = NEW.score;
+            END;
+            
+            INSERT OR IGNORE INTO players (name, created)
+            SELECT player_name, MIN(date) FROM scores GROUP BY player_name;
+            
+            INSERT OR IGNORE INTO player_stats (player_name, games, total, best, last_date)
+            SELECT player_name, COUNT(*), SUM(score), MAX(score), MAX(date)
+            FROM scores GROUP BY player_name;
+            UPDATE player_stats SET best_date = (
+                SELECT MIN(date) FROM scores
+                WHERE player_name = player_stats.player_name AND score = player_stats.best);
+            
+            -- 只有一个MAX聚合时，SQLite的裸列取自最大值所在的那一行
+            INSERT OR IGNORE INTO daily_best (day, player_name, score, date)
+            SELECT substr(date, 1, 10), player_name, MAX(score), date
+            FROM scores GROUP BY substr(date, 1, 10), player_name;
+            
+            INSERT OR IGNORE INTO score_histogram (player_name, score, count)
+            SELECT player_name, score, COUNT(*) FROM scores GROUP BY player_name, score;
+        """)
+    
+    def save_score(self, score, player_name="Player"):
         with sqlite3.connect(self.db_name) as conn:
             c = conn.cursor()
             # 使用本地时间
@@ -152,7 +271,7 @@ class ScoreDB:
             c.execute("""
                 INSERT INTO scores (player_name, score, date) 
                 VALUES (?, ?, ?)
-            """, ("Player", score, current_time))
+            """, (player_name, score, current_time))
             conn.commit()
     
     def get_leaderboard(self):
@@ -166,6 +285,72 @@ class ScoreDB:
             """)
             return c.fetchall()
     
+    def get_score_rank(self, score):
+        """获取指定分数在排行榜中的名次"""
+        with sqlite3.connect(self.db_name) as conn:
+            c = conn.cursor()
+            c.execute("SELECT COUNT(*) + 1 FROM scores WHERE score > ?", (score,))
+            return c.fetchone()[0]
+    
+    def get_player_stats(self, player_name):
+        """
+        获取一个玩家的统计
+        
+        Returns:
+            dict: 局数、最高分及其时间、平均分、中位数、P90、最后一局的时间；没有记录时返回None
+        """
+        with sqlite3.connect(self.db_name) as conn:
+            c = conn.cursor()
+            c.execute("""
+                SELECT player_name, games, total, best, best_date, last_date
+                FROM player_stats WHERE player_name = ?
+            """, (player_name,))
+            row = c.fetchone()
+            return self._stats_from_row(c, row) if row else None
+    
+    def get_all_player_stats(self, limit=10):
+        """按最高分从高到低获取前limit个玩家的统计"""
+        with sqlite3.connect(self.db_name) as conn:
+            c = conn.cursor()
+            c.execute("""
+                SELECT player_name, games, total, best, best_date, last_date
+                FROM player_stats
+                ORDER BY best DESC
+                LIMIT ?
+            """, (limit,))
+            return [self._stats_from_row(c, row) for row in c.fetchall()]
+    
+    def _stats_from_row(self, c, row):
+        name, games, total, best, best_date, last_date = row
+        c.execute("""
+            SELECT score, count FROM score_histogram
+            WHERE player_name = ? ORDER BY score
+        """, (name,))
+        median, p90 = histogram_percentiles(c.fetchall(), games, (0.5, 0.9))
+        return {
+            'name': name,
+            'games': games,
+            'best': best,
+            'best_date': best_date,
+            'mean': total / games if games else 0,
+            'median': median,
+            'p90': p90,
+            'last_date': last_date,
+        }
+    
+    def get_daily_best(self, days=7):
+        """获取最近days天每天的最高分，返回[(日期, 玩家名, 分数), ...]，日期从近到远"""
+        with sqlite3.connect(self.db_name) as conn:
+            c = conn.cursor()
+            c.execute("""
+                SELECT day, player_name, MAX(score)
+                FROM daily_best
+                GROUP BY day
+                ORDER BY day DESC
+                LIMIT ?
+            """, (days,))
+            return c.fetchall()
+    
     def get_last_score_rank(self):
         """获取最后一次得分的排名"""
         with sqlite3.connect(self.db_name) as conn:
@@ -183,6 +368,28 @@ class ScoreDB:
                 return last_score[0], c.fetchone()[0]
         return None, None
 
+def histogram_percentiles(histogram, count, fractions):
+    """
+    从分数直方图计算分位数（最近秩法）
+    
+    Args:
+        histogram: 按分数升序排列的[(分数, 次数), ...]
+        count: 总次数
+        fractions: 升序排列的分位，如(0.5, 0.9)
+    Returns:
+        list: 与fractions对应的分数，没有数据时为0
+    """
+    results = []
+    pending = iter(fractions)
+    fraction = next(pending, None)
+    cumulative = 0
+    for score, times in histogram:
+        cumulative += times
+        while fraction is not None and cumulative >= max(1, math.ceil(fraction * count)):
+            results.append(score)
+            fraction = next(pending, None)
+    return results + [0] * (len(fractions) - len(results))
+
 class ResourceManager:
     """
     游戏资源管理类（单例模式）
@@ -192,6 +399,9 @@ class ResourceManager:
     - 蛇头图片（四个方向）
     - 蛇身图片
     - 食物图片
+    
+    窗口缩放后按新的格子大小切换精灵：新的一套精灵在后台生成（见sprite_cache），
+    就绪之前继续使用当前的精灵和格子大小（cell）绘制。
     """
     
     _instance = None
@@ -211,6 +421,11 @@ class ResourceManager:
         self.snake_head_images = {}
         self.snake_body_image = None
         self.food_image = None
+        self.cell = Config.GRID_SIZE  # 当前精灵的格子大小
+        self.body_offset = 2  # 蛇身在格子内的偏移
+        # 每种格子大小缓存一套精灵和一张背景
+        self.cache = SpriteCache(Config, 2 * Config.snapshot.window.sprite_cache_size)
+        self.target = None  # 等待切换到的 (窗口大小, 格子大小)
         self.init_resources()
     
     def init_resources(self):
@@ -245,9 +460,41 @@ class ResourceManager:
         }
         self.snake_body_image = load_image("body.png", (Config.GRID_SIZE-4, Config.GRID_SIZE-4))
         self.food_image = load_image("food.png", (Config.GRID_SIZE, Config.GRID_SIZE))
+        # 配置的窗口大小下的精灵直接放入缓存，窗口缩放回来时不需要重新生成
+        if self.background_image and self.food_image and all(self.snake_head_images.values()):
+            self.cache.put(('sprites', self.cell),
+                           SpriteSet(self.cell, self.snake_head_images, self.snake_body_image,
+                                     self.body_offset, self.food_image))
+            self.cache.put(('background', (Config.WINDOW_WIDTH, Config.WINDOW_HEIGHT), self.cell),
+                           self.background_image)
+    
+    def request_size(self, size, cell):
+        """请求切换到窗口大小size、格子大小cell的精灵和背景，缓存中没有时在后台生成"""
+        self.target = (size, cell)
+        self.cache.request(('sprites', cell))
+        self.cache.request(('background', size, cell))
+    
+    def poll(self):
+        """请求的精灵和背景都已就绪时切换过去，返回是否发生了切换"""
+        if self.target is None:
+            return False
+        size, cell = self.target
+        sprites = self.cache.get(('sprites', cell))
+        background = self.cache.get(('background', size, cell))
+        if sprites is None or background is None:
+            return False
+        self.target = None
+        self.cell = cell
+        self.snake_head_images = sprites.heads
+        self.snake_body_image = sprites.body
+        self.body_offset = sprites.body_offset
+        self.food_image = sprites.food
+        self.background_image = background
+        return True
 
 # 创建全局资源管理器实例
 resource_manager = ResourceManager.get_instance()
+startup_timer.mark('资源')
 
 class Snake:
     """
@@ -258,15 +505,32 @@ class Snake:
     - 碰撞检测
     - 生长机制
     - 图形渲染
+    
+    蛇身同时登记在棋盘占用表中（编号为owner），碰撞检测只需查一次表。
     """
     
-    def __init__(self):
-        """初始化蛇的属性"""
+    def __init__(self, board=None, owner=1, start=None, name="Player"):
+        """初始化蛇的属性
+        
+        Args:
+            board: 共享的棋盘占用表，None表示单独创建一个
+            owner: 在占用表中的编号（多条蛇时各不相同）
+            start: 出生位置，None表示棋盘中央
+            name: 玩家名，用于保存分数
+        """
+        self.board = board or Board(Config.GRID_WIDTH, Config.GRID_HEIGHT)
+        self.owner = owner
+        self.start = start or (self.board.width // 2, self.board.height // 2)
+        self.name = name
+        self.positions = deque()
         self.reset()
         
     def reset(self):
+        self.remove_from_board()
         self.length = 1
-        self.positions = [(Config.GRID_WIDTH // 2, Config.GRID_HEIGHT // 2)]
+        self.positions = deque([self.start])
+        self.moves = 0  # 这一局走过的步数（存档时据此只取出新增的蛇头）
+        self.board.occupy(self.positions[0], self.owner)
         self.direction = random.choice([Config.UP, Config.DOWN, Config.LEFT, Config.RIGHT])
         self.color = Config.GREEN
         self.score = 0
@@ -276,58 +540,85 @@ class Snake:
     def get_head_position(self):
         return self.positions[0]
 
-    def update(self):
-        """
-        更新蛇的位置状态
-        
-        实现了以下功能：
-        1. 保存当前方向，用于防止180度转向
-        2. 计算新的头部位置，支持穿墙
-        3. 检测是否撞到自己
-        4. 更新蛇身位置
-        
-        Returns:
-            bool: True表示移动成功，False表示游戏结束
-        """
-        self.last_direction = self.direction
-        
-        # 获取移动前头部位置
+    def next_position(self):
+        """按当前方向计算下一步的头部位置（使用取模运算实现穿墙）"""
         cur = self.get_head_position()
         x, y = self.direction
-        # 使用取模运算实现穿墙
-        new = ((cur[0] + x) % Config.GRID_WIDTH, (cur[1] + y) % Config.GRID_HEIGHT)
-        
-        # 检查是否撞到自己（从第三个身体节点开始检查，因为不可能撞到紧跟头部的两个节点）
-        if new in self.positions[2:]:
-            return False
-            
-        # 在头部插入新位置，如果长度超出则删除尾部
-        self.positions.insert(0, new)
-        if len(self.positions) > self.length:
-            self.positions.pop()
-        return True
+        return ((cur[0] + x) % self.board.width, (cur[1] + y) % self.board.height)
+    
+    def advance(self, new):
+        """移动到new：如果长度超出则删除尾部，再在头部插入新位置"""
+        if len(self.positions) >= self.length:
+            self.board.release(self.positions.pop(), self.owner)
+        self.positions.appendleft(new)
+        self.board.occupy(new, self.owner)
+        self.moves += 1
+    
+    def remove_from_board(self):
+        """从占用表中清除整条蛇（死亡后其他蛇可以穿过原来的位置）"""
+        for p in self.positions:
+            self.board.release(p, self.owner)
 
     def draw(self, surface):
-        resources = ResourceManager.get_instance()
-        for i, p in enumerate(self.positions):
-            if i == 0:  # 蛇头
-                head_image = resources.snake_head_images.get(self.direction)
-                if head_image:
-                    surface.blit(head_image, 
-                               (p[0] * Config.GRID_SIZE, p[1] * Config.GRID_SIZE))
-            else:  # 蛇身
-                if resources.snake_body_image:
-                    surface.blit(resources.snake_body_image, 
-                               (p[0] * Config.GRID_SIZE + 2, p[1] * Config.GRID_SIZE + 2))
-                else:
-                    # 如果片加载失败，使用原来的矩形绘制
-                    rect = pygame.Rect(
-                        p[0] * Config.GRID_SIZE + 2,
-                        p[1] * Config.GRID_SIZE + 2,
-                        Config.GRID_SIZE - 4,
-                        Config.GRID_SIZE - 4
-                    )
-                    pygame.draw.rect(surface, Config.DARK_GREEN, rect, border_radius=5)
+        draw_snake(surface, self.positions, self.direction)
+
+def draw_snake(surface, positions, direction, camera=None):
+    """绘制一条蛇（本地的蛇和联机时服务器发来的蛇共用）
+    
+    camera不为None时positions是棋盘坐标，只绘制视口内的部分。
+    """
+    for i, p in enumerate(positions):
+        if camera is not None:
+            p = camera.to_screen(p)
+            if p is None:
+                continue
+        draw_segment(surface, p, direction if i == 0 else None)
+
+def draw_segment(surface, p, head_direction=None):
+    """在视口格子p处绘制一节蛇身；head_direction不为None时绘制朝向该方向的蛇头"""
+    resources = ResourceManager.get_instance()
+    cell = resources.cell
+    if head_direction is not None:  # 蛇头
+        head_image = resources.snake_head_images.get(head_direction)
+        if head_image:
+            surface.blit(head_image, 
+                       (p[0] * cell, p[1] * cell))
+    else:  # 蛇身
+        offset = resources.body_offset
+        if resources.snake_body_image:
+            surface.blit(resources.snake_body_image, 
+                       (p[0] * cell + offset, p[1] * cell + offset))
+        else:
+            # 如果片加载失败，使用原来的矩形绘制
+            rect = pygame.Rect(
+                p[0] * cell + offset,
+                p[1] * cell + offset,
+                cell - 2 * offset,
+                cell - 2 * offset
+            )
+            pygame.draw.rect(surface, Config.DARK_GREEN, rect, border_radius=5)
+
+def draw_board_view(surface, board, camera, heads):
+    """按摄像机视口绘制棋盘上所有的蛇
+    
+    不遍历蛇的位置列表，而是在占用表中逐行取出视口覆盖的一段，
+    整段空闲时直接跳过，绘制开销只与视口大小有关，与蛇的长度无关。
+    
+    Args:
+        heads: {格子下标: 方向}，存活的蛇的蛇头
+    """
+    cells = board.cells
+    spans = camera.column_spans()
+    for screen_y, y in camera.rows():
+        row = y * board.width
+        for screen_x, x, length in spans:
+            start = row + x
+            segment = cells[start:start + length]
+            if segment.count(EMPTY) == length:
+                continue
+            for dx, owner in enumerate(segment):
+                if owner != EMPTY:
+                    draw_segment(surface, (screen_x + dx, screen_y), heads.get(start + dx))
 
 class Food:
     """
@@ -338,28 +629,41 @@ class Food:
     - 图形渲染
     """
     
-    def __init__(self):
-        """初始化食物属性"""
+    def __init__(self, board):
+        """
+        初始化食物属性
+        
+        Args:
+            board: 棋盘占用表，食物在它的范围内随机放置
+        """
+        self.board = board
         self.position = (0, 0)
         self.color = Config.RED
         self.randomize_position()
 
     def randomize_position(self):
-        self.position = (random.randint(0, Config.GRID_WIDTH-1),
-                        random.randint(0, Config.GRID_HEIGHT-1))
+        self.position = (random.randint(0, self.board.width-1),
+                        random.randint(0, self.board.height-1))
 
-    def draw(self, surface):
-        resources = ResourceManager.get_instance()
-        if resources.food_image:
-            surface.blit(resources.food_image, 
-                        (self.position[0] * Config.GRID_SIZE, 
-                         self.position[1] * Config.GRID_SIZE))
-        else:
-            # 如果图片加载失败，使用原来的矩形绘制
-            pygame.draw.rect(surface, self.color,
-                           (self.position[0] * Config.GRID_SIZE,
-                            self.position[1] * Config.GRID_SIZE,
-                            Config.GRID_SIZE, Config.GRID_SIZE))
+    def draw(self, surface, camera=None):
+        position = self.position if camera is None else camera.to_screen(self.position)
+        if position is not None:
+            draw_food(surface, position, self.color)
+
+def draw_food(surface, position, color):
+    """绘制一个食物"""
+    resources = ResourceManager.get_instance()
+    cell = resources.cell
+    if resources.food_image:
+        surface.blit(resources.food_image, 
+                    (position[0] * cell, 
+                     position[1] * cell))
+    else:
+        # 如果图片加载失败，使用原来的矩形绘制
+        pygame.draw.rect(surface, color,
+                       (position[0] * cell,
+                        position[1] * cell,
+                        cell, cell))
 
 def draw_leaderboard(screen, score_db, scroll_position=0):
     """绘制排行榜（支持滚动）
@@ -371,31 +675,25 @@ def draw_leaderboard(screen, score_db, scroll_position=0):
     """
     leaderboard = score_db.get_leaderboard()
     last_score, last_rank = score_db.get_last_score_rank()
-    config = Config.UI['leaderboard']
+    layout = Config.snapshot.leaderboard
     
     # 计算内容总高度
-    content_height = config['title_spacing'] + len(leaderboard) * config['spacing'] + 40
+    content_height = layout.content_base + len(leaderboard) * layout.spacing
     
     # 创建完整的排行榜表面
-    full_surface = pygame.Surface((config['width'], content_height))
-    full_surface.fill(tuple(config['background_color']))
+    full_surface = pygame.Surface((layout.width, content_height))
+    full_surface.fill(layout.background_color)
     
     # 绘制标题
-    title_font = pygame.font.SysFont(
-        Config.UI['fonts']['default']['name'],
-        Config.UI['fonts']['sizes']['leaderboard_title']
-    )
+    title_font = get_font(layout.title_font)
     title = title_font.render("排行榜", True, Config.WHITE)
-    title_x = (config['width'] - title.get_width()) // 2
-    full_surface.blit(title, (title_x, 20))
+    title_x = (layout.width - title.get_width()) // 2
+    full_surface.blit(title, (title_x, layout.title_y))
     
     # 绘制排行榜内容
-    item_font = pygame.font.SysFont(
-        Config.UI['fonts']['default']['name'],
-        Config.UI['fonts']['sizes']['leaderboard_item']
-    )
+    item_font = get_font(layout.item_font)
     
-    y = config['title_spacing'] + 20
+    y = layout.first_item_y
     
     for i, (name, score, date) in enumerate(leaderboard, 1):
         is_last_score = last_score is not None and score == last_score and i == last_rank
@@ -404,9 +702,9 @@ def draw_leaderboard(screen, score_db, scroll_position=0):
         score_text = f"{score}分"
         date_text = date[5:16]
         
-        rank_x = config['item_padding']
-        score_x = config['width'] - config['item_padding'] - item_font.size(score_text)[0]
-        date_x = (config['width'] - item_font.size(date_text)[0]) // 2
+        rank_x = layout.item_padding
+        score_x = layout.width - layout.item_padding - item_font.size(score_text)[0]
+        date_x = (layout.width - item_font.size(date_text)[0]) // 2
         
         color = Config.WHITE
         if is_last_score:
@@ -426,12 +724,18 @@ def draw_leaderboard(screen, score_db, scroll_position=0):
         full_surface.blit(score, (score_x, y))
         full_surface.blit(date, (date_x, y))
         
-        y += config['spacing']
+        y += layout.spacing
+    
+    return draw_scrolling_panel(screen, full_surface, content_height, scroll_position)
+
+def draw_scrolling_panel(screen, full_surface, content_height, scroll_position):
+    """把完整的面板内容按滚动位置裁剪到排行榜区域，返回实际的滚动位置"""
+    layout = Config.snapshot.leaderboard
     
     # 创建可视区域
-    visible_height = config['height']
-    visible_surface = pygame.Surface((config['width'], visible_height))
-    visible_surface.fill(tuple(config['background_color']))
+    visible_height = layout.height
+    visible_surface = pygame.Surface((layout.width, visible_height))
+    visible_surface.fill(layout.background_color)
     
     # 限制滚动范围
     max_scroll = max(0, content_height - visible_height)
@@ -441,13 +745,148 @@ def draw_leaderboard(screen, score_db, scroll_position=0):
     visible_surface.blit(full_surface, (0, -scroll_position))
     
     # 设置透明度
-    visible_surface.set_alpha(config['opacity'])
+    visible_surface.set_alpha(layout.opacity)
     
     # 绘制到屏幕
-    screen.blit(visible_surface, (config['x_offset'], config['y_offset']))
+    screen.blit(visible_surface, (layout.x, layout.y))
     
     return scroll_position  # 返回实际的滚动位置
 
+def draw_player_stats(screen, score_db, scroll_position=0):
+    """绘制玩家统计（与排行榜共用位置和滚动）
+    
+    上半部分为按最高分排列的玩家：局数、最高分、平均分、P90；
+    下半部分为最近几天每天的最高分。数据都来自预先聚合的统计表。
+    """
+    layout = Config.snapshot.leaderboard
+    players = score_db.get_all_player_stats(layout.stats_players)
+    daily = score_db.get_daily_best(layout.stats_days)
+    
+    rows = len(players) + len(daily) + 1  # 多出的一行是“每日最佳”小标题
+    content_height = layout.content_base + rows * layout.spacing
+    full_surface = pygame.Surface((layout.width, content_height))
+    full_surface.fill(layout.background_color)
+    
+    title_font = get_font(layout.title_font)
+    title = title_font.render("玩家统计", True, Config.WHITE)
+    full_surface.blit(title, ((layout.width - title.get_width()) // 2, layout.title_y))
+    
+    item_font = get_font(layout.item_font)
+    right = layout.width - layout.item_padding
+    y = layout.first_item_y
+    for stats in players:
+        detail = (f"{stats['games']}局 最高{stats['best']} "
+                  f"平均{stats['mean']:.1f} P90 {stats['p90']}")
+        full_surface.blit(item_font.render(stats['name'], True, Config.WHITE),
+                          (layout.item_padding, y))
+        full_surface.blit(item_font.render(detail, True, Config.GRAY),
+                          (right - item_font.size(detail)[0], y))
+        y += layout.spacing
+    
+    subtitle = item_font.render("每日最佳", True, Config.WHITE)
+    full_surface.blit(subtitle, ((layout.width - subtitle.get_width()) // 2, y))
+    y += layout.spacing
+    for day, name, score in daily:
+        score_text = f"{score}分"
+        full_surface.blit(item_font.render(day[5:], True, Config.GRAY), (layout.item_padding, y))
+        name_text = item_font.render(name, True, Config.WHITE)
+        full_surface.blit(name_text, ((layout.width - name_text.get_width()) // 2, y))
+        full_surface.blit(item_font.render(score_text, True, Config.WHITE),
+                          (right - item_font.size(score_text)[0], y))
+        y += layout.spacing
+    
+    return draw_scrolling_panel(screen, full_surface, content_height, scroll_position)
+
+class DirectionQueue:
+    """
+    方向输入队列
+    
+    - 队列长度有上限，连续快速按键不会积压成几秒钟的转向
+    - 入队时丢弃多余或不可能的输入：与上一个方向相同的、与上一个方向相反的；
+      与尚未生效的上一次转向相反时，视为玩家改变主意，用新方向替换上一次转向
+    - 出队时丢弃等待超过max_age_ms的过期输入
+    - 记录每个输入从处理按键到在某一帧生效之间的毫秒数，用于调整操作手感
+      （按键时间取事件被处理时的pygame.time.get_ticks()）
+    """
+    
+    def __init__(self, max_size, max_age_ms, sample_size=256):
+        self.items = deque(maxlen=max_size)  # (方向, 按键时间ms)
+        self.max_age_ms = max_age_ms
+        self.latencies = deque(maxlen=sample_size)
+        self.dropped_count = 0
+    
+    def __len__(self):
+        return len(self.items)
+    
+    def clear(self):
+        self.items.clear()
+    
+    @staticmethod
+    def _reverse(direction):
+        return (-direction[0], -direction[1])
+    
+    def push(self, direction, current_direction, now):
+        """加入一个方向输入，current_direction为蛇当前的移动方向"""
+        last = self.items[-1][0] if self.items else current_direction
+        if direction == last:
+            self.dropped_count += 1
+            return
+        if direction == self._reverse(last):
+            if not self.items:
+                self.dropped_count += 1  # 不能直接掉头
+                return
+            # 撤销上一次还没生效的转向，再看新方向相对于更早的方向是否有效
+            self.items.pop()
+            self.dropped_count += 1
+            self.push(direction, current_direction, now)
+            return
+        if len(self.items) == self.items.maxlen:
+            self.dropped_count += 1  # deque会自动丢弃最旧的输入
+        self.items.append((direction, now))
+    
+    def pop(self, current_direction, now):
+        """取出下一个有效的方向，没有时返回None"""
+        while self.items:
+            direction, pressed = self.items.popleft()
+            if now - pressed > self.max_age_ms or direction in (
+                    current_direction, self._reverse(current_direction)):
+                self.dropped_count += 1
+                continue
+            self.latencies.append(now - pressed)
+            return direction
+        return None
+    
+    def latency_stats(self):
+        """返回(样本数, 平均值, P95, 最大值)，单位毫秒；没有样本时返回None"""
+        if not self.latencies:
+            return None
+        samples = sorted(self.latencies)
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return len(samples), sum(samples) / len(samples), p95, samples[-1]
+
+class LocalPlayer:
+    """
+    本地玩家：一条蛇以及控制它的方式
+    
+    - 真人玩家：按键到方向的映射和自己的方向队列
+    - 电脑玩家：bot为自动驾驶规划器
+    """
+    
+    def __init__(self, snake, keys=None, queue=None, bot=None):
+        self.snake = snake
+        self.keys = keys or {}
+        self.queue = queue
+        self.bot = bot
+    
+    @property
+    def human(self):
+        return self.bot is None
+
+def parse_player_keys(keys):
+    """把配置中的按键名（如 "up"、"w"）转换为 {按键码: 方向}"""
+    directions = {'up': Config.UP, 'down': Config.DOWN, 'left': Config.LEFT, 'right': Config.RIGHT}
+    return {pygame.key.key_code(name): directions[direction] for direction, name in keys.items()}
+
 class GameState:
     """
     游戏状态管理类
@@ -466,8 +905,11 @@ class GameState:
         self.paused = False
         self.game_speed = Config.DEFAULT_SPEED
         self.show_game_over = False
-        self.direction_queue = []
+        self.direction_queue = DirectionQueue(Config.snapshot.game.input_queue_size,
+                                              Config.snapshot.game.input_max_age_ms)
         self.leaderboard_scroll = 0  # 添加排行榜滚动位置
+        self.show_stats = False  # 暂停和结束画面显示玩家统计而不是排行榜
+        self.tick = 0  # 这一局已经进行的刻数
 
 class Dialog:
     """
@@ -482,30 +924,20 @@ class Dialog:
     def __init__(self, screen):
         """初始化对话框"""
         self.screen = screen
-        self.config = Config.UI['dialog']
         self.showing = False
         self.result = None
         self.selected_button = 0  # 0: 确定按钮, 1: 取消按钮
         self.audio = AudioManager.get_instance()  # 添加音频管理器实例
         
-        # 计算对话框位置
-        self.x = (Config.WINDOW_WIDTH - self.config['width']) // 2
-        self.y = (Config.WINDOW_HEIGHT - self.config['height']) // 2
-        
-        # 计算按钮位置
-        button_y = self.y + self.config['height'] - self.config['button_height'] - 20
-        self.yes_button = pygame.Rect(
-            self.x + self.config['button_spacing'],
-            button_y,
-            self.config['button_width'],
-            self.config['button_height']
-        )
-        self.no_button = pygame.Rect(
-            self.x + self.config['width'] - self.config['button_width'] - self.config['button_spacing'],
-            button_y,
-            self.config['button_width'],
-            self.config['button_height']
-        )
+        self.apply_layout(Config.snapshot)
+        Config.subscribe(('dialog',), self.apply_layout)
+        self.overlays = OverlayCache(('dialog', 'colors'))
+    
+    def apply_layout(self, snapshot):
+        """使用配置快照中预先计算好的对话框和按钮位置"""
+        self.layout = snapshot.dialog
+        self.yes_button = pygame.Rect(self.layout.yes_button)
+        self.no_button = pygame.Rect(self.layout.no_button)
     
     def show(self):
         self.showing = True
@@ -555,42 +987,42 @@ class Dialog:
     def draw(self):
         if not self.showing:
             return
-            
-        # 绘制半透明背景
-        overlay = pygame.Surface((Config.WINDOW_WIDTH, Config.WINDOW_HEIGHT))
-        overlay.fill((0, 0, 0))
-        overlay.set_alpha(128)
-        self.screen.blit(overlay, (0, 0))
-        
-        # 绘制对话框背景
-        dialog_surface = pygame.Surface((self.config['width'], self.config['height']))
-        dialog_surface.fill(tuple(self.config['background_color']))
-        dialog_surface.set_alpha(self.config['opacity'])
-        self.screen.blit(dialog_surface, (self.x, self.y))
-        
-        # 绘制文本
-        font = pygame.font.SysFont(
-            Config.UI['fonts']['default']['name'],
-            self.config['text_size']
-        )
-        text = font.render(self.config['text'], True, Config.WHITE)
-        text_x = self.x + (self.config['width'] - text.get_width()) // 2
-        text_y = self.y + 30
-        self.screen.blit(text, (text_x, text_y))
-        
-        # 绘制按钮
-        buttons = [(self.yes_button, self.config['yes_text'], 0), 
-                  (self.no_button, self.config['no_text'], 1)]
-        
-        for button, text, index in buttons:
-            # 根据是否选中使用不同颜色
-            color = Config.WHITE if self.selected_button == index else Config.GRAY
-            pygame.draw.rect(self.screen, color, button, border_radius=5)
-            button_text = font.render(text, True, 
-                                    Config.BLACK if self.selected_button == index else Config.WHITE)
-            text_x = button.x + (button.width - button_text.get_width()) // 2
-            text_y = button.y + (button.height - button_text.get_height()) // 2
-            self.screen.blit(button_text, (text_x, text_y))
+        
+        # 背景遮罩、对话框和文本合成一次后缓存，只有按钮随选中状态切换
+        size = self.screen.get_size()
+        self.overlays.draw(self.screen, ('base', size), lambda: self._build_base(size))
+        for index in (0, 1):
+            selected = self.selected_button == index
+            self.overlays.draw(self.screen, ('button', index, selected),
+                               lambda: self._build_button(index, selected))
+    
+    def _build_base(self, size):
+        """合成半透明背景、对话框背景和提示文本"""
+        layout = self.layout
+        text = get_font(layout.font).render(layout.text, True, Config.WHITE)
+        text_x = layout.x + (layout.width - text.get_width()) // 2
+        return [
+            (make_overlay(size, (0, 0, 0), 128), (0, 0)),
+            (make_overlay((layout.width, layout.height), layout.background_color, layout.opacity),
+             (layout.x, layout.y)),
+            (text, (text_x, layout.text_y)),
+        ]
+    
+    def _build_button(self, index, selected):
+        """绘制一个按钮（选中和未选中使用不同颜色）"""
+        layout = self.layout
+        button = self.yes_button if index == 0 else self.no_button
+        text = layout.yes_text if index == 0 else layout.no_text
+        
+        surface = pygame.Surface(button.size, pygame.SRCALPHA)
+        color = Config.WHITE if selected else Config.GRAY
+        pygame.draw.rect(surface, color, surface.get_rect(), border_radius=5)
+        button_text = get_font(layout.font).render(text, True, 
+                                                   Config.BLACK if selected else Config.WHITE)
+        text_x = (button.width - button_text.get_width()) // 2
+        text_y = (button.height - button_text.get_height()) // 2
+        surface.blit(button_text, (text_x, text_y))
+        return [(surface, button.topleft)]
 
 class AudioManager:
     """
@@ -600,6 +1032,9 @@ class AudioManager:
     - 背景音乐播放
     - 音效播放
     - 音量控制
+    - 按类别预留混音通道，防止连续音效抢占死亡音效的通道
+    - 限制同一音效的最小重复触发间隔，间隔内的多次触发合并为一次更响的播放
+    - 背景音乐可以是音乐文件，也可以是随游戏速度变化节奏的流式程序化音乐
     """
     _instance = None
     
@@ -614,11 +1049,25 @@ class AudioManager:
             raise Exception("This class is a singleton!")
         AudioManager._instance = self
         
-        # 初始化音频系统
-        pygame.mixer.init()
+        # 初始化音频系统（没有音频设备时禁用音效，而不是让游戏启动失败）
+        self.sounds = {}
+        self.channels = {}  # 音效类别 -> 预留的通道列表
+        self.last_played = {}  # 音效类别 -> 上次播放时间(ms)
+        self.pending_bursts = {}  # 音效类别 -> 间隔内被合并的触发次数
+        self.volume = Config.AUDIO['volume']
+        self.music_stream = None
+        self.background_music_enabled = True  # 添加背景音乐开关状态
+        self.scheduler = None  # 游戏的定时器调度器，由Game设置
+        self.music_resume = None  # 死亡音效结束后恢复背景音乐的定时器
+        try:
+            pygame.mixer.init()
+        except pygame.error as e:
+            print(f"无法初始化音频系统: {str(e)}")
+            self.mixer_available = False
+            return
+        self.mixer_available = True
         
         # 加载音效
-        self.sounds = {}
         sound_dir = Config.AUDIO['directory']
         if not os.path.exists(sound_dir):
             os.makedirs(sound_dir)
@@ -628,15 +1077,42 @@ class AudioManager:
             try:
                 sound_path = os.path.join(sound_dir, sound_file)
                 if sound_name == 'background':
+                    if Config.AUDIO['music']['mode'] == 'procedural':
+                        continue  # 程序化音乐不需要音乐文件
                     pygame.mixer.music.load(sound_path)
                     pygame.mixer.music.set_volume(Config.AUDIO['volume'])
                 else:
+                    # 音量由播放时的通道音量控制，合并播放时可以调高
                     self.sounds[sound_name] = pygame.mixer.Sound(sound_path)
-                    self.sounds[sound_name].set_volume(Config.AUDIO['volume'])
             except:
                 print(f"无法加载音效: {sound_file}")
         
-        self.background_music_enabled = True  # 添加背景音乐开关状态
+        self.reserve_channels()
+    
+    def reserve_channels(self):
+        """按配置为各类音效预留通道
+        
+        预留的通道不会被Sound.play()自动分配，因此吃食物或按键音效
+        再密集也不会占用死亡音效的通道。
+        """
+        config = Config.AUDIO['channels']
+        reserved = dict(config['reserved'])
+        music_config = Config.AUDIO['music']
+        if music_config['mode'] == 'procedural':
+            reserved['music'] = 1
+        pygame.mixer.set_num_channels(max(config['total'], sum(reserved.values())))
+        pygame.mixer.set_reserved(sum(reserved.values()))
+        
+        channel_id = 0
+        for sound_name, count in reserved.items():
+            self.channels[sound_name] = [pygame.mixer.Channel(channel_id + i) for i in range(count)]
+            channel_id += count
+        
+        if 'music' in self.channels:
+            music_channel = self.channels['music'][0]
+            music_channel.set_volume(self.volume)
+            self.music_stream = MusicStream(music_channel, music_config['chunk_ms'],
+                                            music_config['buffer_chunks'])
     
     def toggle_background_music(self):
         """切换背景音乐开关状态"""
@@ -649,51 +1125,305 @@ class AudioManager:
     def play_background(self):
         """播放背景音乐（循环）"""
         try:
-            if self.background_music_enabled:  # 只在启用状态下播放
-                pygame.mixer.music.play(-1)
+            if self.mixer_available and self.background_music_enabled:  # 只在启用状态下播放
+                if self.music_stream:
+                    self.music_stream.start()
+                else:
+                    pygame.mixer.music.play(-1)
         except:
             print("无法播放背景音乐")
     
     def stop_background(self):
         """停止背景音乐"""
-        pygame.mixer.music.stop()
+        if self.music_stream:
+            self.music_stream.stop()
+        elif self.mixer_available:
+            pygame.mixer.music.stop()
+    
+    def set_music_tempo(self, tempo):
+        """设置程序化背景音乐的节奏倍数"""
+        if self.music_stream:
+            self.music_stream.set_tempo(tempo)
     
     def play_sound(self, sound_name):
-        """播放指定音效"""
-        if sound_name in self.sounds:
-            self.sounds[sound_name].play()
+        """播放指定音效
+        
+        距离上次播放不足最小间隔时不立即播放，而是计入合并次数，
+        由update()在间隔结束后合并为一次播放。
+        """
+        if sound_name not in self.sounds:
+            return
+        now = pygame.time.get_ticks()
+        interval = Config.AUDIO['min_interval'].get(sound_name, 0)
+        last = self.last_played.get(sound_name)
+        if last is not None and now - last < interval:
+            self.pending_bursts[sound_name] = self.pending_bursts.get(sound_name, 0) + 1
+            return
+        self._play(sound_name, 1)
+        self.last_played[sound_name] = now
+    
+    def update(self):
+        """补充流式背景音乐，并播放间隔已结束的合并音效（每帧调用）"""
+        if self.music_stream:
+            self.music_stream.pump()
+        if not self.pending_bursts:
+            return
+        now = pygame.time.get_ticks()
+        for sound_name, count in list(self.pending_bursts.items()):
+            interval = Config.AUDIO['min_interval'].get(sound_name, 0)
+            if now - self.last_played[sound_name] >= interval:
+                self._play(sound_name, count)
+                self.last_played[sound_name] = now
+                del self.pending_bursts[sound_name]
+    
+    def _play(self, sound_name, count):
+        """在音效的预留通道上播放，count为合并的触发次数，次数越多音量越大"""
+        gain = 1 + Config.AUDIO['burst_gain'] * (count - 1)
+        volume = min(1.0, self.volume * gain)
+        channels = self.channels.get(sound_name)
+        if channels:
+            # 优先使用空闲通道，全部忙碌时打断其中最早的一个
+            channel = next((c for c in channels if not c.get_busy()), channels[0])
+            channels.remove(channel)
+            channels.append(channel)
+            channel.set_volume(volume)
+            channel.play(self.sounds[sound_name])
+        else:
+            channel = self.sounds[sound_name].play()
+            if channel:
+                channel.set_volume(volume)
     
     def play_death_sound(self):
-        """播放死亡音效并暂停背景音乐"""
+        """播放死亡音效并暂停背景音乐，音效结束时由定时器恢复背景音乐"""
         self.stop_background()
+        self.pending_bursts.clear()
+        length_ms = 0
         if 'death' in self.sounds:
-            self.sounds['death'].play()
-            # 设置定时器在死亡音效结束后恢复背景音乐
-            pygame.time.set_timer(
-                pygame.USEREVENT + 1,
-                Config.AUDIO['durations']['death']
+            self._play('death', 1)
+            length_ms = int(self.sounds['death'].get_length() * 1000)
+        if self.scheduler is not None:
+            # 连续死亡时只保留最后一次的恢复；音效照常播放，不随游戏暂停
+            if self.music_resume is not None:
+                self.music_resume.cancel()
+            self.music_resume = self.scheduler.call_later(length_ms, self.play_background,
+                                                          pausable=False)
+
+def _gzip_rotator(source, dest):
+    """轮转时把旧的日志文件压缩为gz归档"""
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+class QuoteLog:
+    """
+    语录历史日志
+    
+    - 文件句柄保持打开，写入先进入内存缓冲区，攒够一批或关闭时再写盘
+    - 按文件大小或按日期轮转，旧文件压缩为.gz归档，只保留固定数量
+    - 可以一次遍历当前文件和所有归档，统计每条语录的使用次数
+    
+    记录格式与之前相同：[时间] 语录
+    """
+    
+    TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+    
+    def __init__(self):
+        self.path = Config.quotes['file']
+        settings = Config.quotes['log']
+        self.rotate = settings['rotate']
+        
+        if self.rotate == 'date':
+            handler = logging.handlers.TimedRotatingFileHandler(
+                self.path, when='midnight', backupCount=settings['backup_count'],
+                encoding='utf-8'
             )
+        else:
+            handler = logging.handlers.RotatingFileHandler(
+                self.path, maxBytes=settings['max_bytes'],
+                backupCount=settings['backup_count'], encoding='utf-8'
+            )
+        handler.namer = lambda name: name + '.gz'
+        handler.rotator = _gzip_rotator
+        handler.setFormatter(logging.Formatter('[%(asctime)s] %(message)s', self.TIME_FORMAT))
+        self.file_handler = handler
+        
+        # 缓冲区满buffer_size条时批量写入文件
+        self.buffer = logging.handlers.MemoryHandler(
+            settings['buffer_size'], flushLevel=logging.CRITICAL, target=handler
+        )
+        self.logger = logging.getLogger('snaker.quotes')
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logger.addHandler(self.buffer)
+    
+    def write(self, quote):
+        self.logger.info(quote)
+    
+    def flush(self):
+        self.buffer.flush()
+        self.file_handler.flush()
+    
+    def close(self):
+        """写出缓冲区并关闭文件（退出游戏前调用）"""
+        self.logger.removeHandler(self.buffer)
+        self.buffer.close()
+        self.file_handler.close()
+    
+    def archive_files(self):
+        """按时间从旧到新返回所有归档文件"""
+        archives = glob.glob(glob.escape(self.path) + '.*.gz')
+        if self.rotate == 'date':
+            return sorted(archives)
+        # 按大小轮转时 .1.gz 最新，序号越大越旧
+        def index(path):
+            number = path[len(self.path) + 1:-len('.gz')]
+            return int(number) if number.isdigit() else 0
+        return sorted(archives, key=index, reverse=True)
+    
+    def history_files(self):
+        """按时间从旧到新返回(打开函数, 路径)，包括归档和当前文件"""
+        self.flush()
+        files = [(gzip.open, path) for path in self.archive_files()]
+        if os.path.exists(self.path):
+            files.append((open, self.path))
+        return files
+    
+    @staticmethod
+    def _read_entries(opener, path):
+        with opener(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                line = line.rstrip('\n')
+                if line.startswith('[') and '] ' in line:
+                    time, quote = line[1:].split('] ', 1)
+                    yield time, quote
+    
+    def iter_history(self):
+        """按时间顺序逐行读取全部历史，产生(时间字符串, 语录)"""
+        for opener, path in self.history_files():
+            yield from self._read_entries(opener, path)
+    
+    def recent_quotes(self, count):
+        """按时间顺序返回最近count条语录；从最新的文件往前读，够数即停"""
+        recent = []
+        for opener, path in reversed(self.history_files()):
+            if len(recent) >= count:
+                break
+            tail = deque((quote for _, quote in self._read_entries(opener, path)),
+                         maxlen=count - len(recent))
+            recent[:0] = tail
+        return recent
+    
+    def usage_counts(self):
+        """一次遍历历史，统计每条语录被使用的次数"""
+        return Counter(quote for _, quote in self.iter_history())
+
+class AliasTable:
+    """
+    加权随机抽样的别名表（Vose算法）
+    
+    构建为O(n)，每次抽样只需两次随机数，为O(1)。
+    """
+    
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        if n == 0 or total <= 0:
+            raise ValueError("权重必须非空且总和大于0")
+        self.n = n
+        self.prob = [0.0] * n
+        self.alias = list(range(n))
+        
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # 剩余项由于浮点误差可能略偏离1，直接视为1
+        for i in small + large:
+            self.prob[i] = 1.0
+    
+    def draw(self, rng=random):
+        i = int(rng.random() * self.n)
+        return i if rng.random() < self.prob[i] else self.alias[i]
 
 class QuoteManager:
-    """语录管理类"""
+    """
+    语录管理类
+    
+    - 按权重随机选择语录：配置中的权重乘以按历史使用次数递减的系数，
+      用得越少的语录越容易被选中
+    - 最近K次出现过的语录不会重复出现（环形缓冲区记录最近的选择，启动时从语录历史末尾恢复，
+      重启游戏后同样生效）
+    - 别名表只在启动时和语录配置变化时重建
+    """
+    
+    MAX_REJECTIONS = 32  # 连续抽到最近出现过的语录时，超过此次数后直接在剩余语录中选择
+    
     def __init__(self):
+        self.quote_log = QuoteLog()
+        self.usage_counts = Counter()
+        if Config.quotes['selection']['history_weighting']:
+            try:
+                self.usage_counts = self.quote_log.usage_counts()
+            except Exception as e:
+                print(f"读取语录历史失败: {str(e)}")
+        self.source = None
+        self.rebuild()
+    
+    def rebuild(self):
+        """根据当前语录配置重建别名表和最近记录"""
+        self.source = Config.quotes
         self.quotes = Config.quotes['items']
-        self.quote_file = Config.quotes['file']
+        weights = Config.quotes['selection'].get('weights') or [1.0] * len(self.quotes)
+        if len(weights) != len(self.quotes):
+            print("语录权重数量与语录数量不一致，使用相同权重")
+            weights = [1.0] * len(self.quotes)
+        learned = [w / (1 + self.usage_counts[q]) for w, q in zip(weights, self.quotes)]
+        self.table = AliasTable(learned)
+        
+        window = min(Config.quotes['selection']['no_repeat'], len(self.quotes) - 1)
+        self.recent = deque(maxlen=max(window, 0))
+        if self.recent.maxlen:
+            try:
+                recent_quotes = self.quote_log.recent_quotes(self.recent.maxlen)
+            except Exception as e:
+                print(f"读取语录历史失败: {str(e)}")
+                recent_quotes = []
+            index_of = {quote: i for i, quote in enumerate(self.quotes)}
+            self.recent.extend(index_of[quote] for quote in recent_quotes if quote in index_of)
     
     def get_random_quote(self):
         """获取随机语录"""
-        quote = random.choice(self.quotes)
+        if Config.quotes is not self.source:  # 配置被重新加载过
+            self.rebuild()
+        index = self.table.draw()
+        attempts = 0
+        while index in self.recent:
+            attempts += 1
+            if attempts > self.MAX_REJECTIONS:
+                index = random.choice([i for i in range(len(self.quotes)) if i not in self.recent])
+                break
+            index = self.table.draw()
+        if self.recent.maxlen:
+            self.recent.append(index)
+        quote = self.quotes[index]
         self._log_quote(quote)
         return quote
     
     def _log_quote(self, quote):
         """记录语录使用历史"""
         try:
-            with open(self.quote_file, 'a', encoding='utf-8') as f:
-                time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                f.write(f"[{time}] {quote}\n")
+            self.quote_log.write(quote)
         except Exception as e:
             print(f"记录语录失败: {str(e)}")
+    
+    def close(self):
+        self.quote_log.close()
 
 class Game:
     """
@@ -704,70 +1434,177 @@ class Game:
     - 输入处理
     - 状态更新
     - 画面渲染
+    - 空闲模式：暂停、游戏结束或显示对话框时阻塞等待事件，画面变化时才重绘
     """
     
+    # 窗口重新显示时需要重绘的事件
+    EXPOSE_EVENTS = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED)
+    
     def __init__(self):
         """初始化游戏"""
         pygame.init()
-        self.screen = pygame.display.set_mode((Config.WINDOW_WIDTH, Config.WINDOW_HEIGHT))
-        pygame.display.set_caption('贪吃蛇')
+        self.headless = Config.HEADLESS_MODE
+        if self.headless:
+            # 无头模式：渲染到离屏表面，按配置导出帧
+            self.screen = pygame.Surface((Config.WINDOW_WIDTH, Config.WINDOW_HEIGHT))
+            self.frame_dumper = FrameDumper(Config)
+        else:
+            self.screen = pygame.display.set_mode((Config.WINDOW_WIDTH, Config.WINDOW_HEIGHT),
+                                                  WINDOW_FLAGS)
+            pygame.display.set_caption('贪吃蛇')
+            self.frame_dumper = None
+        self.frame_count = 0
         self.clock = pygame.time.Clock()
         
         self.state = GameState()
         self.resources = ResourceManager.get_instance()
         self.score_db = ScoreDB()
-        self.snake = Snake()
-        self.food = Food()
+        self.board = Board(Config.GRID_WIDTH, Config.GRID_HEIGHT)  # 所有蛇共享的占用表
+        self.create_players()
+        self.food = Food(self.board)
+        # 渲染方式：精灵（默认），或者适合格子很小的大棋盘的数组渲染
+        self.array_renderer = None
+        renderer = Config.RENDERER
+        if renderer['mode'] == 'array':
+            self.array_renderer = ArrayRenderer(self.board, max(1, renderer['cell_size']),
+                                                Config.snapshot.colors)
+            Config.subscribe(('colors',),
+                             lambda snapshot: self.array_renderer.set_colors(snapshot.colors))
+        elif renderer['mode'] != 'sprites':
+            print(f"未知的渲染方式: {renderer['mode']}，使用精灵渲染")
+        # 摄像机：棋盘比窗口大时跟随第一个玩家的蛇头滚动
+        self.client = None  # 联机时为服务器连接，见connect()
+        self.create_camera()
         self.dialog = Dialog(self.screen)
+        # 定时器：游戏时钟在暂停、结束画面和对话框显示时停止走动
+        self.scheduler = Scheduler()
         self.audio = AudioManager.get_instance()
+        self.audio.scheduler = self.scheduler
         self.audio.play_background()
         self.show_key_help = False  # 添加按键说明显示状态
         self.quote_manager = QuoteManager()
         self.exit_quote = None
-        self.exit_timer = 0
+        self.recording = False
+        self.recorder = None
+        self.finished_recorders = []
+        self.needs_redraw = True
+        self.overlays = OverlayCache(('key_help', 'hud', 'colors'))
+        
+        # 自动驾驶（配置开启或使用--autopilot参数），以最高速度运行
+        self.autopilot = None
+        settings = Config.AUTOPILOT
+        if settings['enabled'] or '--autopilot' in sys.argv:
+            self.autopilot = Autopilot(self.board, settings['time_budget_ms'],
+                                       settings['shortcuts'], settings['max_shortcut_fill'])
+            self.state.game_speed = Config.MAX_SPEED
+        
+        # 联机模式（--connect 地址:端口）：游戏只负责输入和渲染，规则由服务器运行
+        if '--connect' in sys.argv:
+            self.connect(sys.argv[sys.argv.index('--connect') + 1])
+        
+        # 对局存档：每隔固定刻数在后台保存，崩溃后下次启动可以继续（联机时状态在服务器上）
+        self.savegame = None
+        settings = Config.SAVEGAME
+        if settings['enabled'] and self.client is None:
+            self.savegame = SaveGameWriter(settings['file'], self.board.width, self.board.height,
+                                           (Config.UP, Config.DOWN, Config.LEFT, Config.RIGHT))
+            if settings['resume']:
+                self.resume_game()
+        startup_timer.mark('游戏初始化')
+        startup_timer.report()
+    
+    def create_camera(self):
+        """按窗口大小和当前的格子大小创建摄像机，单机时视口中心对准第一个玩家的蛇头"""
+        cell = self.array_renderer.cell_size if self.array_renderer else self.resources.cell
+        width, height = self.screen.get_size()
+        board = self.client or self.board  # 联机时棋盘大小由服务器决定
+        self.camera = Camera(width // cell, height // cell, board.width, board.height,
+                             Config.snapshot.game.camera_margin)
+        if self.client is None:
+            self.camera.center_on(self.snake.get_head_position())
+    
+    def resize(self, size):
+        """
+        窗口缩放：窗口能显示的格子数不变，按新的窗口大小选择格子大小
+        
+        新的精灵在后台生成，就绪之前仍按原来的格子大小绘制（见ResourceManager.poll）；
+        数组渲染的格子大小由配置决定，只需要新的背景和视口。
+        对话框、按键说明、排行榜和提示文字的位置按新的窗口大小重新计算，
+        订阅了这些配置段的对话框按钮和覆盖层缓存随之更新。
+        """
+        self.screen = pygame.display.get_surface()
+        self.dialog.screen = self.screen
+        Config.resize_window(self.screen.get_size())
+        if self.array_renderer:
+            cell = Config.GRID_SIZE
+        else:
+            cell = max(MIN_CELL, min(size[0] // Config.VIEW_WIDTH, size[1] // Config.VIEW_HEIGHT))
+        self.resources.request_size(size, cell)
+        self.resources.poll()
+        self.create_camera()
+        self.needs_redraw = True
+    
+    def start_recording(self):
+        """开始录制当前这一局"""
+        if self.recording and self.recorder is None:
+            self.recorder = FrameRecorder(Config, self.screen.get_size(), self.state.game_speed)
+    
+    def finish_recording(self):
+        """结束当前录制，只保留排行榜前 keep_top 名的对局（0表示全部保留）"""
+        if self.recorder is None:
+            return
+        score = self.snake.score
+        keep_top = Config.RECORDING['keep_top']
+        keep = keep_top <= 0 or (score > 0 and self.score_db.get_score_rank(score) <= keep_top)
+        self.recorder.finish(keep=keep, tag=f"{score}")
+        self.finished_recorders.append(self.recorder)
+        self.recorder = None
     
     def draw_key_help(self):
-        """绘制按键说明"""
-        config = Config.UI['key_help']
+        """绘制按键说明（合成一次后缓存）"""
+        self.overlays.draw(self.screen, ('key_help', self.screen.get_size()),
+                           self._build_key_help)
+    
+    def _build_key_help(self):
+        layout = Config.snapshot.key_help
         
         # 创建半透明背景
-        help_surface = pygame.Surface((config['width'], config['height']))
-        help_surface.fill(tuple(config['background_color']))
-        help_surface.set_alpha(config['opacity'])
-        
-        # 计算位置（居中显示）
-        x = (Config.WINDOW_WIDTH - config['width']) // 2
-        y = (Config.WINDOW_HEIGHT - config['height']) // 2
-        
-        # 绘制标题
-        title_font = pygame.font.SysFont(
-            Config.UI['fonts']['default']['name'],
-            config['title_size']
-        )
-        title = title_font.render(config['title'], True, Config.WHITE)
-        title_x = x + (config['width'] - title.get_width()) // 2
-        
-        # 绘制内容
-        text_font = pygame.font.SysFont(
-            Config.UI['fonts']['default']['name'],
-            config['text_size']
-        )
+        layers = [(make_overlay((layout.width, layout.height), layout.background_color,
+                                layout.opacity), (layout.x, layout.y))]
         
-        # 绘制到屏幕
-        self.screen.blit(help_surface, (x, y))
-        self.screen.blit(title, (title_x, y + 20))
+        # 绘制标题（位置已在配置快照中居中计算好）
+        title = get_font(layout.title_font).render(layout.title, True, Config.WHITE)
+        title_x = layout.x + (layout.width - title.get_width()) // 2
+        layers.append((title, (title_x, layout.title_y)))
         
         # 绘制每一行说明文本
-        text_y = y + 70
-        for item in config['items']:
-            text = text_font.render(item, True, Config.WHITE)
-            text_x = x + 30
-            self.screen.blit(text, (text_x, text_y))
-            text_y += config['spacing']
-    
-    def handle_input(self):
+        text_font = get_font(layout.text_font)
+        text_y = layout.items_y
+        for item in layout.items:
+            layers.append((text_font.render(item, True, Config.WHITE), (layout.items_x, text_y)))
+            text_y += layout.spacing
+        return layers
+    
+    def _build_exit_quote(self, quote):
+        """合成退出语录的半透明背景和居中文本"""
+        width, height = self.screen.get_size()
+        quote_text = get_font(Config.snapshot.hud.quote_font).render(quote, True, Config.WHITE)
+        x = (width - quote_text.get_width()) // 2
+        y = (height - quote_text.get_height()) // 2
+        return [(make_overlay((width, height), (0, 0, 0), 200), (0, 0)),
+                (quote_text, (x, y))]
+    
+    def _build_hint(self):
+        hud = Config.snapshot.hud
+        return [(get_font(hud.score_font).render("按S键显示按键说明", True, Config.WHITE),
+                 hud.hint_pos)]
+    
+    def handle_input(self, events=None):
         """处理用户输入
         
+        Args:
+            events: 要处理的事件列表，None表示从事件队列中取出全部事件
+        
         处理逻辑：
         1. 如果对话框显示中，优先处理对话框事件
         2. 处理游戏退出事件（关闭窗口或ESC键）
@@ -777,12 +1614,16 @@ class Game:
            - 暂停/继续
            - 速度调节
         """
-        for event in pygame.event.get():
+        if events is None:
+            events = pygame.event.get()
+        for event in events:
+            if event.type == VIDEORESIZE:  # 对话框显示时也要处理窗口缩放
+                self.resize(event.size)
+                continue
             if self.dialog.showing:
                 if self.dialog.handle_event(event):
                     if self.dialog.result:
-                        if not self.snake.game_over and self.snake.score > 0:
-                            self.score_db.save_score(self.snake.score)
+                        self.save_scores()
                         self.show_exit_quote()  # 显示退出语录
                     self.dialog.hide()
                 continue
@@ -794,19 +1635,14 @@ class Game:
                     self.dialog.show()
                 if self.state.show_game_over:
                     if event.key == K_3:  # 按3键重新开始
-                        self.snake.reset()
-                        self.state.show_game_over = False
-                        self.state.game_speed = Config.DEFAULT_SPEED
+                        self.restart()
+                    elif event.key == K_p:  # P键切换排行榜和玩家统计
+                        self.toggle_stats()
                 else:
                     new_direction = None
-                    if event.key == K_UP and self.snake.direction != Config.DOWN:
-                        new_direction = Config.UP
-                    elif event.key == K_DOWN and self.snake.direction != Config.UP:
-                        new_direction = Config.DOWN
-                    elif event.key == K_LEFT and self.snake.direction != Config.RIGHT:
-                        new_direction = Config.LEFT
-                    elif event.key == K_RIGHT and self.snake.direction != Config.LEFT:
-                        new_direction = Config.RIGHT
+                    player = self.key_owner.get(event.key)  # 方向键按配置分给各个本地玩家
+                    if player is not None:
+                        new_direction = player.keys[event.key]
                     elif event.key == K_k:
                         self.state.paused = not self.state.paused
                     elif event.key == K_1 and self.state.game_speed < Config.MAX_SPEED:
@@ -819,29 +1655,170 @@ class Game:
                     elif event.key == K_s:  # S键切换按键说明显示
                         self.show_key_help = not self.show_key_help
                         self.audio.play_sound('button')
+                    elif event.key == K_p and self.state.paused:
+                        self.toggle_stats()
                     
-                    if new_direction and (not self.state.direction_queue or 
-                                        new_direction != self.state.direction_queue[-1]):
-                        self.state.direction_queue.append(new_direction)
+                    if new_direction and self.client:
+                        self.client.send_direction(new_direction)  # 联机时由服务器处理方向
+                    elif new_direction and not player.snake.game_over:
+                        # 方向队列负责丢弃重复、掉头和互相抵消的输入
+                        player.queue.push(new_direction, player.snake.direction,
+                                          pygame.time.get_ticks())
                 # 按键音效
                 if event.key in [K_1, K_2, K_3, K_k]:
                     self.audio.play_sound('button')
-            elif event.type == pygame.USEREVENT + 1:  # 死亡音效结束
-                self.audio.play_background()
             # 处理鼠标滚轮事件
             elif event.type == pygame.MOUSEWHEEL:
                 if self.state.paused or self.state.show_game_over:
                     # 向上滚动为正，向下滚动为负
                     self.state.leaderboard_scroll -= event.y * 30  # 30是滚动速度
     
+    def toggle_stats(self):
+        """在排行榜和玩家统计之间切换"""
+        self.state.show_stats = not self.state.show_stats
+        self.state.leaderboard_scroll = 0
+        self.audio.play_sound('button')
+    
+    def draw_scores_panel(self):
+        """绘制排行榜或玩家统计，并更新滚动位置"""
+        draw = draw_player_stats if self.state.show_stats else draw_leaderboard
+        self.state.leaderboard_scroll = draw(self.screen, self.score_db,
+                                             self.state.leaderboard_scroll)
+    
+    def create_players(self):
+        """
+        根据配置创建本地玩家和电脑玩家
+        
+        第一个本地玩家的蛇就是 self.snake，使用 GameState 中的方向队列；
+        多条蛇时出生位置沿棋盘中线均匀分布。
+        """
+        settings = Config.PLAYERS
+        humans = []
+        for entry in settings['local']:
+            try:
+                humans.append((entry['name'], parse_player_keys(entry['keys'])))
+            except (KeyError, ValueError) as e:
+                print(f"玩家 {entry.get('name')} 的按键配置无效: {str(e)}")
+        if not humans:
+            humans.append(("Player", parse_player_keys(
+                {'up': 'up', 'down': 'down', 'left': 'left', 'right': 'right'})))
+        
+        total = min(len(humans) + settings['bots'], Board.MAX_OWNER)
+        game = Config.snapshot.game
+        self.players = []
+        for i in range(total):
+            start = ((i + 1) * self.board.width // (total + 1), self.board.height // 2)
+            if i < len(humans):
+                name, keys = humans[i]
+                queue = (self.state.direction_queue if i == 0 else
+                         DirectionQueue(game.input_queue_size, game.input_max_age_ms))
+                player = LocalPlayer(Snake(self.board, i + 1, start, name), keys, queue)
+            else:
+                name = f"{settings['bot_name']}{i - len(humans) + 1}"
+                bot = Autopilot(self.board, cycle=False)
+                player = LocalPlayer(Snake(self.board, i + 1, start, name), bot=bot)
+            self.players.append(player)
+        self.snake = self.players[0].snake
+        self.key_owner = {key: player for player in self.players for key in player.keys}
+    
+    def save_scores(self):
+        """提前退出时保存仍然存活的真人玩家的分数"""
+        for player in self.players:
+            snake = player.snake
+            if player.human and not snake.game_over and snake.score > 0:
+                self.score_db.save_score(snake.score, snake.name)
+        if self.savegame:
+            self.savegame.discard()  # 分数已经保存，不需要再从存档继续
+    
+    def save_game(self):
+        """提交一次存档（编码和写文件在后台线程中进行）"""
+        self.savegame.capture(self.state.tick, self.state.game_speed, self.food.position,
+                              [(player.snake, player.queue) for player in self.players])
+    
+    def resume_game(self):
+        """从上次未正常结束的对局的存档继续；棋盘大小或玩家设置已经改变时忽略存档"""
+        saved = load_savegame(Config.SAVEGAME['file'])
+        if saved is None:
+            return False
+        size = saved.width * saved.height
+        if ((saved.width, saved.height) != (self.board.width, self.board.height)
+                or [(s.owner, s.name) for s in saved.snakes]
+                != [(p.snake.owner, p.snake.name) for p in self.players]
+                or any(s.cells and max(s.cells) >= size for s in saved.snakes)):
+            print("存档与当前的棋盘或玩家设置不符，已忽略")
+            return False
+        
+        directions = (Config.UP, Config.DOWN, Config.LEFT, Config.RIGHT)
+        width = saved.width
+        now = pygame.time.get_ticks()
+        for player, data in zip(self.players, saved.snakes):
+            snake = player.snake
+            snake.remove_from_board()
+            snake.positions = deque((i % width, i // width) for i in data.cells)
+            snake.moves = 0
+            snake.length = data.length
+            snake.score = data.score
+            snake.direction = snake.last_direction = directions[data.direction]
+            snake.game_over = data.game_over
+            if not snake.game_over:
+                for p in snake.positions:
+                    self.board.occupy(p, snake.owner)
+            if player.queue is not None:
+                player.queue.clear()
+                for index in data.queue:
+                    player.queue.push(directions[index], snake.direction, now)
+        self.food.position = (saved.food % width, saved.food // width)
+        self.state.game_speed = saved.speed
+        self.state.tick = saved.tick
+        random.setstate(saved.rng_state)
+        self.camera.center_on(self.snake.get_head_position())
+        self.savegame.seed([(player.snake, player.queue) for player in self.players], saved)
+        print(f"已从存档继续上次的对局（第{saved.tick}刻，分数: {self.snake.score}）")
+        return True
+    
+    def connect(self, address):
+        """连接联机服务器，失败时继续单机游戏"""
+        settings = Config.SERVER
+        host, _, port = address.rpartition(':')
+        try:
+            self.client = ServerConnection(host or settings['host'], int(port or settings['port']),
+                                           settings['player_name'])
+            self.create_camera()
+        except (OSError, ValueError) as e:
+            print(f"连接服务器失败: {str(e)}，改为单机游戏")
+    
+    def restart(self):
+        """重新开始一局"""
+        for player in self.players:
+            player.snake.reset()
+            if player.queue is not None:
+                player.queue.clear()
+        self.state.show_game_over = False
+        self.state.game_speed = Config.MAX_SPEED if self.autopilot else Config.DEFAULT_SPEED
+        self.state.tick = 0
+        self.camera.center_on(self.snake.get_head_position())
+        self.start_recording()
+    
+    def drive_autopilot(self):
+        """
+        由自动驾驶规划下一步，替代键盘输入
+        
+        直接设置蛇的方向而不经过方向队列，自动驾驶的转向不计入按键延迟统计。
+        """
+        direction = self.autopilot.next_direction(self.snake, self.food.position)
+        self.state.direction_queue.clear()
+        current = self.snake.direction
+        if direction and direction != (-current[0], -current[1]):
+            self.snake.direction = direction
+    
     def update(self):
         """更新游戏状态
         
         更新逻辑：
-        1. 检查游戏是否暂停或结束
+        1. 检查游戏是否暂停、结束或正在显示对话框/退出语录
         2. 处理方向队列，确保平滑转向：
-           - 每次只处理队列中的第一个方向
-           - 确保不会180度转向
+           - 每次只取出一个有效的方向
+           - 跳过过期和会导致180度转向的输入
         3. 更新蛇的位置
         4. 检查是否吃到食物：
            - 增加长度
@@ -851,81 +1828,112 @@ class Game:
            - 保存分数
            - 显示结束画面
         """
-        if not self.state.paused and not self.state.show_game_over:
-            # 处理方向队列
-            if self.state.direction_queue and len(self.state.direction_queue) > 0:
-                next_direction = self.state.direction_queue[0]
-                if ((next_direction[0], next_direction[1]) != 
-                    (-self.snake.direction[0], -self.snake.direction[1])):
-                    self.snake.direction = next_direction
-                    self.state.direction_queue.pop(0)
-            
-            if self.snake.update():
-                if self.snake.get_head_position() == self.food.position:
-                    self.snake.length += 1
-                    self.snake.score += 1
-                    self.food.randomize_position()
-                    self.audio.play_sound('eat')
+        self.audio.set_music_tempo(self.state.game_speed / Config.DEFAULT_SPEED)
+        self.audio.update()
+        
+        if self.client:
+            if not self.client.connected:
+                print("与服务器的连接已断开")
+                self.state.running = False
+            return
+        
+        if (self.autopilot and Config.AUTOPILOT['auto_restart'] and self.state.show_game_over
+                and not self.dialog.showing and not self.exit_quote):
+            self.restart()  # 长时间自动对局：死亡后立即开始下一局
+        
+        if not self.is_idle():
+            if self.autopilot:
+                self.drive_autopilot()
+            self.move_snakes()
+    
+    def move_snakes(self):
+        """所有存活的蛇同时移动一步
+        
+        1. 真人玩家从方向队列取出一个有效方向，电脑玩家由规划器决定方向
+        2. 在共享占用表上一次性结算所有碰撞（撞到任何蛇身、多条蛇进入同一格）
+        3. 存活的蛇前进并检查是否吃到食物；撞死的蛇从棋盘上移除，真人玩家保存分数
+        4. 所有真人玩家都死亡后显示结束画面
+        """
+        now = pygame.time.get_ticks()
+        moves = []
+        movers = []
+        for player in self.players:
+            snake = player.snake
+            if snake.game_over:
+                continue
+            if player.bot is not None:
+                direction = player.bot.next_direction(snake, self.food.position)
             else:
-                self.score_db.save_score(self.snake.score)
-                self.state.show_game_over = True
-                self.snake.game_over = True
-                self.audio.play_death_sound()
+                direction = player.queue.pop(snake.direction, now)
+            if direction:
+                snake.direction = direction
+            snake.last_direction = snake.direction
+            moves.append((snake.owner, snake.next_position()))
+            movers.append(player)
+        dead = self.board.resolve_moves(moves)
+        
+        for player, (_, target) in zip(movers, moves):
+            snake = player.snake
+            if snake.owner in dead:
+                snake.game_over = True
+                snake.remove_from_board()
+                if player.human:
+                    self.score_db.save_score(snake.score, snake.name)
+                    self.audio.play_death_sound()
+                continue
+            snake.advance(target)
+            if target == self.food.position:
+                snake.length += 1
+                snake.score += 1
+                self.food.randomize_position()
+                self.audio.play_sound('eat')
+        
+        self.state.tick += 1
+        if not any(player.human and not player.snake.game_over for player in self.players):
+            self.state.show_game_over = True
+            self.finish_recording()
+            if self.savegame:
+                self.savegame.discard()  # 对局已经结束，分数已经保存
+        elif self.savegame and self.state.tick % Config.SAVEGAME['interval_ticks'] == 0:
+            self.save_game()
     
     def render(self):
         """渲染游戏画面"""
+        hud = Config.snapshot.hud
         if not self.state.paused and not self.state.show_game_over:
-            if self.resources.background_image:
-                self.screen.blit(self.resources.background_image, (0, 0))
+            background = self.resources.background_image
+            if background:
+                if background.get_size() != self.screen.get_size():
+                    self.screen.fill(Config.DARK_BG)  # 窗口缩放后新的背景还在生成
+                self.screen.blit(background, (0, 0))
             else:
                 self.screen.fill(Config.DARK_BG)
             
-            self.snake.draw(self.screen)
-            self.food.draw(self.screen)
+            if self.client:
+                status = self.render_remote()
+            else:
+                self.render_board()
+                status = self.score_status()
 
             # 显示分数和速度
-            score_font = pygame.font.SysFont(
-                Config.UI['fonts']['default']['name'],
-                Config.UI['fonts']['sizes']['score']
-            )
-            score_text = score_font.render(
-                f'分数: {self.snake.score} 速度: {self.state.game_speed}', 
-                True, Config.WHITE
-            )
-            self.screen.blit(score_text, (10, 10))
+            score_text = get_font(hud.score_font).render(status, True, Config.WHITE)
+            self.screen.blit(score_text, hud.score_pos)
         
         elif self.state.show_game_over:
             self.screen.fill(Config.DARK_BG)
             # 更新滚动位置并绘制排行榜
-            self.state.leaderboard_scroll = draw_leaderboard(
-                self.screen, 
-                self.score_db, 
-                self.state.leaderboard_scroll
-            )
+            self.draw_scores_panel()
             
             # 显示重新开始提示
-            gameover_font = pygame.font.SysFont(
-                Config.UI['fonts']['default']['name'],
-                Config.UI['fonts']['sizes']['game_over']
-            )
-            restart_text = gameover_font.render("按 3 重新开始游戏", True, Config.WHITE)
-            self.screen.blit(restart_text, (Config.WINDOW_WIDTH//2 - 100, Config.WINDOW_HEIGHT - 50))
+            restart_text = get_font(hud.game_over_font).render("按 3 重新开始游戏", True, Config.WHITE)
+            self.screen.blit(restart_text, hud.restart_pos)
         
         elif self.state.paused:
             # 更新滚动位置并绘制排行榜
-            self.state.leaderboard_scroll = draw_leaderboard(
-                self.screen, 
-                self.score_db, 
-                self.state.leaderboard_scroll
-            )
+            self.draw_scores_panel()
 
         # 在对话框之前绘制按键说明提示
-        hint_font = pygame.font.SysFont(
-            Config.UI['fonts']['default']['name'],
-            Config.UI['fonts']['sizes']['score']
-        )
-        hint_text = hint_font.render("按S键显示按键说明", True, Config.WHITE)
-        self.screen.blit(hint_text, (10, Config.WINDOW_HEIGHT - 30))
+        self.overlays.draw(self.screen, ('hint',), self._build_hint)
         
         # 如果需要显示按键说明
         if self.show_key_help:
@@ -936,44 +1944,180 @@ class Game:
 
         # 如果有退出语录，显示它
         if self.exit_quote:
-            # 创建半透明背景
-            overlay = pygame.Surface((Config.WINDOW_WIDTH, Config.WINDOW_HEIGHT))
-            overlay.fill((0, 0, 0))
-            overlay.set_alpha(200)
-            self.screen.blit(overlay, (0, 0))
-            
-            # 显示语录
-            quote_font = pygame.font.SysFont(
-                Config.UI['fonts']['default']['name'],
-                Config.quotes['font_size']
-            )
-            quote_text = quote_font.render(self.exit_quote, True, Config.WHITE)
-            x = (Config.WINDOW_WIDTH - quote_text.get_width()) // 2
-            y = (Config.WINDOW_HEIGHT - quote_text.get_height()) // 2
-            self.screen.blit(quote_text, (x, y))
+            quote = self.exit_quote
+            self.overlays.draw(self.screen, ('quote', quote, self.screen.get_size()),
+                               lambda: self._build_exit_quote(quote))
 
+    def score_status(self):
+        """状态栏文字：单人显示分数，多人显示每个玩家的分数"""
+        if len(self.players) == 1:
+            return f'分数: {self.snake.score} 速度: {self.state.game_speed}'
+        scores = '  '.join(f'{p.snake.name}: {p.snake.score}' for p in self.players)
+        return f'{scores}  速度: {self.state.game_speed}'
+    
+    def render_board(self):
+        """绘制本地棋盘：摄像机跟随第一个存活的真人玩家，只绘制视口内的格子"""
+        alive = [player.snake for player in self.players if not player.snake.game_over]
+        target = next((p.snake for p in self.players if p.human and not p.snake.game_over), None)
+        if target is not None:
+            self.camera.follow(target.get_head_position())
+        if self.array_renderer:
+            self.array_renderer.draw(self.screen, self.camera,
+                                     [snake.positions[0] for snake in alive], [self.food.position])
+            return
+        heads = {self.board.index(snake.positions[0]): snake.direction for snake in alive}
+        draw_board_view(self.screen, self.board, self.camera, heads)
+        self.food.draw(self.screen, self.camera)
+    
+    def render_remote(self):
+        """绘制服务器发来的最新状态，返回状态栏文字"""
+        state = self.client.state
+        if state is None:
+            return '正在等待服务器...'
+        own = self.client.own_snake()
+        if own is not None:
+            self.camera.follow(own['body'][0])
+        directions = self.client.directions
+        for snake in state['snakes']:
+            draw_snake(self.screen, snake['body'], directions[snake['dir']], self.camera)
+        for position in state['food']:
+            position = self.camera.to_screen(position)
+            if position is not None:
+                draw_food(self.screen, position, Config.RED)
+        if own is None:
+            return f'等待复活... 在线: {len(state["snakes"])}'
+        return f'分数: {own["score"]} 在线: {len(state["snakes"])}'
+    
     def show_exit_quote(self):
         """显示退出语录"""
         if not self.exit_quote:
             self.exit_quote = self.quote_manager.get_random_quote()
-            self.exit_timer = pygame.time.get_ticks()
+            self.scheduler.call_later(Config.quotes['display_time'], self.stop, pausable=False)
+    
+    def stop(self):
+        """结束主循环"""
+        self.state.running = False
+    
+    def is_idle(self):
+        """暂停、游戏结束、显示退出对话框或退出语录时，画面只随输入变化"""
+        return (self.state.paused or self.state.show_game_over
+                or self.dialog.showing or bool(self.exit_quote))
+    
+    def view_state(self):
+        """影响静止画面内容的状态，变化时才需要重新绘制"""
+        return (self.state.paused, self.state.show_game_over, self.state.leaderboard_scroll,
+                self.state.show_stats,
+                self.state.game_speed, self.dialog.showing, self.dialog.selected_button,
+                self.show_key_help, self.exit_quote, self.snake.score)
     
-    def run(self):
-        """运行游戏主循环"""
+    def idle_timeout(self):
+        """空闲等待的最长时间：不超过配置的超时，也不错过下一个定时器"""
+        timeout = Config.IDLE['timeout_ms']
+        delay = self.scheduler.next_delay()
+        if delay is not None:
+            timeout = min(timeout, max(1, delay))  # 0表示无限等待，至少等1毫秒
+        return timeout
+    
+    def wait_for_events(self, timeout_ms):
+        """
+        空闲时阻塞等待事件，最多等待timeout_ms毫秒
+        
+        超时后也会返回（空列表），以便继续补充背景音乐、检查配置变化和执行到期的定时器。
+        窗口被遮挡后重新显示时标记需要重绘。
+        """
+        event = pygame.event.wait(timeout_ms)
+        if event.type == NOEVENT:
+            return []
+        events = [event] + pygame.event.get()
+        if any(e.type in self.EXPOSE_EVENTS for e in events):
+            self.needs_redraw = True
+        return events
+    
+    def present(self):
+        """把渲染好的画面输出到窗口或帧导出/录制"""
+        if self.headless:
+            self.frame_dumper.capture(self.screen)
+        else:
+            pygame.display.update()
+        if self.recorder is not None and not self.state.paused:
+            self.recorder.capture(self.screen)
+        self.frame_count += 1
+    
+    def run(self, record=None):
+        """运行游戏主循环
+        
+        Args:
+            record: 是否录制对局，None表示按配置或--record参数决定
+        """
+        if record is None:
+            record = Config.RECORDING['enabled'] or '--record' in sys.argv
+        self.recording = record
+        self.start_recording()
+        Config.start_watching()
+        
+        max_frames = Config.HEADLESS['max_frames'] if self.headless else 0
+        # 无头模式需要按帧运行，不使用空闲等待
+        idle_enabled = Config.IDLE['enabled'] and not self.headless
         while self.state.running:
-            self.handle_input()
+            if Config.poll():  # 配置文件变化时切换到新的配置快照
+                self.needs_redraw = True
+            if self.resources.poll():  # 窗口缩放后新的精灵已在后台生成好
+                self.create_camera()
+                self.needs_redraw = True
+            
+            # 空闲时阻塞等待输入，只在画面内容变化时重新绘制
+            idle = idle_enabled and self.is_idle()
+            if idle:
+                events = self.wait_for_events(self.idle_timeout())
+            else:
+                events = pygame.event.get()
+            view = self.view_state()
+            self.handle_input(events)
             self.update()
-            self.render()
-            pygame.display.update()
+            if not idle or self.needs_redraw or self.view_state() != view:
+                self.render()
+                self.present()
+                self.needs_redraw = False
             
-            # 检查是否需要退出
-            if self.exit_quote:
-                current_time = pygame.time.get_ticks()
-                if current_time - self.exit_timer >= Config.quotes['display_time']:
-                    self.state.running = False
+            # 无头模式下运行指定帧数后退出
+            if max_frames and self.frame_count >= max_frames:
+                self.state.running = False
             
-            self.clock.tick(self.state.game_speed)
+            if idle or (self.headless and not Config.HEADLESS['limit_fps']):
+                elapsed = self.clock.tick()  # 空闲时已在等待事件；无头模式不限帧率，只统计帧时间
+            elif self.client:
+                elapsed = self.clock.tick(self.client.tick_rate)  # 联机时按服务器的频率刷新
+            else:
+                elapsed = self.clock.tick(self.state.game_speed)
+            
+            # 按这一帧经过的时间推进定时器（退出语录计时、恢复背景音乐等）
+            self.scheduler.paused = self.is_idle()
+            self.scheduler.advance(elapsed)
+        
+        # 等待所有录制文件写完再退出
+        self.finish_recording()
+        for recorder in self.finished_recorders:
+            recorder.wait()
+        self.quote_manager.close()
+        if self.client:
+            self.client.close()
+        if self.savegame:
+            # 走到这里都是正常退出（确认退出、无头模式达到帧数、联机断开等），
+            # 只有崩溃时才保留存档供下次继续
+            self.savegame.discard()
+            self.savegame.close()  # 等待存档线程处理完
+        self.report_input_latency()
+        if self.audio.music_stream:
+            self.audio.music_stream.close()  # 先停止生成背景音乐的线程，再关闭混音器
         pygame.quit()
+    
+    def report_input_latency(self):
+        """打印方向输入从按键到生效的延迟统计"""
+        stats = self.state.direction_queue.latency_stats()
+        if stats:
+            count, mean, p95, worst = stats
+            print(f"输入延迟: 平均 {mean:.0f}ms, P95 {p95}ms, 最大 {worst}ms "
+                  f"(共{count}次, 丢弃{self.state.direction_queue.dropped_count}次)")
 
 if __name__ == '__main__':
     game = Game()
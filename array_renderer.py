@@ -0,0 +1,109 @@
+"""
+数组渲染器
+
+功能：
+- 直接用占用表生成画面：每格一个像素，像素值就是占用者编号
+- 用 pygame.surfarray.blit_array 写入一张8位调色板表面，调色板就是“占用者编号 -> 颜色”的查找表，
+  取色由SDL在转换像素格式时完成；再用一次 transform.scale 放大到窗口
+- 绘制开销与视口内的格子数成正比，全部是整块的数组复制，与蛇的数量和长度无关
+- 适合格子很小、视口内有几十万格的大棋盘；格子较大时精灵渲染更美观
+
+颜色：背景、各条蛇的蛇身（第一条蛇用配置中的绿色，其余按色相均匀分布）、蛇头（白色）、食物。
+"""
+
+import colorsys
+import numpy as np
+import pygame
+
+
+def owner_palette(body_color, background_color):
+    """
+    生成占用者编号到颜色的调色板
+
+    Returns:
+        list: 256个颜色，0号为背景色，1号为 body_color
+    """
+    palette = [tuple(background_color), tuple(body_color)]
+    for owner in range(2, 256):
+        # 黄金比例步进色相，相邻编号的颜色差别明显
+        hue = ((owner - 1) * 0.618034) % 1.0
+        r, g, b = colorsys.hsv_to_rgb(hue, 0.65, 0.9)
+        palette.append((int(r * 255), int(g * 255), int(b * 255)))
+    return palette
+
+
+class ArrayRenderer:
+    """
+    把棋盘在摄像机视口内的部分绘制成一张每格一个像素的图，再放大到窗口
+
+    Args:
+        board: 棋盘占用表
+        cell_size: 放大后每格的像素数
+        colors: 配置快照中的颜色
+    """
+
+    def __init__(self, board, cell_size, colors):
+        self.board = board
+        self.cell_size = cell_size
+        self._size = None
+        self.set_colors(colors)
+        # 占用表是bytearray，这里只是一个(宽, 高)的视图，不复制数据；
+        # surfarray的数组以x为第一维，所以用转置
+        self.cells = np.frombuffer(board.cells, dtype=np.uint8).reshape(
+            board.height, board.width).T
+
+    def set_colors(self, colors):
+        """更新配色（配置热重载时调用）"""
+        self.palette = owner_palette(colors.green, colors.dark_bg)
+        self.head_color = colors.white
+        self.food_color = colors.red
+        if self._size is not None:
+            self._small.set_palette(self.palette)
+            self._scaled.set_palette(self.palette)
+
+    def _allocate(self, width, height):
+        """按视口大小分配复用的表面"""
+        self._size = (width, height)
+        self._small = pygame.Surface((width, height), depth=8)
+        self._small.set_palette(self.palette)
+        self._scaled = pygame.Surface((width * self.cell_size, height * self.cell_size), depth=8)
+        self._scaled.set_palette(self.palette)
+
+    def _visible_cells(self, camera):
+        """取出视口内的占用表（处理穿墙），返回 (视口宽, 视口高) 的数组"""
+        board = self.board
+        cells = self.cells
+        x, y = camera.x, camera.y
+        # 不跨过棋盘边界的方向直接切片（不复制数据），跨过时才按下标取
+        if x + camera.width <= board.width:
+            cells = cells[x:x + camera.width]
+        else:
+            cells = cells.take(np.arange(x, x + camera.width) % board.width, axis=0)
+        if y + camera.height <= board.height:
+            cells = cells[:, y:y + camera.height]
+        else:
+            cells = cells.take(np.arange(y, y + camera.height) % board.height, axis=1)
+        return cells
+
+    def draw(self, surface, camera, heads, food_positions):
+        """
+        绘制视口到 surface 的左上角
+
+        Args:
+            camera: 摄像机（视口大小按本渲染器的格子大小计算）
+            heads: 存活的蛇的蛇头坐标
+            food_positions: 食物坐标
+        """
+        if self._size != (camera.width, camera.height):
+            self._allocate(camera.width, camera.height)
+        pygame.surfarray.blit_array(self._small, self._visible_cells(camera))
+        pygame.transform.scale(self._small, self._scaled.get_size(), self._scaled)
+        surface.blit(self._scaled, (0, 0))
+
+        # 蛇头和食物只有少数几个，放大后逐个填色
+        size = self.cell_size
+        for positions, color in ((heads, self.head_color), (food_positions, self.food_color)):
+            for position in positions:
+                cell = camera.to_screen(position)
+                if cell is not None:
+                    surface.fill(color, (cell[0] * size, cell[1] * size, size, size))
@@ -4,7 +4,7 @@
 功能：
 - 将MP3文件转换为WAV格式
 - 支持单个文件转换
-- 支持整个目录批量转换
+- 支持整个目录批量转换（多进程并行，跳过已是最新的文件）
 - 支持拖拽文件转换
 """
 
@@ -12,6 +12,14 @@ import os
 from pydub import AudioSegment
 import sys
 import json
+import time
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+AUDIO_EXTENSIONS = ('.mp3', '.m4a', '.ogg', '.flac')
+MANIFEST_NAME = '.convert_manifest.json'  # 记录已转换文件的源文件哈希
+USAGE = "用法: python audio_converter.py [--force] [-j 进程数] [文件或目录 ...]"
 
 def load_config():
     """加载配置文件"""
@@ -23,6 +31,19 @@ def load_config():
         print(f"加载配置文件失败: {str(e)}")
         return None
 
+def export_wav_atomic(audio, output_path):
+    """先写入同目录的临时文件再替换，中途失败不会留下不完整的WAV文件"""
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    fd, temp_path = tempfile.mkstemp(suffix='.wav.tmp', dir=output_dir)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            audio.export(f, format='wav')
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
 def convert_to_wav(input_path, output_path=None):
     """
     将音频文件转换为WAV格式
@@ -40,7 +61,7 @@ def convert_to_wav(input_path, output_path=None):
         audio = AudioSegment.from_file(input_path)
         
         # 转换并保存为WAV格式
-        audio.export(output_path, format='wav')
+        export_wav_atomic(audio, output_path)
         print(f"转换��功: {input_path} -> {output_path}")
         return True
     except Exception as e:
@@ -48,13 +69,76 @@ def convert_to_wav(input_path, output_path=None):
         print(f"错误信息: {str(e)}")
         return False
 
-def convert_directory(input_dir, output_dir=None):
+def file_hash(path):
+    """计算文件内容的SHA-1哈希"""
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+def load_manifest(output_dir):
+    """读取输出目录中记录的源文件哈希"""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(output_dir, manifest):
+    """原子地写回源文件哈希记录"""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(temp_path, path)
+
+def is_up_to_date(input_path, output_path, recorded_hash):
+    """
+    判断输出文件是否已是最新
+    
+    输出文件比输入文件新时直接跳过；否则（例如源文件被复制或touch过）
+    再比较源文件哈希与上次转换时记录的哈希。
+    
+    Returns:
+        (是否最新, 计算出的源文件哈希，未计算时为None)
+    """
+    if not os.path.exists(output_path):
+        return False, None
+    if os.path.getmtime(output_path) >= os.path.getmtime(input_path):
+        return True, None
+    if recorded_hash is None:
+        return False, None
+    current_hash = file_hash(input_path)
+    return current_hash == recorded_hash, current_hash
+
+def _convert_job(input_path, output_path):
+    """
+    在工作进程中转换单个文件
+    
+    源文件哈希也在工作进程中计算，主进程只负责汇总结果。
+    
+    Returns:
+        (是否成功, 耗时秒数, 错误信息, 源文件哈希)
+    """
+    start = time.perf_counter()
+    try:
+        source_hash = file_hash(input_path)
+        audio = AudioSegment.from_file(input_path)
+        export_wav_atomic(audio, output_path)
+        return True, time.perf_counter() - start, None, source_hash
+    except Exception as e:
+        return False, time.perf_counter() - start, str(e), None
+
+def convert_directory(input_dir, output_dir=None, workers=None, force=False):
     """
-    转换目录中的所有音频文件
+    并行转换目录中的所有音频文件
     
     Args:
         input_dir: 输入目录
         output_dir: 输出目录（可选）
+        workers: 工作进程数（可选，默认为CPU核数）
+        force: 是否忽略已是最新的判断，全部重新转换
     """
     if output_dir is None:
         output_dir = input_dir
@@ -62,22 +146,55 @@ def convert_directory(input_dir, output_dir=None):
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
-    success_count = 0
-    fail_count = 0
+    manifest = load_manifest(output_dir)
+    jobs = {}
+    skipped_count = 0
     
-    for filename in os.listdir(input_dir):
-        if filename.lower().endswith(('.mp3', '.m4a', '.ogg', '.flac')):
+    for filename in sorted(os.listdir(input_dir)):
+        if filename.lower().endswith(AUDIO_EXTENSIONS):
             input_path = os.path.join(input_dir, filename)
             output_path = os.path.join(output_dir, os.path.splitext(filename)[0] + '.wav')
             
-            if convert_to_wav(input_path, output_path):
-                success_count += 1
-            else:
-                fail_count += 1
+            if not force:
+                up_to_date, current_hash = is_up_to_date(input_path, output_path,
+                                                         manifest.get(filename))
+                if up_to_date:
+                    if current_hash is not None:
+                        os.utime(output_path)  # 内容未变，更新时间后下次只需比较时间
+                    skipped_count += 1
+                    continue
+            jobs[filename] = (input_path, output_path)
+    
+    results = []
+    start = time.perf_counter()
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_convert_job, *paths): filename
+                       for filename, paths in jobs.items()}
+            for future in as_completed(futures):
+                filename = futures[future]
+                ok, elapsed, error, source_hash = future.result()
+                results.append((filename, ok, elapsed))
+                if ok:
+                    manifest[filename] = source_hash
+                    print(f"转换成功: {filename} ({elapsed:.2f}秒)")
+                else:
+                    print(f"转换失败: {filename}")
+                    print(f"错误信息: {error}")
+        save_manifest(output_dir, manifest)
+    total_time = time.perf_counter() - start
+    
+    success_count = sum(1 for _, ok, _ in results if ok)
+    fail_count = len(results) - success_count
     
     print(f"\n转换完成:")
+    for filename, ok, elapsed in sorted(results, key=lambda r: r[2], reverse=True):
+        print(f"  {'成功' if ok else '失败'} {elapsed:7.2f}秒  {filename}")
     print(f"成功: {success_count}")
     print(f"失败: {fail_count}")
+    print(f"跳过(已是最新): {skipped_count}")
+    print(f"总耗时: {total_time:.2f}秒")
+    return success_count, fail_count, skipped_count
 
 def convert_for_game():
     """转换游戏所需的音频文件"""
@@ -107,12 +224,29 @@ def convert_for_game():
 def main():
     """主函数"""
     # 如果有命令行参数（拖拽文件）
-    if len(sys.argv) > 1:
-        for path in sys.argv[1:]:
+    # 可选参数：--force 全部重新转换，-j N 指定工作进程数
+    args = sys.argv[1:]
+    force = '--force' in args
+    workers = None
+    if '-j' in args:
+        index = args.index('-j')
+        try:
+            workers = int(args[index + 1])
+        except (IndexError, ValueError):
+            workers = 0
+        if workers < 1:
+            print("-j 需要一个正整数")
+            print(USAGE)
+            return
+        del args[index:index + 2]
+    paths = [arg for arg in args if arg != '--force']
+    
+    if paths:
+        for path in paths:
             if os.path.isfile(path):
                 convert_to_wav(path)
             elif os.path.isdir(path):
-                convert_directory(path)
+                convert_directory(path, workers=workers, force=force)
     else:
         # 交互式模式
         print("音频格式转换工具")
@@ -0,0 +1,226 @@
+"""
+自动驾驶模块
+
+功能：
+- 沿预先计算好的哈密顿回路行走，保证蛇永远不会撞到自己
+- 在安全时用A*寻路走捷径，更快吃到食物
+- 每个游戏刻的规划有固定的时间预算，超时立即退回沿回路行走
+- 棋盘两边都是奇数、无法构造回路时，退回BFS加可达区域判断的贪心策略
+
+用于长时间自动对局的压力测试（渲染、录制、分数持久化）以及作为基准负载。
+"""
+
+import time
+import heapq
+from array import array
+from board import EMPTY
+
+
+def hamiltonian_cycle(width, height):
+    """
+    构造一条经过棋盘所有格子的回路
+
+    高度为偶数时：第0行从左走到右，其余各行在第1~width-1列之间来回折返，
+    最后沿第0列向上回到起点。宽度为偶数时转置构造。两边都是奇数时返回None。
+
+    Returns:
+        list: 按行走顺序排列的 (x, y) 坐标；无法构造时返回 None
+    """
+    if width < 2 or height < 2:
+        return None
+    if height % 2:
+        if width % 2:
+            return None
+        return [(x, y) for y, x in hamiltonian_cycle(height, width)]
+
+    cycle = [(x, 0) for x in range(width)]
+    for y in range(1, height):
+        columns = range(width - 1, 0, -1) if y % 2 else range(1, width)
+        cycle.extend((x, y) for x in columns)
+    cycle.extend((0, y) for y in range(height - 1, 0, -1))
+    return cycle
+
+
+class Autopilot:
+    """
+    自动驾驶规划器
+
+    捷径的安全条件（蛇身始终按回路顺序排列在蛇头之后）：
+    - 目标格空闲
+    - 沿回路从蛇头到目标格的距离小于到蛇尾的距离减去余量（尚未长出的长度和随长度增加的缓冲）
+    - 沿回路看不越过食物
+    - 蛇身占满棋盘的比例超过 max_shortcut_fill 后不再走捷径
+
+    cycle=False 时不构造回路，只使用贪心策略（多条蛇共用棋盘时回路无法保证安全）。
+    """
+
+    def __init__(self, board, time_budget_ms=2.0, shortcuts=True, max_shortcut_fill=0.5,
+                 cycle=True):
+        self.board = board
+        self.time_budget = time_budget_ms / 1000.0
+        self.shortcuts = shortcuts
+        self.max_shortcut_fill = max_shortcut_fill
+        self.timeouts = 0  # 超出时间预算的次数
+
+        size = board.size
+        path = hamiltonian_cycle(board.width, board.height) if cycle else None
+        if path is None:
+            if cycle:
+                print(f"{board.width}x{board.height} 的棋盘无法构造哈密顿回路，自动驾驶使用贪心策略")
+            self.order = None
+        else:
+            # order[i]: 格子i在回路中的序号；cycle_next[i]: 回路中的下一个格子
+            self.order = array('i', bytes(4 * size))
+            self.cycle_next = array('i', bytes(4 * size))
+            indices = [board.index(p) for p in path]
+            for n, i in enumerate(indices):
+                self.order[i] = n
+                self.cycle_next[i] = indices[(n + 1) % size]
+
+        # A* 用的临时数组，与Board一样用标记戳避免每次清空
+        self._stamp = 0
+        self._seen = array('I', bytes(4 * size))
+        self._cost = array('i', bytes(4 * size))
+        self._first = array('i', bytes(4 * size))
+
+    def cycle_distance(self, a, b):
+        """沿回路从格子a走到格子b需要的步数（一维下标）"""
+        return (self.order[b] - self.order[a]) % self.board.size
+
+    def next_direction(self, snake, food):
+        """
+        规划下一步的方向
+
+        Args:
+            snake: 当前的蛇（其身体已登记在棋盘上）
+            food: 食物坐标
+        Returns:
+            tuple: 方向；无路可走时返回None
+        """
+        deadline = time.perf_counter() + self.time_budget
+        board = self.board
+        head_pos = snake.positions[0]
+        if self.order is None:
+            return self._greedy(snake, food)
+
+        head = board.index(head_pos)
+        choice = self.cycle_next[head]
+        if self.shortcuts and len(snake.positions) < self.max_shortcut_fill * board.size:
+            shortcut = self._shortcut(snake, head, board.index(food), deadline)
+            if shortcut is not None:
+                choice = shortcut
+
+        if board.cells[choice] != EMPTY:
+            # 中途接管时蛇身可能不在回路上，沿回路的下一格被占用就改用贪心策略
+            return self._greedy(snake, food)
+        return board.direction_between(head_pos, board.position(choice))
+
+    def _shortcut(self, snake, head, food, deadline):
+        """返回一个安全的捷径格，没有时返回None"""
+        board = self.board
+        if len(snake.positions) > 1:
+            tail_distance = self.cycle_distance(head, board.index(snake.positions[-1]))
+        else:
+            tail_distance = board.size
+        # 蛇头与蛇尾之间的空位会随进食减少，捷径按蛇身长度多留一些余量
+        pending = snake.length - len(snake.positions)
+        margin = pending + 1 + len(snake.positions) // 8
+        limit = min(tail_distance - margin, self.cycle_distance(head, food) + 1)
+
+        def safe(cell):
+            # 沿回路看，捷径不能越过蛇尾（留出待长的长度），也不能越过食物
+            return board.cells[cell] == EMPTY and 0 < self.cycle_distance(head, cell) < limit
+
+        # 优先采用A*最短路径的第一步
+        first = self._astar_first_step(head, food, deadline)
+        if first is not None and safe(first):
+            return first
+
+        # 否则选一个沿回路前进最多的安全相邻格
+        best, best_distance = None, 1
+        for n in board.neighbours[head]:
+            distance = self.cycle_distance(head, n)
+            if distance > best_distance and safe(n):
+                best, best_distance = n, distance
+        return best
+
+    def _astar_first_step(self, start, goal, deadline):
+        """
+        在环形棋盘上用A*寻找通往goal的路径，返回路径的第一步
+
+        启发函数为考虑穿墙的曼哈顿距离。超出时间预算时放弃并返回None。
+        """
+        if start == goal:
+            return None
+        board = self.board
+        width, height = board.width, board.height
+        cells = board.cells
+        neighbours = board.neighbours
+        gx, gy = goal % width, goal // width
+
+        def heuristic(i):
+            dx = abs(i % width - gx)
+            dy = abs(i // width - gy)
+            return min(dx, width - dx) + min(dy, height - dy)
+
+        self._stamp += 1
+        stamp = self._stamp
+        seen, cost, first = self._seen, self._cost, self._first
+        seen[start] = stamp
+        cost[start] = 0
+
+        heap = []
+        for n in neighbours[start]:
+            if n == goal:
+                return n
+            if cells[n] == EMPTY and seen[n] != stamp:
+                seen[n] = stamp
+                cost[n] = 1
+                first[n] = n
+                heapq.heappush(heap, (1 + heuristic(n), 1, n))
+
+        expanded = 0
+        while heap:
+            _, g, current = heapq.heappop(heap)
+            if g > cost[current]:
+                continue
+            expanded += 1
+            if expanded & 63 == 0 and time.perf_counter() > deadline:
+                self.timeouts += 1
+                return None
+            g += 1
+            for n in neighbours[current]:
+                if n == goal:
+                    return first[current]
+                if cells[n] != EMPTY or (seen[n] == stamp and cost[n] <= g):
+                    continue
+                seen[n] = stamp
+                cost[n] = g
+                first[n] = first[current]
+                heapq.heappush(heap, (g + heuristic(n), g, n))
+        return None
+
+    def _greedy(self, snake, food):
+        """
+        贪心策略：朝食物的最短路径走，前提是走过去后可达区域容得下蛇身；
+        否则走向可达区域最大的相邻格
+        """
+        board = self.board
+        head = snake.positions[0]
+        moves = board.free_neighbours(head)
+        if not moves:
+            return None
+
+        needed = len(snake.positions)
+        direction = board.direction_to(head, food)
+        if direction is not None:
+            target = board.step(head, direction)
+            if board.is_free(target) and board.flood_fill(target, needed) >= needed:
+                return direction
+
+        best, best_area = None, -1
+        for direction, pos in moves:
+            area = board.flood_fill(pos, needed)
+            if area > best_area:
+                best, best_area = direction, area
+        return best
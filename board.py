@@ -0,0 +1,245 @@
+"""
+棋盘查询模块
+
+功能：
+- 维护一张占用表（每格一个字节，记录占用该格的蛇编号），蛇移动时增量更新
+- 提供给机器人和分析工具使用的查询：格子是否空闲、空闲邻格、可达区域、最短路径
+- 棋盘是环形的（穿墙），邻接表在创建时预先计算
+- 洪水填充和BFS复用预先分配的临时数组，用“标记戳”代替每次清空访问表
+- 多条蛇同时移动时的碰撞结算（联机服务器和本地多人共用）
+"""
+
+from array import array
+
+# 占用表中的取值：0 表示空闲，1~255 为蛇的编号
+EMPTY = 0
+
+# 邻格顺序与方向一一对应
+DIRECTIONS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
+
+class Board:
+    """
+    环形棋盘的占用表
+
+    格子用一维下标 index = y * width + x 表示：
+    - cells: bytearray，记录每格的占用者编号
+    - neighbours: 每格四个邻格的下标（顺序同 DIRECTIONS），已处理穿墙
+    查询方法同时接受 (x, y) 坐标，返回值也使用坐标，方便直接与 Snake.positions 比较。
+    """
+
+    # 每格一个字节，编号255留作保留值，同一棋盘上最多容纳254条蛇
+    MAX_OWNER = 254
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.cells = bytearray(self.size)
+        self.occupied_count = 0
+
+        self.neighbours = []
+        for y in range(height):
+            for x in range(width):
+                self.neighbours.append(tuple(
+                    ((y + dy) % height) * width + (x + dx) % width
+                    for dx, dy in DIRECTIONS
+                ))
+
+        # 查询用的临时数组：visited[i] == stamp 表示本次查询已访问
+        self._stamp = 0
+        self._visited = array('I', bytes(4 * self.size))
+        self._parent = array('i', bytes(4 * self.size))
+        self._queue = array('i', bytes(4 * self.size))
+
+    def index(self, pos):
+        return pos[1] * self.width + pos[0]
+
+    def position(self, index):
+        return (index % self.width, index // self.width)
+
+    # ---- 占用表维护 ----
+
+    def occupy(self, pos, owner):
+        """把格子标记为被 owner 占用"""
+        i = pos[1] * self.width + pos[0]
+        if self.cells[i] == EMPTY:
+            self.occupied_count += 1
+        self.cells[i] = owner
+
+    def release(self, pos, owner):
+        """释放格子；只有当前占用者是 owner 时才清空，避免误删其他蛇的格子"""
+        i = pos[1] * self.width + pos[0]
+        if self.cells[i] == owner:
+            self.cells[i] = EMPTY
+            self.occupied_count -= 1
+
+    def clear(self):
+        self.cells[:] = bytes(self.size)
+        self.occupied_count = 0
+
+    def resolve_moves(self, moves):
+        """
+        同时结算多条蛇这一刻的移动
+
+        所有判断都基于移动前的占用表，规则与单人游戏一致：
+        - 目标格已被任何蛇占用（包括蛇尾）时撞死
+        - 两条及以上的蛇进入同一个格子时全部撞死（迎面相撞）
+        互相进入对方蛇头所在格子的情况由第一条规则覆盖。
+        只遍历一次移动列表，用字典记录每个目标格的第一个进入者，整体为 O(N)。
+
+        Args:
+            moves: [(编号, 目标坐标), ...]
+        Returns:
+            set: 撞死的蛇的编号
+        """
+        cells = self.cells
+        width = self.width
+        claims = {}
+        dead = set()
+        for owner, (x, y) in moves:
+            i = y * width + x
+            if cells[i] != EMPTY:
+                dead.add(owner)
+            first = claims.setdefault(i, owner)
+            if first != owner:
+                dead.add(owner)
+                dead.add(first)
+        return dead
+
+    # ---- 查询 ----
+
+    def owner_at(self, pos):
+        return self.cells[pos[1] * self.width + pos[0]]
+
+    def is_free(self, pos):
+        return self.cells[pos[1] * self.width + pos[0]] == EMPTY
+
+    def step(self, pos, direction):
+        """按方向移动一格（穿墙）"""
+        return ((pos[0] + direction[0]) % self.width, (pos[1] + direction[1]) % self.height)
+
+    def free_neighbours(self, pos):
+        """
+        返回与 pos 相邻的空闲格
+
+        Returns:
+            list: [(方向, 坐标), ...]，方向顺序同 DIRECTIONS
+        """
+        cells = self.cells
+        width = self.width
+        result = []
+        for direction, n in zip(DIRECTIONS, self.neighbours[pos[1] * width + pos[0]]):
+            if cells[n] == EMPTY:
+                result.append((direction, (n % width, n // width)))
+        return result
+
+    def _next_stamp(self):
+        self._stamp += 1
+        if self._stamp >= 0xFFFFFFFF:
+            # 标记戳用尽时清空访问表，重新计数
+            self._visited = array('I', bytes(4 * self.size))
+            self._stamp = 1
+        return self._stamp
+
+    def flood_fill(self, start, limit=None):
+        """
+        计算从 start 出发能到达的空闲格数量
+
+        start 本身可以是被占用的格子（例如蛇头），它不计入结果。
+
+        Args:
+            start: 起点坐标
+            limit: 数到这么多格就提前停止（只关心“够不够大”时可以省时间）
+        Returns:
+            int: 可达的空闲格数量
+        """
+        stamp = self._next_stamp()
+        visited = self._visited
+        queue = self._queue
+        cells = self.cells
+        neighbours = self.neighbours
+        if limit is None:
+            limit = self.size
+
+        s = start[1] * self.width + start[0]
+        visited[s] = stamp
+        queue[0] = s
+        head, tail = 0, 1
+        count = 0
+        while head < tail:
+            for n in neighbours[queue[head]]:
+                if visited[n] != stamp and cells[n] == EMPTY:
+                    visited[n] = stamp
+                    queue[tail] = n
+                    tail += 1
+                    count += 1
+                    if count >= limit:
+                        return count
+            head += 1
+        return count
+
+    def shortest_path(self, start, goal):
+        """
+        在环形棋盘上用BFS求 start 到 goal 的最短路径
+
+        路径只经过空闲格，goal 本身被占用时也可以作为终点。
+
+        Returns:
+            list: 不含起点、以 goal 结尾的坐标列表；不可达时返回 None
+        """
+        width = self.width
+        s = start[1] * width + start[0]
+        g = goal[1] * width + goal[0]
+        if s == g:
+            return []
+
+        stamp = self._next_stamp()
+        visited = self._visited
+        parent = self._parent
+        queue = self._queue
+        cells = self.cells
+        neighbours = self.neighbours
+
+        visited[s] = stamp
+        queue[0] = s
+        head, tail = 0, 1
+        while head < tail:
+            current = queue[head]
+            head += 1
+            for n in neighbours[current]:
+                if visited[n] == stamp:
+                    continue
+                if n == g:
+                    parent[n] = current
+                    path = []
+                    while n != s:
+                        path.append((n % width, n // width))
+                        n = parent[n]
+                    path.reverse()
+                    return path
+                if cells[n] == EMPTY:
+                    visited[n] = stamp
+                    parent[n] = current
+                    queue[tail] = n
+                    tail += 1
+        return None
+
+    def direction_to(self, start, goal):
+        """返回从 start 走向 goal 的第一步方向；不可达时返回 None"""
+        path = self.shortest_path(start, goal)
+        if not path:
+            return None
+        return self.direction_between(start, path[0])
+
+    def direction_between(self, a, b):
+        """返回相邻两格 a→b 的方向（考虑穿墙）"""
+        dx = (b[0] - a[0]) % self.width
+        dy = (b[1] - a[1]) % self.height
+        if dx == 1:
+            return (1, 0)
+        if dx == self.width - 1:
+            return (-1, 0)
+        if dy == 1:
+            return (0, 1)
+        return (0, -1)
@@ -0,0 +1,92 @@
+"""
+摄像机（视口）
+
+功能：
+- 逻辑棋盘可以比窗口大，窗口只显示从摄像机原点开始的一块区域
+- 摄像机跟随蛇头：蛇头离视口边缘少于 margin 格时才滚动，不会每走一步都整屏移动
+- 棋盘是环形的，视口可以跨过棋盘边界，坐标换算都按取模处理
+- 某个方向上棋盘不比窗口大时，该方向不滚动，画面与固定棋盘时完全相同
+
+坐标约定：棋盘坐标 (x, y) 为格子在逻辑棋盘上的位置，视口坐标为格子在窗口中的位置，
+两者都以格为单位，乘以格子大小才是像素。
+"""
+
+
+class Camera:
+    """
+    环形棋盘上的视口
+
+    Attributes:
+        x, y: 视口左上角对应的棋盘坐标
+        width, height: 视口的格子数（不超过棋盘大小）
+    """
+
+    def __init__(self, view_width, view_height, board_width, board_height, margin=0):
+        self.board_width = board_width
+        self.board_height = board_height
+        self.width = min(view_width, board_width)
+        self.height = min(view_height, board_height)
+        # 余量不能超过视口的一半，否则蛇头没有可以停留的位置
+        self.margin_x = max(0, min(margin, (self.width - 1) // 2))
+        self.margin_y = max(0, min(margin, (self.height - 1) // 2))
+        self.x = 0
+        self.y = 0
+
+    @property
+    def scrolling(self):
+        """棋盘是否比视口大（需要滚动）"""
+        return self.width < self.board_width or self.height < self.board_height
+
+    def center_on(self, pos):
+        """把视口中心移到 pos（新一局开始时使用）"""
+        if self.width < self.board_width:
+            self.x = (pos[0] - self.width // 2) % self.board_width
+        if self.height < self.board_height:
+            self.y = (pos[1] - self.height // 2) % self.board_height
+
+    def follow(self, pos):
+        """蛇头离开视口中间的安全区域时，滚动到刚好把它放回区域边缘"""
+        self.x = self._follow_axis(pos[0], self.x, self.width, self.board_width, self.margin_x)
+        self.y = self._follow_axis(pos[1], self.y, self.height, self.board_height, self.margin_y)
+
+    @staticmethod
+    def _follow_axis(p, origin, size, board_size, margin):
+        if size >= board_size:
+            return 0
+        offset = (p - origin) % board_size
+        if margin <= offset < size - margin:
+            return origin
+        # 蛇头在安全区域外：看它离左（上）边界近还是离右（下）边界近
+        low_gap = (origin + margin - p) % board_size
+        high_gap = (p - (origin + size - 1 - margin)) % board_size
+        if low_gap <= high_gap:
+            return (p - margin) % board_size
+        return (p - size + 1 + margin) % board_size
+
+    def to_screen(self, pos):
+        """棋盘坐标转换为视口坐标；不在视口内时返回None"""
+        dx = (pos[0] - self.x) % self.board_width
+        dy = (pos[1] - self.y) % self.board_height
+        if dx >= self.width or dy >= self.height:
+            return None
+        return (dx, dy)
+
+    def rows(self):
+        """依次返回视口每一行的 (视口行号, 棋盘行号)"""
+        for dy in range(self.height):
+            yield dy, (self.y + dy) % self.board_height
+
+    def column_spans(self):
+        """
+        视口在一行中覆盖的棋盘列
+
+        视口跨过棋盘右边界时分成两段。
+
+        Returns:
+            list: [(视口起始列, 棋盘起始列, 列数), ...]
+        """
+        first = min(self.width, self.board_width - self.x)
+        spans = [(0, self.x, first)]
+        if first < self.width:
+            spans.append((first, 0, self.width - first))
+        return spans
@@ -0,0 +1,812 @@
+"""
+游戏配置模块
+
+负责：
+- 读取并校验 config.json
+- 生成只读的配置快照，预先计算好绘制时需要的位置、颜色和字体
+- 监视配置文件变化，在主循环中原子地切换到新快照（热重载）
+- 只通知依赖发生变化的配置段的缓存失效
+- 把解析好的快照缓存为二进制文件，配置未变化时启动只需一次读取
+"""
+
+import os
+import sys
+import json
+import time
+import copy
+import pickle
+import hashlib
+import threading
+from typing import NamedTuple, Tuple
+
+
+CONFIG_FILE = 'config.json'
+CACHE_FILE = '.config.cache'
+
+# 热重载时不切换、重启游戏后才生效的 game 配置项
+RESTART_GAME_KEYS = ('board_width', 'board_height')
+
+Color = Tuple[int, int, int]
+Rect = Tuple[int, int, int, int]
+
+
+class ConfigError(ValueError):
+    """配置文件内容无效"""
+
+
+class FontSpec(NamedTuple):
+    """字体描述，同时作为字体缓存的键"""
+    name: str
+    fallback: str
+    size: int
+
+
+class WindowSettings(NamedTuple):
+    width: int
+    height: int
+    grid_size: int
+    grid_width: int
+    grid_height: int
+    title: str
+    resizable: bool  # 窗口能否拖动缩放
+    sprite_cache_size: int  # 缓存几种格子大小的精灵
+
+
+class GameSettings(NamedTuple):
+    min_speed: int
+    max_speed: int
+    default_speed: int
+    input_queue_size: int
+    input_max_age_ms: int
+    board_width: int  # 逻辑棋盘的格子数，可以比窗口大
+    board_height: int
+    camera_margin: int  # 蛇头离视口边缘少于这么多格时摄像机滚动
+
+
+class Colors(NamedTuple):
+    white: Color
+    red: Color
+    green: Color
+    black: Color
+    dark_green: Color
+    light_green: Color
+    dark_bg: Color
+    grid_color: Color
+    gray: Color
+
+
+class LeaderboardLayout(NamedTuple):
+    width: int
+    height: int
+    x: int
+    y: int
+    opacity: int
+    spacing: int
+    title_y: int
+    first_item_y: int
+    content_base: int  # 排行榜内容总高度中与条目数无关的部分
+    item_padding: int
+    background_color: Color
+    title_font: FontSpec
+    item_font: FontSpec
+    stats_players: int  # 玩家统计中最多显示的玩家数
+    stats_days: int  # 玩家统计中显示最近几天的每日最佳
+
+
+class DialogLayout(NamedTuple):
+    width: int
+    height: int
+    x: int
+    y: int
+    opacity: int
+    background_color: Color
+    font: FontSpec
+    text: str
+    text_y: int
+    yes_text: str
+    no_text: str
+    yes_button: Rect
+    no_button: Rect
+
+
+class KeyHelpLayout(NamedTuple):
+    width: int
+    height: int
+    x: int
+    y: int
+    opacity: int
+    background_color: Color
+    title_font: FontSpec
+    text_font: FontSpec
+    title: str
+    title_y: int
+    items: Tuple[str, ...]
+    items_x: int
+    items_y: int
+    spacing: int
+
+
+class HudLayout(NamedTuple):
+    score_font: FontSpec
+    score_pos: Tuple[int, int]
+    hint_pos: Tuple[int, int]
+    game_over_font: FontSpec
+    restart_pos: Tuple[int, int]
+    quote_font: FontSpec
+
+
+class SpriteGeometry(NamedTuple):
+    """生成精灵图片用到的几何尺寸，只与网格大小有关"""
+    cell: int
+    cell_center: Tuple[int, int]
+    cell_radius: int
+    body_size: int
+    body_center: Tuple[int, int]
+    body_radius: int
+    body_highlight: Tuple[int, int]
+    food_leaf: Rect
+    highlight: Tuple[int, int]
+    eyes: Tuple[Tuple[str, Tuple[Tuple[int, int], ...]], ...]
+
+
+class ConfigSnapshot(NamedTuple):
+    """
+    某一时刻的完整配置（只读）
+
+    各字段即配置段，热重载时按字段比较新旧快照，只有发生变化的段才会通知订阅者。
+    raw 保存原始的json字典，供还没有类型化的配置段使用，不应修改。
+    """
+    window: WindowSettings
+    game: GameSettings
+    colors: Colors
+    leaderboard: LeaderboardLayout
+    dialog: DialogLayout
+    key_help: KeyHelpLayout
+    hud: HudLayout
+    sprites: SpriteGeometry
+    raw: dict
+
+
+# 没有类型化的配置段的默认值：缺少的配置段或配置项使用默认值，已有的配置项必须与默认值类型相同
+# （默认值为浮点数的配置项也接受整数）。quotes.items 没有默认值，在 build_snapshot 中单独校验。
+SECTION_DEFAULTS = {
+    'directions': {'up': [0, -1], 'down': [0, 1], 'left': [-1, 0], 'right': [1, 0]},
+    'resources': {'directory': 'resources', 'db_name': 'snake_scores.db'},
+    'audio': {
+        'directory': 'sounds',
+        'volume': 0.5,
+        'sounds': {'background': 'background.wav', 'death': 'death.wav',
+                   'button': 'button.wav', 'eat': 'eat.wav'},
+        'channels': {'total': 16, 'reserved': {'death': 1, 'eat': 2, 'button': 1}},
+        'min_interval': {'eat': 60, 'button': 40},
+        'burst_gain': 0.25,
+        'music': {'mode': 'procedural', 'chunk_ms': 500, 'buffer_chunks': 3},
+    },
+    'quotes': {
+        'file': 'quotes.txt',
+        'display_time': 3000,
+        'font_size': 24,
+        'log': {'rotate': 'size', 'max_bytes': 65536, 'backup_count': 5, 'buffer_size': 16},
+        'selection': {'no_repeat': 3, 'history_weighting': True, 'weights': []},
+    },
+    'idle': {'enabled': True, 'timeout_ms': 200},
+    'hot_reload': {'enabled': True, 'interval_ms': 1000},
+    'headless': {'enabled': False, 'frame_dir': 'frames', 'dump_interval': 0,
+                 'dump_format': 'png', 'max_frames': 0, 'limit_fps': False},
+    'recording': {'enabled': False, 'format': 'auto', 'output_dir': 'recordings',
+                  'queue_size': 32, 'fps': 0, 'gif_scale': 2, 'keep_top': 10},
+    'autopilot': {'enabled': False, 'time_budget_ms': 2.0, 'shortcuts': True,
+                  'max_shortcut_fill': 0.5, 'auto_restart': True},
+    'players': {
+        'local': [{'name': 'Player',
+                   'keys': {'up': 'up', 'down': 'down', 'left': 'left', 'right': 'right'}}],
+        'bots': 0,
+        'bot_name': '电脑',
+    },
+    'server': {'host': '127.0.0.1', 'port': 8765, 'spectator_port': 8766,
+               'keyframe_interval': 100, 'tick_rate': 20, 'width': 0, 'height': 0,
+               'food_count': 5, 'max_players': 200, 'respawn_ticks': 40,
+               'max_buffer_kb': 256, 'player_name': 'Player'},
+    'renderer': {'mode': 'sprites', 'cell_size': 4},
+    'maintenance': {'archive_days': 90, 'keep_top': 100, 'archive_file': '',
+                    'batch_size': 5000, 'vacuum_pages': 0},
+    'savegame': {'enabled': True, 'interval_ticks': 50, 'file': 'savegame.bin', 'resume': True},
+}
+
+# 类型化的配置段中后来新增的配置项的默认值：旧的配置文件没有这些项时同样用默认值补全，
+# 不会因为缺少配置项而无法启动。配置段中原有的配置项仍然是必需的。
+ADDED_KEY_DEFAULTS = {
+    'window': {'resizable': True, 'sprite_cache_size': 4},
+    'game': {'input_queue_size': 3, 'input_max_age_ms': 600, 'board_width': 0, 'board_height': 0,
+             'camera_margin': 8},
+    'ui': {'leaderboard': {'stats_players': 10, 'stats_days': 7}},
+}
+
+
+def _with_defaults(value, default, path):
+    """用默认值补全缺少的配置项，并检查已有配置项的类型"""
+    if isinstance(default, dict):
+        if not isinstance(value, dict):
+            raise ConfigError(f"{path} 必须是对象")
+        merged = dict(value)
+        for key, default_value in default.items():
+            if key in value:
+                merged[key] = _with_defaults(value[key], default_value, f"{path}.{key}")
+            else:
+                merged[key] = copy.deepcopy(default_value)
+        return merged
+    if isinstance(default, bool):
+        valid = isinstance(value, bool)
+    elif isinstance(default, int):
+        valid = isinstance(value, int) and not isinstance(value, bool)
+    elif isinstance(default, float):
+        valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+    else:
+        valid = isinstance(value, type(default))
+    if not valid:
+        expected = json.dumps(default, ensure_ascii=False)
+        raise ConfigError(f"{path} 的类型无效（应与默认值 {expected} 相同）")
+    return value
+
+
+def _get(section, key, path):
+    try:
+        return section[key]
+    except (KeyError, TypeError):
+        raise ConfigError(f"缺少配置项: {path}.{key}")
+
+
+def _int(section, key, path, minimum=None, maximum=None):
+    value = _get(section, key, path)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ConfigError(f"{path}.{key} 必须是整数")
+    if minimum is not None and value < minimum:
+        raise ConfigError(f"{path}.{key} 不能小于 {minimum}")
+    if maximum is not None and value > maximum:
+        raise ConfigError(f"{path}.{key} 不能大于 {maximum}")
+    return value
+
+
+def _str(section, key, path):
+    value = _get(section, key, path)
+    if not isinstance(value, str):
+        raise ConfigError(f"{path}.{key} 必须是字符串")
+    return value
+
+
+def _bool(section, key, path):
+    value = _get(section, key, path)
+    if not isinstance(value, bool):
+        raise ConfigError(f"{path}.{key} 必须是true或false")
+    return value
+
+
+def _color(section, key, path):
+    value = _get(section, key, path)
+    if (not isinstance(value, list) or len(value) != 3
+            or not all(isinstance(c, int) and 0 <= c <= 255 for c in value)):
+        raise ConfigError(f"{path}.{key} 必须是三个0-255之间的整数")
+    return tuple(value)
+
+
+def _font(raw_ui, size):
+    default = _get(_get(raw_ui, 'fonts', 'ui'), 'default', 'ui.fonts')
+    return FontSpec(_str(default, 'name', 'ui.fonts.default'),
+                    _str(default, 'fallback', 'ui.fonts.default'),
+                    size)
+
+
+def sprite_geometry(cell):
+    """计算边长为cell像素的格子中各精灵的几何尺寸"""
+    body = cell - 4
+    near = round(cell * 0.3)  # 眼睛位置，20像素格子时为6和14
+    far = round(cell * 0.7)
+    return SpriteGeometry(
+        cell=cell,
+        cell_center=(cell // 2, cell // 2),
+        cell_radius=cell // 2 - 1,
+        body_size=body,
+        body_center=(body // 2, body // 2),
+        body_radius=body // 2 - 1,
+        body_highlight=(body // 3, body // 3),
+        food_leaf=(cell // 2 - 2, 2, 4, 6),
+        highlight=(cell // 3, cell // 3),
+        eyes=(
+            ('up', ((near, near), (far, near))),
+            ('down', ((near, far), (far, far))),
+            ('left', ((near, near), (near, far))),
+            ('right', ((far, near), (far, far))),
+        ),
+    )
+
+
+def _fit(offset, length, size, configured):
+    """面板在长度为size的窗口中的(位置, 长度)：保持相对窗口中心的偏移，放不下时缩小并移回窗口内"""
+    length = min(length, size)
+    return max(0, min(offset + (size - configured) // 2, size - length)), length
+
+
+def derive_layouts(raw, size):
+    """
+    按窗口大小计算排行榜、对话框、按键说明和HUD的布局
+
+    启动时按配置的窗口大小计算；窗口缩放后用实际大小重新计算（见 Config.resize_window）。
+    面板比窗口大时缩小到窗口大小。
+
+    Returns:
+        (LeaderboardLayout, DialogLayout, KeyHelpLayout, HudLayout)
+    """
+    width, height = size
+    window_raw = _get(raw, 'window', 'config')
+    window_width = _int(window_raw, 'width', 'window', 1)
+    window_height = _int(window_raw, 'height', 'window', 1)
+    ui = _get(raw, 'ui', 'config')
+    sizes = _get(_get(ui, 'fonts', 'ui'), 'sizes', 'ui.fonts')
+
+    board = _get(ui, 'leaderboard', 'ui')
+    title_spacing = _int(board, 'title_spacing', 'ui.leaderboard', 0)
+    # 偏移量是在配置的窗口大小下给出的，其他窗口大小下保持相对窗口中心的位置
+    board_x, board_width = _fit(_int(board, 'x_offset', 'ui.leaderboard'),
+                                _int(board, 'width', 'ui.leaderboard', 1), width, window_width)
+    board_y, board_height = _fit(_int(board, 'y_offset', 'ui.leaderboard'),
+                                 _int(board, 'height', 'ui.leaderboard', 1), height, window_height)
+    leaderboard = LeaderboardLayout(
+        width=board_width,
+        height=board_height,
+        x=board_x,
+        y=board_y,
+        opacity=_int(board, 'opacity', 'ui.leaderboard', 0, 255),
+        spacing=_int(board, 'spacing', 'ui.leaderboard', 1),
+        title_y=20,
+        first_item_y=title_spacing + 20,
+        content_base=title_spacing + 40,
+        item_padding=_int(board, 'item_padding', 'ui.leaderboard', 0),
+        background_color=_color(board, 'background_color', 'ui.leaderboard'),
+        title_font=_font(ui, _int(sizes, 'leaderboard_title', 'ui.fonts.sizes', 1)),
+        item_font=_font(ui, _int(sizes, 'leaderboard_item', 'ui.fonts.sizes', 1)),
+        stats_players=_int(board, 'stats_players', 'ui.leaderboard', 0),
+        stats_days=_int(board, 'stats_days', 'ui.leaderboard', 0),
+    )
+
+    dialog_raw = _get(ui, 'dialog', 'ui')
+    dialog_width = min(_int(dialog_raw, 'width', 'ui.dialog', 1), width)
+    dialog_height = min(_int(dialog_raw, 'height', 'ui.dialog', 1), height)
+    button_width = _int(dialog_raw, 'button_width', 'ui.dialog', 1)
+    button_height = _int(dialog_raw, 'button_height', 'ui.dialog', 1)
+    button_spacing = _int(dialog_raw, 'button_spacing', 'ui.dialog', 0)
+    dialog_x = (width - dialog_width) // 2
+    dialog_y = (height - dialog_height) // 2
+    button_y = dialog_y + dialog_height - button_height - 20
+    dialog = DialogLayout(
+        width=dialog_width,
+        height=dialog_height,
+        x=dialog_x,
+        y=dialog_y,
+        opacity=_int(dialog_raw, 'opacity', 'ui.dialog', 0, 255),
+        background_color=_color(dialog_raw, 'background_color', 'ui.dialog'),
+        font=_font(ui, _int(dialog_raw, 'text_size', 'ui.dialog', 1)),
+        text=_str(dialog_raw, 'text', 'ui.dialog'),
+        text_y=dialog_y + 30,
+        yes_text=_str(dialog_raw, 'yes_text', 'ui.dialog'),
+        no_text=_str(dialog_raw, 'no_text', 'ui.dialog'),
+        yes_button=(dialog_x + button_spacing, button_y, button_width, button_height),
+        no_button=(dialog_x + dialog_width - button_width - button_spacing, button_y,
+                   button_width, button_height),
+    )
+
+    help_raw = _get(ui, 'key_help', 'ui')
+    help_width = min(_int(help_raw, 'width', 'ui.key_help', 1), width)
+    help_height = min(_int(help_raw, 'height', 'ui.key_help', 1), height)
+    help_x = (width - help_width) // 2
+    help_y = (height - help_height) // 2
+    items = _get(help_raw, 'items', 'ui.key_help')
+    if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+        raise ConfigError("ui.key_help.items 必须是字符串列表")
+    key_help = KeyHelpLayout(
+        width=help_width,
+        height=help_height,
+        x=help_x,
+        y=help_y,
+        opacity=_int(help_raw, 'opacity', 'ui.key_help', 0, 255),
+        background_color=_color(help_raw, 'background_color', 'ui.key_help'),
+        title_font=_font(ui, _int(help_raw, 'title_size', 'ui.key_help', 1)),
+        text_font=_font(ui, _int(help_raw, 'text_size', 'ui.key_help', 1)),
+        title=_str(help_raw, 'title', 'ui.key_help'),
+        title_y=help_y + 20,
+        items=tuple(items),
+        items_x=help_x + 30,
+        items_y=help_y + 70,
+        spacing=_int(help_raw, 'spacing', 'ui.key_help', 0),
+    )
+
+    hud = HudLayout(
+        score_font=_font(ui, _int(sizes, 'score', 'ui.fonts.sizes', 1)),
+        score_pos=(10, 10),
+        hint_pos=(10, height - 30),
+        game_over_font=_font(ui, _int(sizes, 'game_over', 'ui.fonts.sizes', 1)),
+        restart_pos=(max(0, width // 2 - 100), height - 50),
+        quote_font=_font(ui, _int(_get(raw, 'quotes', 'config'), 'font_size', 'quotes', 1)),
+    )
+
+    return leaderboard, dialog, key_help, hud
+
+
+def build_snapshot(raw):
+    """校验原始配置字典并生成快照，配置无效时抛出ConfigError
+
+    快照的raw中没有类型化的配置段已经用默认值补全，Config.apply 可以直接取用。
+    """
+    if not isinstance(raw, dict):
+        raise ConfigError("配置文件必须是JSON对象")
+    raw = dict(raw)
+    for name, default in SECTION_DEFAULTS.items():
+        raw[name] = _with_defaults(raw.get(name, {}), default, name)
+    for name, default in ADDED_KEY_DEFAULTS.items():
+        section = _get(raw, name, 'config')
+        if name == 'ui':
+            # 缺少整个 ui.leaderboard 时仍然报告缺少的原有配置项
+            _get(section, 'leaderboard', 'ui')
+        raw[name] = _with_defaults(section, default, name)
+    for name, direction in raw['directions'].items():
+        if (len(direction) != 2
+                or not all(isinstance(v, int) and not isinstance(v, bool) for v in direction)):
+            raise ConfigError(f"directions.{name} 必须是两个整数")
+
+    window_raw = _get(raw, 'window', 'config')
+    width = _int(window_raw, 'width', 'window', 1)
+    height = _int(window_raw, 'height', 'window', 1)
+    grid_size = _int(window_raw, 'grid_size', 'window', 4)
+    window = WindowSettings(width, height, grid_size, width // grid_size, height // grid_size,
+                            _str(window_raw, 'title', 'window'),
+                            _bool(window_raw, 'resizable', 'window'),
+                            _int(window_raw, 'sprite_cache_size', 'window', 1))
+
+    game_raw = _get(raw, 'game', 'config')
+    game = GameSettings(_int(game_raw, 'min_speed', 'game', 1),
+                        _int(game_raw, 'max_speed', 'game', 1),
+                        _int(game_raw, 'default_speed', 'game', 1),
+                        _int(game_raw, 'input_queue_size', 'game', 1),
+                        _int(game_raw, 'input_max_age_ms', 'game', 1),
+                        # 0表示与窗口的格子数相同
+                        _int(game_raw, 'board_width', 'game', 0) or window.grid_width,
+                        _int(game_raw, 'board_height', 'game', 0) or window.grid_height,
+                        _int(game_raw, 'camera_margin', 'game', 0))
+    if not game.min_speed <= game.default_speed <= game.max_speed:
+        raise ConfigError("game.default_speed 必须在 min_speed 和 max_speed 之间")
+
+    colors_raw = _get(raw, 'colors', 'config')
+    colors = Colors(*(_color(colors_raw, name, 'colors') for name in Colors._fields))
+
+    quotes = _get(raw, 'quotes', 'config')
+    quote_items = _get(quotes, 'items', 'quotes')
+    if not quote_items or not all(isinstance(item, str) for item in quote_items):
+        raise ConfigError("quotes.items 必须是非空的字符串列表")
+    leaderboard, dialog, key_help, hud = derive_layouts(raw, (width, height))
+
+    volume = _get(_get(raw, 'audio', 'config'), 'volume', 'audio')
+    if not isinstance(volume, (int, float)) or not 0 <= volume <= 1:
+        raise ConfigError("audio.volume 必须在0到1之间")
+
+    return ConfigSnapshot(window, game, colors, leaderboard, dialog, key_help, hud,
+                          sprite_geometry(grid_size), raw)
+
+
+def load_snapshot(path=CONFIG_FILE):
+    """读取并校验配置文件，返回快照"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return _parse(data)
+
+
+def _parse(data):
+    try:
+        raw = json.loads(data.decode('utf-8'))
+    except ValueError as e:
+        raise ConfigError(f"配置文件不是有效的JSON: {str(e)}")
+    return build_snapshot(raw)
+
+
+def _source_digest():
+    """本模块源码的哈希；读取不到源码（如打包后）时返回空字符串"""
+    try:
+        with open(__file__, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except (OSError, NameError):
+        return ''
+
+
+# 快照结构的指纹：修改了任何快照类型的字段，或者修改了本模块中由配置推导快照的代码
+# （默认值、校验、换算规则）后，旧缓存自动失效
+_SNAPSHOT_TYPES = (FontSpec, WindowSettings, GameSettings, Colors, LeaderboardLayout,
+                   DialogLayout, KeyHelpLayout, HudLayout, SpriteGeometry, ConfigSnapshot)
+CACHE_SCHEMA = (tuple((cls.__name__, cls._fields) for cls in _SNAPSHOT_TYPES), _source_digest())
+
+
+def load_snapshot_cached(path=CONFIG_FILE, cache_path=CACHE_FILE):
+    """
+    优先从二进制缓存读取配置快照
+
+    缓存以配置文件的修改时间、大小和内容哈希为键：
+    - 修改时间和大小都一致时直接使用缓存，不再读取和解析配置文件
+    - 不一致时计算内容哈希，内容未变（例如文件只是被touch过）仍使用缓存
+    - 缓存不存在、已损坏，或快照结构、推导代码已修改时解析配置文件并重写缓存
+
+    Returns:
+        (快照, 来源)，来源为 'cache' 或 'json'
+    """
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = None
+    try:
+        with open(cache_path, 'rb') as f:
+            cached = pickle.loads(f.read())
+        if cached['schema'] != CACHE_SCHEMA or not isinstance(cached['snapshot'], ConfigSnapshot):
+            cached = None
+    except Exception:
+        cached = None  # 缓存不存在或已损坏，回退到解析配置文件
+
+    if cached is not None and cached['key'] == key:
+        return cached['snapshot'], 'cache'
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha1(data).hexdigest()
+    if cached is not None and cached['sha1'] == digest:
+        snapshot, source = cached['snapshot'], 'cache'
+    else:
+        snapshot, source = _parse(data), 'json'
+    _write_cache(cache_path, {'schema': CACHE_SCHEMA, 'key': key, 'sha1': digest,
+                              'snapshot': snapshot})
+    return snapshot, source
+
+
+def _write_cache(cache_path, cached):
+    """原子地写入缓存，写入失败不影响游戏运行"""
+    temp_path = cache_path + '.tmp'
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(pickle.dumps(cached, protocol=pickle.HIGHEST_PROTOCOL))
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"写入配置缓存失败: {str(e)}")
+
+
+class Config:
+    """
+    游戏配置管理类
+
+    负责从配置文件加载并管理所有游戏配置，包括：
+    - 窗口设置
+    - 游戏参数
+    - 界面布局
+    - 颜色定义
+    - 方向常量
+    - 资源路径
+    - 音频设置
+
+    Config.snapshot 是当前的只读配置快照，绘制代码直接读取其中预先计算好的值；
+    同时保留原有的类属性（Config.UI、Config.AUDIO等）供其他模块使用。
+    """
+
+    snapshot = None
+    load_time_ms = 0.0
+    load_source = None  # 'cache' 或 'json'
+    _pending = None  # 监视线程读到的新快照，由主线程切换
+    window_size = None  # 窗口缩放后的实际大小，None表示配置的窗口大小
+    _subscribers = []
+    _watcher = None
+
+    @classmethod
+    def load(cls):
+        """从config.json加载配置（配置未变化时使用二进制缓存）"""
+        start = time.perf_counter()
+        snapshot, cls.load_source = load_snapshot_cached(CONFIG_FILE, CACHE_FILE)
+        cls.apply(snapshot)
+        cls.load_time_ms = (time.perf_counter() - start) * 1000
+
+    @classmethod
+    def apply(cls, snapshot):
+        """切换到新的配置快照并更新类属性"""
+        cls.snapshot = snapshot
+        config = snapshot.raw
+
+        # 窗口设置
+        cls.WINDOW_WIDTH = snapshot.window.width
+        cls.WINDOW_HEIGHT = snapshot.window.height
+        cls.GRID_SIZE = snapshot.window.grid_size
+        cls.VIEW_WIDTH = snapshot.window.grid_width  # 窗口能显示的格子数
+        cls.VIEW_HEIGHT = snapshot.window.grid_height
+        cls.GRID_WIDTH = snapshot.game.board_width  # 逻辑棋盘的格子数
+        cls.GRID_HEIGHT = snapshot.game.board_height
+        cls.WINDOW_TITLE = snapshot.window.title
+
+        # 游戏设置
+        cls.MIN_SPEED = snapshot.game.min_speed
+        cls.MAX_SPEED = snapshot.game.max_speed
+        cls.DEFAULT_SPEED = snapshot.game.default_speed
+
+        # 颜色定义
+        cls.WHITE = snapshot.colors.white
+        cls.RED = snapshot.colors.red
+        cls.GREEN = snapshot.colors.green
+        cls.BLACK = snapshot.colors.black
+        cls.DARK_GREEN = snapshot.colors.dark_green
+        cls.LIGHT_GREEN = snapshot.colors.light_green
+        cls.DARK_BG = snapshot.colors.dark_bg
+        cls.GRID_COLOR = snapshot.colors.grid_color
+        cls.GRAY = snapshot.colors.gray
+
+        # 方向常量
+        cls.UP = tuple(config['directions']['up'])
+        cls.DOWN = tuple(config['directions']['down'])
+        cls.LEFT = tuple(config['directions']['left'])
+        cls.RIGHT = tuple(config['directions']['right'])
+
+        # 资源设置
+        cls.RESOURCE_DIR = config['resources']['directory']
+        cls.DB_NAME = config['resources']['db_name']
+
+        # 以下配置段只在内容变化时替换，依赖对象身份判断配置是否变化的缓存不会被无谓地重建
+        cls._set_section('UI', config['ui'])
+        cls._set_section('AUDIO', config['audio'])
+        cls._set_section('quotes', config['quotes'])
+        cls._set_section('HOT_RELOAD', config['hot_reload'])
+        cls._set_section('IDLE', config['idle'])
+
+        # 无头模式配置（环境变量SNAKER_HEADLESS=1或--headless参数也可开启）
+        cls._set_section('HEADLESS', config['headless'])
+        cls.HEADLESS_MODE = (cls.HEADLESS['enabled']
+                             or os.environ.get('SNAKER_HEADLESS') == '1'
+                             or '--headless' in sys.argv)
+
+        # 录制配置
+        cls._set_section('RECORDING', config['recording'])
+
+        # 自动驾驶配置
+        cls._set_section('AUTOPILOT', config['autopilot'])
+
+        # 本地多人配置
+        cls._set_section('PLAYERS', config['players'])
+
+        # 联机服务器配置
+        cls._set_section('SERVER', config['server'])
+
+        # 渲染方式配置
+        cls._set_section('RENDERER', config['renderer'])
+
+        # 分数数据库维护配置
+        cls._set_section('MAINTENANCE', config['maintenance'])
+
+        # 对局存档配置
+        cls._set_section('SAVEGAME', config['savegame'])
+
+    @classmethod
+    def _set_section(cls, name, value):
+        if getattr(cls, name, None) != value:
+            setattr(cls, name, value)
+
+    @classmethod
+    def subscribe(cls, sections, callback):
+        """
+        订阅配置变化
+
+        Args:
+            sections: 关心的快照字段名（如 'dialog'、'leaderboard'）
+            callback: 这些字段中任意一个变化时调用，参数为新快照
+        """
+        cls._subscribers.append((frozenset(sections), callback))
+
+    @classmethod
+    def start_watching(cls):
+        """启动配置文件监视线程"""
+        if cls._watcher is None and cls.HOT_RELOAD['enabled']:
+            cls._watcher = ConfigWatcher(CONFIG_FILE, cls.HOT_RELOAD['interval_ms'] / 1000)
+
+    @classmethod
+    def offer(cls, snapshot):
+        """由监视线程调用，交给主线程在下一帧切换"""
+        cls._pending = snapshot
+
+    @classmethod
+    def poll(cls):
+        """
+        在主循环中调用：如果有新快照则切换过去，并通知相关订阅者
+
+        Returns:
+            发生变化的配置段名称集合
+        """
+        snapshot = cls._pending
+        if snapshot is None:
+            return frozenset()
+        cls._pending = None
+
+        old = cls.snapshot
+        raw = snapshot.raw
+        if raw['window'] != old.raw['window']:
+            # 网格尺寸决定了蛇和食物的坐标范围，窗口设置需要重启后生效
+            print("窗口设置的修改需要重启游戏后生效")
+            raw = dict(raw, window=old.raw['window'])
+        old_game, game = old.raw['game'], raw['game']
+        if any(game.get(key) != old_game.get(key) for key in RESTART_GAME_KEYS):
+            # 棋盘占用表、镜头和已有的蛇都按启动时的棋盘大小创建
+            print("棋盘大小的修改需要重启游戏后生效")
+            game = {key: value for key, value in game.items() if key not in RESTART_GAME_KEYS}
+            game.update((key, old_game[key]) for key in RESTART_GAME_KEYS if key in old_game)
+            raw = dict(raw, game=game)
+        if raw is not snapshot.raw:
+            try:
+                snapshot = build_snapshot(raw)
+            except ConfigError as e:
+                # 新配置只有搭配新的窗口或棋盘设置才有效，继续使用当前配置
+                print(f"配置文件无效，继续使用当前配置: {str(e)}")
+                return frozenset()
+        if cls.window_size is not None:
+            snapshot = cls._with_layouts(snapshot, cls.window_size)
+        return cls._switch(snapshot)
+
+    @classmethod
+    def resize_window(cls, size):
+        """
+        窗口缩放后按实际大小重新计算界面布局，并通知订阅了这些配置段的对象
+
+        Returns:
+            发生变化的配置段名称集合
+        """
+        cls.window_size = tuple(size)
+        return cls._switch(cls._with_layouts(cls.snapshot, cls.window_size))
+
+    @staticmethod
+    def _with_layouts(snapshot, size):
+        leaderboard, dialog, key_help, hud = derive_layouts(snapshot.raw, size)
+        return snapshot._replace(leaderboard=leaderboard, dialog=dialog, key_help=key_help, hud=hud)
+
+    @classmethod
+    def _switch(cls, snapshot):
+        """切换到新快照，通知配置段发生变化的订阅者"""
+        old = cls.snapshot
+        changed = frozenset(name for name in ConfigSnapshot._fields
+                            if name != 'raw' and getattr(old, name) != getattr(snapshot, name))
+        cls.apply(snapshot)
+        for sections, callback in cls._subscribers:
+            if sections & changed:
+                callback(snapshot)
+        return changed
+
+
+class ConfigWatcher:
+    """
+    配置文件监视线程
+
+    定期检查文件的修改时间和大小，变化后在线程中解析并校验，
+    校验通过才交给Config在主线程切换；无效的配置只打印错误，继续使用当前配置。
+    """
+
+    def __init__(self, path, interval):
+        self.path = path
+        self.interval = interval
+        self.signature = self._signature()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._watch_loop, daemon=True)
+        self.thread.start()
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def _watch_loop(self):
+        while not self.stopped.wait(self.interval):
+            signature = self._signature()
+            if signature is None or signature == self.signature:
+                continue
+            self.signature = signature
+            try:
+                snapshot, _ = load_snapshot_cached(self.path, CACHE_FILE)
+                Config.offer(snapshot)
+            except (ConfigError, OSError) as e:
+                print(f"配置文件无效，继续使用当前配置: {str(e)}")
+
+    def stop(self):
+        self.stopped.set()
@@ -0,0 +1,301 @@
+"""
+帧导出工具
+
+功能：
+- 无头模式下按固定间隔导出渲染帧
+- 支持PNG图片、原始RGB字节和NumPy数组三种格式
+- 用于在没有显示器的环境中做渲染性能和回归测试
+- 录制模式：通过有界队列把帧交给后台编码线程，生成GIF、原始帧序列或ffmpeg视频
+"""
+
+import os
+import json
+import queue
+import shutil
+import subprocess
+import threading
+from datetime import datetime
+import pygame
+import numpy as np
+
+
+class FrameDumper:
+    """
+    帧导出类
+
+    每隔 dump_interval 帧把传入的表面保存到 frame_dir 目录：
+    - png: 使用 pygame.image.save 保存为PNG图片
+    - raw: 按行优先顺序写出 宽×高×3 的RGB字节
+    - npy: 保存为形状为 (高, 宽, 3) 的 uint8 NumPy 数组
+    """
+
+    FORMATS = ('png', 'raw', 'npy')
+
+    def __init__(self, config):
+        settings = config.HEADLESS
+        self.frame_dir = settings['frame_dir']
+        self.interval = settings['dump_interval']
+        self.format = settings['dump_format']
+        if self.format not in self.FORMATS:
+            print(f"未知的帧导出格式: {self.format}，使用png")
+            self.format = 'png'
+        self.frame_count = 0
+        self.dumped_count = 0
+
+        if self.enabled and not os.path.exists(self.frame_dir):
+            os.makedirs(self.frame_dir)
+
+    @property
+    def enabled(self):
+        return self.interval > 0
+
+    def capture(self, surface):
+        """记录一帧，到达导出间隔时把表面写入文件"""
+        index = self.frame_count
+        self.frame_count += 1
+        if not self.enabled or index % self.interval != 0:
+            return None
+
+        path = os.path.join(self.frame_dir, f"frame_{index:06d}.{self.format}")
+        try:
+            if self.format == 'png':
+                pygame.image.save(surface, path)
+            elif self.format == 'raw':
+                with open(path, 'wb') as f:
+                    f.write(pygame.image.tobytes(surface, 'RGB'))
+            else:
+                # surfarray 的数组是 (宽, 高, 3)，转置为常用的 (高, 宽, 3)
+                np.save(path, pygame.surfarray.array3d(surface).transpose(1, 0, 2))
+        except Exception as e:
+            print(f"导出帧失败: {path}, 错误: {str(e)}")
+            return None
+        self.dumped_count += 1
+        return path
+
+
+class RawSequenceEncoder:
+    """原始帧序列编码器：连续写出rgb24字节，另存一个描述尺寸和帧率的json文件"""
+
+    extension = 'rgb'
+
+    def __init__(self, path, size, fps):
+        self.paths = [path, path + '.json']
+        self.file = open(path, 'wb')
+        with open(path + '.json', 'w', encoding='utf-8') as f:
+            json.dump({'width': size[0], 'height': size[1], 'fps': fps,
+                       'pix_fmt': 'rgb24'}, f)
+
+    def write(self, frame):
+        self.file.write(memoryview(frame))
+
+    def close(self):
+        self.file.close()
+
+
+class FFmpegEncoder:
+    """通过管道把rgb24帧交给本机ffmpeg编码为视频"""
+
+    extension = 'mp4'
+
+    def __init__(self, path, size, fps):
+        self.paths = [path]
+        self.process = subprocess.Popen(
+            [shutil.which('ffmpeg'), '-y', '-loglevel', 'error',
+             '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+             '-s', f"{size[0]}x{size[1]}", '-r', str(fps), '-i', '-',
+             '-pix_fmt', 'yuv420p', path],
+            stdin=subprocess.PIPE
+        )
+
+    def write(self, frame):
+        self.process.stdin.write(memoryview(frame))
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+
+class GifEncoder:
+    """
+    动画GIF编码器
+
+    每帧在编码线程中量化为调色板图像（每像素1字节），带着自己的局部调色板直接追加写入文件，
+    内存中不保留已经写出的帧，录制时长不受内存限制。
+    可通过 gif_scale 缩小画面以减小文件。
+    """
+
+    extension = 'gif'
+
+    def __init__(self, path, size, fps, scale=1):
+        from PIL import Image, GifImagePlugin  # 只有录制GIF时才需要Pillow
+        self.image_module = Image
+        self.gif_module = GifImagePlugin
+        self.paths = [path]
+        self.path = path
+        self.duration = int(1000 / fps)
+        self.scale = max(1, scale)
+        self.file = None
+
+    def write(self, frame):
+        image = self.image_module.fromarray(frame)
+        if self.scale > 1:
+            image = image.reduce(self.scale)
+        image = image.quantize(colors=64)
+        if self.file is None:
+            # 文件头（画面尺寸、循环播放）在第一帧到来时写出
+            self.file = open(self.path, 'wb')
+            header, _ = self.gif_module.getheader(image, info={'loop': 0, 'duration': self.duration})
+            self.file.write(b''.join(header))
+        self.file.write(b''.join(self.gif_module.getdata(
+            image, include_color_table=True, duration=self.duration)))
+
+    def close(self):
+        if self.file is not None:
+            self.file.write(b';')  # GIF结束标记
+            self.file.close()
+            self.file = None
+
+
+class FrameRecorder:
+    """
+    帧录制类
+
+    游戏线程只负责把屏幕像素复制进预先分配的缓冲区并放入有界队列，
+    编码在后台线程完成，因此不会拖慢游戏循环：
+    - 缓冲区池大小固定，录制过程中不再分配帧内存
+    - 队列已满或没有空闲缓冲区时直接丢弃该帧，而不是阻塞游戏
+    - 格式 auto 在本机有ffmpeg时输出mp4，否则输出GIF
+    - 录制中途窗口大小改变时，帧缩放到开始录制时的大小，一局始终是同一个文件
+    """
+
+    FORMATS = ('auto', 'gif', 'raw', 'ffmpeg')
+
+    def __init__(self, config, size, fps):
+        settings = config.RECORDING
+        self.size = size
+        self.fps = settings['fps'] or fps
+        self.output_dir = settings['output_dir']
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir)
+
+        # 缓冲区按 (高, 宽, 3) 存放，与rgb24逐行字节顺序一致，编码时无需再转换
+        queue_size = max(1, settings['queue_size'])
+        self.pending = queue.Queue(maxsize=queue_size)
+        self.free = queue.Queue()
+        for _ in range(queue_size + 1):  # 多出的一个供编码线程正在处理的帧使用
+            self.free.put(np.empty((size[1], size[0], 3), dtype=np.uint8))
+
+        self.name = 'run_' + datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]
+        self.encoder = self._create_encoder(settings)
+        self.recorded_count = 0
+        self.dropped_count = 0
+        self.keep = True
+        self.tag = ''
+        self.scaled = None  # 窗口大小改变后用于缩放帧的表面
+        self.thread = threading.Thread(target=self._encode_loop, daemon=True)
+        self.thread.start()
+
+    def _create_encoder(self, settings):
+        fmt = settings['format']
+        if fmt not in self.FORMATS:
+            print(f"未知的录制格式: {fmt}，使用auto")
+            fmt = 'auto'
+        if fmt == 'auto':
+            fmt = 'ffmpeg' if shutil.which('ffmpeg') else 'gif'
+        elif fmt == 'ffmpeg' and not shutil.which('ffmpeg'):
+            print("未找到ffmpeg，改为录制原始帧序列")
+            fmt = 'raw'
+
+        if fmt == 'ffmpeg':
+            encoder_class = FFmpegEncoder
+        elif fmt == 'gif':
+            encoder_class = GifEncoder
+        else:
+            encoder_class = RawSequenceEncoder
+        path = os.path.join(self.output_dir, f"{self.name}.{encoder_class.extension}")
+        if encoder_class is GifEncoder:
+            return GifEncoder(path, self.size, self.fps, settings['gif_scale'])
+        return encoder_class(path, self.size, self.fps)
+
+    def capture(self, surface):
+        """复制一帧到空闲缓冲区并交给编码线程，返回是否成功"""
+        try:
+            frame = self.free.get_nowait()
+        except queue.Empty:
+            self.dropped_count += 1
+            return False
+
+        if surface.get_size() != self.size:
+            if self.scaled is None:
+                self.scaled = pygame.Surface(self.size)
+            pygame.transform.scale(surface, self.size, self.scaled)
+            surface = self.scaled
+
+        # pixels3d 是直接引用表面像素的视图，只在这里做一次复制
+        pixels = pygame.surfarray.pixels3d(surface)
+        np.copyto(frame, pixels.transpose(1, 0, 2))
+        del pixels  # 释放表面锁
+
+        try:
+            self.pending.put_nowait(frame)
+        except queue.Full:
+            self.free.put(frame)
+            self.dropped_count += 1
+            return False
+        self.recorded_count += 1
+        return True
+
+    def _encode_loop(self):
+        failed = False
+        while True:
+            frame = self.pending.get()
+            if frame is None:
+                break
+            try:
+                if not failed:
+                    self.encoder.write(frame)
+            except Exception as e:
+                print(f"录制编码失败: {str(e)}")
+                failed = True
+            finally:
+                self.free.put(frame)
+
+        try:
+            self.encoder.close()
+        except Exception as e:
+            print(f"录制文件保存失败: {str(e)}")
+            failed = True
+        self._finalize_files(keep=self.keep and not failed)
+
+    def _finalize_files(self, keep):
+        """保留时在文件名中加上标签（如分数），否则删除输出文件"""
+        for path in self.encoder.paths:
+            if not os.path.exists(path):
+                continue
+            if not keep:
+                os.remove(path)
+            elif self.tag:
+                os.replace(path, path.replace(self.name, f"{self.name}_{self.tag}", 1))
+
+    def finish(self, keep=True, tag=''):
+        """结束录制；编码线程写完剩余帧后在后台关闭文件，不阻塞游戏循环"""
+        self.keep = keep
+        self.tag = tag
+        # 与 capture 一样不等待：队列已满时丢弃最早的待编码帧，为结束标记腾出位置
+        while True:
+            try:
+                self.pending.put_nowait(None)
+                return
+            except queue.Full:
+                pass
+            try:
+                frame = self.pending.get_nowait()
+            except queue.Empty:
+                continue
+            self.free.put(frame)
+            self.dropped_count += 1
+            self.recorded_count -= 1
+
+    def wait(self):
+        """等待编码线程结束（退出程序前调用）"""
+        self.thread.join()
@@ -1,54 +1,62 @@
 import pygame
 import os
 
-def create_background(config):
-    """创建游戏背景图片"""
-    background = pygame.Surface((config.WINDOW_WIDTH, config.WINDOW_HEIGHT))
+def create_background(config, size=None, cell=None):
+    """创建游戏背景图片
+    
+    Args:
+        size: 背景大小，默认为配置的窗口大小
+        cell: 网格间距，默认为配置的格子大小
+    """
+    size = size or (config.WINDOW_WIDTH, config.WINDOW_HEIGHT)
+    cell = cell or config.GRID_SIZE
+    background = pygame.Surface(size)
     background.fill((3, 3, 5))  # 接近纯黑的背景
     
-    # 添加极暗的网格纹理
-    for x in range(0, config.WINDOW_WIDTH, config.GRID_SIZE):
-        pygame.draw.line(background, config.GRID_COLOR, (x, 0), (x, config.WINDOW_HEIGHT))
-    for y in range(0, config.WINDOW_HEIGHT, config.GRID_SIZE):
-        pygame.draw.line(background, config.GRID_COLOR, (0, y), (config.WINDOW_WIDTH, y))
+    # 添加极暗的网格纹理：直接按步长给整列、整行像素赋值，不逐条画线
+    pixels = pygame.surfarray.pixels3d(background)
+    pixels[::cell, :] = config.GRID_COLOR
+    pixels[:, ::cell] = config.GRID_COLOR
+    del pixels  # 释放表面锁
     
     return background
 
-def create_snake_body(config):
+# 各精灵的几何尺寸默认使用配置快照中预先计算好的（config.snapshot.sprites），
+# 其他格子大小的精灵传入 sprite_geometry(cell) 的结果
+
+def create_snake_body(config, geometry=None):
     """创建蛇身图片"""
-    body = pygame.Surface((config.GRID_SIZE-4, config.GRID_SIZE-4), pygame.SRCALPHA)
+    geometry = geometry or config.snapshot.sprites
+    body = pygame.Surface((geometry.body_size, geometry.body_size), pygame.SRCALPHA)
     pygame.draw.circle(body, (100, 240, 100), 
-                      ((config.GRID_SIZE-4)//2, (config.GRID_SIZE-4)//2), 
-                      (config.GRID_SIZE-4)//2-1)
+                      geometry.body_center, 
+                      geometry.body_radius)
     pygame.draw.circle(body, (140, 255, 140), 
-                      ((config.GRID_SIZE-4)//3, (config.GRID_SIZE-4)//3), 3)
+                      geometry.body_highlight, 3)
     return body
 
-def create_food(config):
+def create_food(config, geometry=None):
     """创建食物图片"""
-    food = pygame.Surface((config.GRID_SIZE, config.GRID_SIZE), pygame.SRCALPHA)
+    geometry = geometry or config.snapshot.sprites
+    food = pygame.Surface((geometry.cell, geometry.cell), pygame.SRCALPHA)
     pygame.draw.circle(food, (255, 60, 60), 
-                      (config.GRID_SIZE//2, config.GRID_SIZE//2), 
-                      config.GRID_SIZE//2-1)
+                      geometry.cell_center, 
+                      geometry.cell_radius)
     pygame.draw.ellipse(food, (120, 255, 120), 
-                       (config.GRID_SIZE//2-2, 2, 4, 6))
+                       geometry.food_leaf)
     pygame.draw.circle(food, (255, 255, 255, 200), 
-                      (config.GRID_SIZE//3, config.GRID_SIZE//3), 3)
+                      geometry.highlight, 3)
     return food
 
-def create_snake_head(config, direction_name):
+def create_snake_head(config, direction_name, geometry=None):
     """创建蛇头图片"""
-    head = pygame.Surface((config.GRID_SIZE, config.GRID_SIZE), pygame.SRCALPHA)
+    geometry = geometry or config.snapshot.sprites
+    head = pygame.Surface((geometry.cell, geometry.cell), pygame.SRCALPHA)
     pygame.draw.circle(head, (120, 255, 120), 
-                      (config.GRID_SIZE//2, config.GRID_SIZE//2), 
-                      config.GRID_SIZE//2-1)
+                      geometry.cell_center, 
+                      geometry.cell_radius)
     
-    eye_positions = {
-        "up": [(6, 6), (14, 6)],
-        "down": [(6, 14), (14, 14)],
-        "left": [(6, 6), (6, 14)],
-        "right": [(14, 6), (14, 14)]
-    }
+    eye_positions = dict(geometry.eyes)
     
     for eye_pos in eye_positions[direction_name]:
         pygame.draw.circle(head, config.WHITE, eye_pos, 3)
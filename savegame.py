@@ -0,0 +1,242 @@
+"""
+对局存档
+
+功能：
+- 每隔固定刻数把整局状态（每条蛇的身体、方向、分数、方向队列，食物，速度，随机数状态）
+  写成紧凑的二进制存档，进程崩溃后下次启动可以从存档继续
+- 游戏线程只收集自上次存档以来的变化：蛇每走一步只在头部增加一格、在尾部去掉一格，
+  所以只需取出新增的蛇头，耗时与存档间隔成正比，与蛇的长度和棋盘大小无关
+- 后台线程保存每条蛇身体的编码副本（格子下标，从头到尾），拼上新蛇头、截掉尾部都是整块的内存操作；
+  写入临时文件并fsync后用 os.replace 原子替换，崩溃时磁盘上要么是旧存档，要么是完整的新存档
+- 存档末尾带CRC32校验，读取时校验失败、版本不符都会忽略存档
+
+存档格式（小端）：
+    头部: 魔数 b'SNKS', 版本(uint16), 刻数(uint32), 棋盘宽、高(uint32), 速度(uint16),
+          食物格子(uint32), 蛇数(uint8)
+    随机数状态: 版本(uint8), 是否有gauss_next(uint8), gauss_next(double), 状态(625个uint32)
+    每条蛇: 编号(uint8), 是否结束(uint8), 方向(uint8), 分数(uint32), 长度(uint32), 格子数(uint32),
+            方向队列长度(uint8), 名字字节数(uint8), 名字(utf-8), 方向队列(uint8...), 格子下标(uint32...)
+    结尾: 前面所有内容的CRC32(uint32)
+方向都是 directions（上、下、左、右）中的下标。
+"""
+
+import os
+import sys
+import queue
+import random
+import struct
+import threading
+import zlib
+from array import array
+from itertools import islice
+from typing import NamedTuple
+
+MAGIC = b'SNKS'
+VERSION = 1
+
+HEADER = struct.Struct('<4sHIIIHIB')
+RNG_HEADER = struct.Struct('<BBd')
+RNG_WORDS = struct.Struct('<625I')
+SNAKE_HEADER = struct.Struct('<BBBIIIBB')
+CRC = struct.Struct('<I')
+
+
+class SavedSnake(NamedTuple):
+    owner: int
+    name: str
+    game_over: bool
+    direction: int
+    score: int
+    length: int
+    queue: bytes  # 方向队列中的方向下标
+    cells: array  # 格子下标，从头到尾
+
+
+class SavedGame(NamedTuple):
+    tick: int
+    width: int
+    height: int
+    speed: int
+    food: int  # 食物的格子下标
+    rng_state: tuple  # random.getstate() 的格式
+    snakes: list
+
+
+def _cell_array(cells):
+    """格子下标转换为小端uint32数组"""
+    result = array('I', cells)
+    if sys.byteorder != 'little':
+        result.byteswap()
+    return result
+
+
+def _encode_rng(state):
+    version, internal, gauss_next = state
+    return (RNG_HEADER.pack(version, gauss_next is not None, gauss_next or 0.0)
+            + RNG_WORDS.pack(*internal))
+
+
+class SaveGameWriter:
+    """
+    后台存档写入
+
+    capture() 在游戏线程中调用，只做很少的工作；编码和写文件在后台线程中按提交顺序进行。
+
+    Args:
+        path: 存档文件
+        width, height: 棋盘大小
+        directions: (上, 下, 左, 右) 方向向量，存档中保存它们的下标
+    """
+
+    def __init__(self, path, width, height, directions):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.direction_index = {d: i for i, d in enumerate(directions)}
+        self.write_count = 0
+        self._sent = {}  # 编号 -> (上次存档时的positions对象, 当时的moves)
+        self._bodies = {}  # 编号 -> 身体编码的副本（只由后台线程访问）
+        self._jobs = queue.Queue()
+        self._thread = threading.Thread(target=self._work, daemon=True)
+        self._thread.start()
+
+    def capture(self, tick, speed, food, players):
+        """
+        提交一次存档
+
+        Args:
+            food: 食物坐标
+            players: [(蛇, 方向队列或None), ...]
+        """
+        width = self.width
+        entries = []
+        for snake, direction_queue in players:
+            positions = snake.positions
+            sent = self._sent.get(snake.owner)
+            moved = None
+            if sent is not None and sent[0] is positions:
+                moved = snake.moves - sent[1]
+            # 重新开始（positions换了新对象）或走过的步数超过身体长度时整条复制，否则只取新蛇头
+            full = moved is None or moved >= len(positions)
+            cells = positions if full else islice(positions, moved)
+            cells = _cell_array([y * width + x for x, y in cells]).tobytes()
+            self._sent[snake.owner] = (positions, snake.moves)
+            pending = b''
+            if direction_queue is not None:
+                pending = bytes(self.direction_index[d] for d, _ in direction_queue.items)[:255]
+            entries.append((snake.owner, snake.name, snake.game_over,
+                            self.direction_index[snake.direction], snake.score, snake.length,
+                            len(positions), full, cells, pending))
+        header = HEADER.pack(MAGIC, VERSION, tick, width, self.height, speed,
+                             food[1] * width + food[0], len(entries))
+        self._jobs.put(('save', header, random.getstate(), entries))
+
+    def seed(self, players, saved):
+        """从存档恢复后登记各条蛇的身体，之后的存档仍然只需取新蛇头"""
+        bodies = {}
+        for (snake, _), saved_snake in zip(players, saved.snakes):
+            self._sent[snake.owner] = (snake.positions, snake.moves)
+            bodies[snake.owner] = bytearray(saved_snake.cells.tobytes())
+        self._jobs.put(('seed', bodies))
+
+    def discard(self):
+        """删除存档（对局结束或正常退出后不需要恢复）"""
+        self._jobs.put(('discard',))
+
+    def close(self):
+        """等待已提交的存档全部写完"""
+        self._jobs.put(None)
+        self._thread.join()
+
+    def _work(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            try:
+                if job[0] == 'save':
+                    self._write(*job[1:])
+                elif job[0] == 'seed':
+                    self._bodies.update(job[1])
+                elif os.path.exists(self.path):
+                    os.remove(self.path)
+            except OSError as e:
+                print(f"写入存档失败: {str(e)}")
+
+    def _write(self, header, rng_state, entries):
+        parts = [header, _encode_rng(rng_state)]
+        for owner, name, game_over, direction, score, length, count, full, cells, pending in entries:
+            body = self._bodies.get(owner)
+            if full or body is None:
+                body = bytearray(cells)
+            else:
+                body[0:0] = cells  # 新蛇头在前
+                del body[4 * count:]  # 尾部已经走过的格子
+            self._bodies[owner] = body
+            name_bytes = name.encode('utf-8')[:255]
+            parts += [SNAKE_HEADER.pack(owner, game_over, direction, score, length, count,
+                                        len(pending), len(name_bytes)),
+                      name_bytes, pending, body]
+        data = b''.join(parts)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+            f.write(CRC.pack(zlib.crc32(data)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self.write_count += 1
+
+
+def load_savegame(path):
+    """读取存档，文件不存在或无效时返回None"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        print(f"读取存档失败: {str(e)}")
+        return None
+    try:
+        return _decode(data)
+    except (struct.error, ValueError) as e:
+        print(f"存档无效，已忽略: {str(e)}")
+        return None
+
+
+def _decode(data):
+    if len(data) < HEADER.size + CRC.size:
+        raise ValueError("文件不完整")
+    body, (crc,) = data[:-CRC.size], CRC.unpack_from(data, len(data) - CRC.size)
+    if zlib.crc32(body) != crc:
+        raise ValueError("校验失败")
+    magic, version, tick, width, height, speed, food, snake_count = HEADER.unpack_from(body)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"不支持的存档版本: {version}")
+    offset = HEADER.size
+    rng_version, has_gauss, gauss_next = RNG_HEADER.unpack_from(body, offset)
+    offset += RNG_HEADER.size
+    internal = RNG_WORDS.unpack_from(body, offset)
+    offset += RNG_WORDS.size
+    rng_state = (rng_version, internal, gauss_next if has_gauss else None)
+
+    snakes = []
+    for _ in range(snake_count):
+        (owner, game_over, direction, score, length, count,
+         pending_count, name_size) = SNAKE_HEADER.unpack_from(body, offset)
+        offset += SNAKE_HEADER.size
+        name = body[offset:offset + name_size].decode('utf-8', errors='ignore')
+        offset += name_size
+        pending = body[offset:offset + pending_count]
+        offset += pending_count
+        cells = array('I')
+        cells.frombytes(body[offset:offset + 4 * count])
+        if sys.byteorder != 'little':
+            cells.byteswap()
+        offset += 4 * count
+        if len(cells) != count or len(pending) != pending_count:
+            raise ValueError("文件不完整")
+        snakes.append(SavedSnake(owner, name, bool(game_over), direction, score, length,
+                                 pending, cells))
+    return SavedGame(tick, width, height, speed, food, rng_state, snakes)
@@ -0,0 +1,179 @@
+"""
+定时器调度
+
+功能：
+- 在游戏时钟上安排一次性或重复执行的回调，可以随时取消
+- 游戏时钟由主循环按每帧经过的毫秒数推进，游戏暂停时停止走动，定时器随之暂停
+- 不需要随游戏暂停的定时器（如退出语录、死亡音效后恢复背景音乐）放在另一个一直走动的时钟上
+- 每个时钟的定时器按到期时间存放在最小堆中：每帧只查看堆顶，安排和触发都是 O(log n)，
+  大量定时器同时等待时也不会拖慢每一帧
+- 取消只做标记，出堆时丢弃；被取消的定时器超过一半时整体重建堆，避免占用内存
+
+用法：
+    scheduler = Scheduler()
+    timer = scheduler.call_later(3000, callback)           # 3秒后执行一次
+    scheduler.call_every(500, callback, arg)               # 每0.5秒执行一次
+    scheduler.call_later(1000, callback, pausable=False)   # 不随游戏暂停
+    timer.cancel()
+    scheduler.advance(elapsed_ms)                          # 主循环每帧调用
+"""
+
+import heapq
+import itertools
+
+# 被取消的定时器超过这个数量且超过堆的一半时重建堆
+_COMPACT_MIN = 64
+
+
+class Timer:
+    """
+    定时器句柄
+
+    Attributes:
+        due: 下一次到期的时钟时间(ms)
+        interval: 重复间隔(ms)，一次性定时器为None
+    """
+
+    __slots__ = ('due', 'interval', 'callback', 'args', 'cancelled', '_queue')
+
+    def __init__(self, queue, due, interval, callback, args):
+        self._queue = queue
+        self.due = due
+        self.interval = interval
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    @property
+    def active(self):
+        """是否还会触发（未取消，一次性定时器尚未触发）"""
+        return not self.cancelled
+
+    def cancel(self):
+        """取消定时器；已经触发过的一次性定时器再取消也没有影响"""
+        if not self.cancelled:
+            self.cancelled = True
+            self._queue.discard()
+
+    def remaining(self):
+        """距离下一次到期还有多少毫秒"""
+        return max(0, self.due - self._queue.now)
+
+
+class _TimerQueue:
+    """一个时钟和它上面按到期时间排列的定时器"""
+
+    def __init__(self):
+        self.now = 0
+        self.heap = []  # [(到期时间, 序号, Timer)]，序号保证同时到期的按安排顺序触发
+        self.cancelled = 0
+        self._sequence = itertools.count()
+
+    def push(self, timer):
+        heapq.heappush(self.heap, (timer.due, next(self._sequence), timer))
+
+    def discard(self):
+        """登记一个被取消的定时器，过多时重建堆"""
+        self.cancelled += 1
+        if self.cancelled > _COMPACT_MIN and self.cancelled * 2 > len(self.heap):
+            self.heap = [entry for entry in self.heap if not entry[2].cancelled]
+            heapq.heapify(self.heap)
+            self.cancelled = 0
+
+    def advance(self, elapsed):
+        """时钟前进elapsed毫秒，按到期顺序执行所有到期的回调"""
+        self.now += elapsed
+        heap = self.heap
+        while heap and heap[0][0] <= self.now:
+            _, _, timer = heapq.heappop(heap)
+            if timer.cancelled:
+                self.cancelled -= 1
+                continue
+            if timer.interval is None:
+                timer.cancelled = True  # 一次性定时器触发后不再活动
+            else:
+                # 按固定节奏重复；落后超过一个间隔（如长时间卡顿）时跳过错过的次数，
+                # 不连续补发，但保持原来的节奏
+                timer.due += timer.interval
+                if timer.due <= self.now:
+                    timer.due += ((self.now - timer.due) // timer.interval + 1) * timer.interval
+                self.push(timer)
+            timer.callback(*timer.args)
+
+    def next_due(self):
+        """最近一个未取消的定时器的到期时间，没有时返回None"""
+        heap = self.heap
+        while heap and heap[0][2].cancelled:
+            heapq.heappop(heap)
+            self.cancelled -= 1
+        return heap[0][0] if heap else None
+
+    def __len__(self):
+        return len(self.heap) - self.cancelled
+
+
+class Scheduler:
+    """
+    游戏时钟上的定时器调度器
+
+    两个时钟：游戏时钟（paused为True时不走）和一直走动的时钟。
+    安排定时器时用 pausable 选择时钟，默认随游戏暂停。
+    """
+
+    def __init__(self):
+        self.paused = False
+        self._game = _TimerQueue()
+        self._real = _TimerQueue()
+
+    @property
+    def time(self):
+        """游戏时钟的当前时间(ms)，只在未暂停时走动"""
+        return self._game.now
+
+    def call_later(self, delay_ms, callback, *args, pausable=True):
+        """delay_ms毫秒后执行一次 callback(*args)"""
+        return self._schedule(delay_ms, None, callback, args, pausable)
+
+    def call_every(self, interval_ms, callback, *args, delay_ms=None, pausable=True):
+        """
+        每隔interval_ms毫秒执行一次 callback(*args)，直到取消
+
+        Args:
+            delay_ms: 第一次执行前的等待时间，默认等于间隔
+        """
+        if interval_ms <= 0:
+            raise ValueError("重复定时器的间隔必须大于0")
+        return self._schedule(interval_ms if delay_ms is None else delay_ms,
+                              interval_ms, callback, args, pausable)
+
+    def _schedule(self, delay_ms, interval_ms, callback, args, pausable):
+        queue = self._game if pausable else self._real
+        timer = Timer(queue, queue.now + max(0, delay_ms), interval_ms, callback, args)
+        queue.push(timer)
+        return timer
+
+    def advance(self, elapsed_ms):
+        """
+        推进时钟并执行到期的回调（主循环每帧调用一次）
+
+        回调中可以安排新的定时器或取消定时器；新定时器已经到期时在同一次调用中执行。
+        """
+        self._real.advance(elapsed_ms)
+        if not self.paused:
+            self._game.advance(elapsed_ms)
+
+    def next_delay(self):
+        """距离下一个定时器到期的毫秒数（暂停时不计游戏时钟），没有定时器时返回None"""
+        delays = []
+        due = self._real.next_due()
+        if due is not None:
+            delays.append(due - self._real.now)
+        if not self.paused:
+            due = self._game.next_due()
+            if due is not None:
+                delays.append(due - self._game.now)
+        return max(0, min(delays)) if delays else None
+
+    def __len__(self):
+        """等待中的定时器数量"""
+        return len(self._game) + len(self._real)
@@ -0,0 +1,350 @@
+"""
+分数数据库维护工具
+
+功能：
+- 归档：把早于指定天数的分数记录移到归档表（同一数据库）或单独的归档数据库文件，
+  排行榜前 keep_top 名的记录始终保留在 scores 表中
+- 汇总：归档时按月份和玩家累加局数、总分、最高分，归档文件移走后仍可查看历史概况
+- 空间回收：数据库切换为增量回收模式后，用 incremental_vacuum 逐步归还空闲页
+- 批量导出/导入：按 CSV 或 JSONL（由扩展名决定）流式读写，导入时按批 executemany，
+  每个文件一个事务，适合合并多台机器的分数
+
+玩家统计表由 scores 表上的插入触发器维护，导入的记录同样会计入统计；归档只移动原始记录，
+不改变已有的统计。
+
+用法：
+    python score_maintenance.py archive [--days 天数] [--to 归档数据库文件]
+    python score_maintenance.py vacuum [--pages 页数]
+    python score_maintenance.py export 文件.csv|文件.jsonl [--archive]
+    python score_maintenance.py import 文件... [--keep-duplicates]
+    python score_maintenance.py summary
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import sqlite3
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+from config import Config
+
+FIELDS = ('player_name', 'score', 'date')
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+ARCHIVE_TABLE = 'scores_archive'
+
+
+def open_db(path):
+    """
+    打开分数数据库（不存在时创建scores表）
+
+    使用自动提交模式，事务由 transaction() 显式控制，
+    避免sqlite3模块在DDL语句前隐式提交。
+    """
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute('''CREATE TABLE IF NOT EXISTS scores
+                 (player_name TEXT, score INTEGER, date TEXT)''')
+    # 归档按时间筛选，导入去重按时间查找，都依赖这个索引
+    conn.execute('CREATE INDEX IF NOT EXISTS scores_date ON scores (date)')
+    conn.execute('''CREATE TABLE IF NOT EXISTS score_rollups (
+                        month TEXT,
+                        player_name TEXT,
+                        games INTEGER NOT NULL DEFAULT 0,
+                        total INTEGER NOT NULL DEFAULT 0,
+                        best INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (month, player_name))''')
+    return conn
+
+
+def has_table(conn, name, schema='main'):
+    """数据库schema中是否存在表name"""
+    return conn.execute(f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?",
+                        (name,)).fetchone() is not None
+
+
+@contextmanager
+def transaction(conn):
+    conn.execute('BEGIN')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+
+def archive_scores(conn, days, keep_top, archive_file=None):
+    """
+    归档早于days天的记录
+
+    Args:
+        days: 保留最近多少天的记录
+        keep_top: 排行榜前多少名的记录不归档
+        archive_file: 归档数据库文件；为空时归档到同一数据库的 scores_archive 表
+    Returns:
+        int: 归档的记录数
+    """
+    cutoff = (datetime.now() - timedelta(days=days)).strftime(DATE_FORMAT)
+    if archive_file:
+        # ATTACH 不能在事务中执行
+        conn.execute('ATTACH DATABASE ? AS archive', (archive_file,))
+        table = 'archive.scores'
+    else:
+        table = f'main.{ARCHIVE_TABLE}'
+    try:
+        conn.execute(f'''CREATE TABLE IF NOT EXISTS {table}
+                     (player_name TEXT, score INTEGER, date TEXT)''')
+        _create_date_index(conn, table)
+        with transaction(conn):
+            conn.execute('''
+                CREATE TEMP TABLE moving AS
+                SELECT rowid AS id, player_name, score, date FROM scores
+                WHERE date < ? AND rowid NOT IN (
+                    SELECT rowid FROM scores ORDER BY score DESC LIMIT ?)
+            ''', (cutoff, keep_top))
+            count = conn.execute('SELECT COUNT(*) FROM moving').fetchone()[0]
+            conn.execute(f'INSERT INTO {table} SELECT player_name, score, date FROM moving')
+
+            # 按月汇总归档的记录并累加到 score_rollups
+            rollups = conn.execute('''
+                SELECT substr(date, 1, 7), player_name, COUNT(*), SUM(score), MAX(score)
+                FROM moving GROUP BY substr(date, 1, 7), player_name
+            ''').fetchall()
+            conn.executemany('INSERT OR IGNORE INTO score_rollups (month, player_name) VALUES (?, ?)',
+                             [(month, name) for month, name, *_ in rollups])
+            conn.executemany('''
+                UPDATE score_rollups SET games = games + ?, total = total + ?, best = MAX(best, ?)
+                WHERE month = ? AND player_name = ?
+            ''', [(games, total, best, month, name) for month, name, games, total, best in rollups])
+
+            conn.execute('DELETE FROM scores WHERE rowid IN (SELECT id FROM moving)')
+            conn.execute('DROP TABLE moving')
+    finally:
+        if archive_file:
+            conn.execute('DETACH DATABASE archive')
+    return count
+
+
+def _create_date_index(conn, table):
+    """给归档表建立按时间的索引，导入去重时也要在归档表中查找"""
+    schema, name = table.split('.')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS {schema}.{name}_date ON {name} (date)')
+
+
+def vacuum(conn, pages=0):
+    """
+    回收空闲页
+
+    数据库第一次整理时切换为增量回收模式，这需要执行一次完整的VACUUM；
+    之后每次只归还 pages 个空闲页（0表示全部），不重写整个文件。
+
+    Returns:
+        tuple: (整理前的空闲页数, 整理后的空闲页数)
+    """
+    before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+        print("首次整理：切换为增量回收模式并执行一次完整的VACUUM")
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+    elif pages > 0:
+        conn.execute(f'PRAGMA incremental_vacuum({int(pages)})').fetchall()
+    else:
+        conn.execute('PRAGMA incremental_vacuum').fetchall()
+    return before, conn.execute('PRAGMA freelist_count').fetchone()[0]
+
+
+def file_format(path):
+    """根据扩展名判断文件格式"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    raise ValueError(f"不支持的文件格式: {path}（只支持 .csv 和 .jsonl）")
+
+
+def export_scores(conn, path, batch_size, table='scores'):
+    """
+    流式导出记录，每次只从游标取出 batch_size 行
+
+    Returns:
+        int: 导出的记录数
+    """
+    fmt = file_format(path)
+    cursor = conn.execute(f'SELECT player_name, score, date FROM {table}')
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f) if fmt == 'csv' else None
+        if writer:
+            writer.writerow(FIELDS)
+        for rows in iter(lambda: cursor.fetchmany(batch_size), []):
+            if writer:
+                writer.writerows(rows)
+            else:
+                f.writelines(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + '\n'
+                             for row in rows)
+            count += len(rows)
+    return count
+
+
+def read_scores(path, errors):
+    """
+    逐行读取导入文件，生成 (玩家名, 分数, 时间)
+
+    格式不正确的行跳过，行号和原因追加到 errors。
+    """
+    fmt = file_format(path)
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            records = enumerate(csv.DictReader(f), 2)
+        else:
+            records = ((n, line) for n, line in enumerate(f, 1) if line.strip())
+        for line_number, record in records:
+            try:
+                if fmt == 'jsonl':
+                    record = json.loads(record)
+                name = str(record['player_name'])
+                score = int(record['score'])
+                date = str(record['date'])
+                datetime.strptime(date, DATE_FORMAT)
+            except (KeyError, TypeError, ValueError) as e:
+                errors.append((line_number, str(e)))
+                continue
+            yield name, score, date
+
+
+def batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_scores(conn, path, batch_size, skip_duplicates=True, archive_file=None):
+    """
+    导入一个文件，整个文件在一个事务中按批 executemany 插入
+
+    skip_duplicates 为True时跳过玩家名、分数、时间都相同的已有记录，
+    同一个文件被重复导入不会产生重复的分数。已归档的记录（scores_archive 表和
+    archive_file 归档数据库）同样算作已有记录：它们已经计入了玩家统计，再导入会被重复统计。
+
+    Returns:
+        tuple: (读取的有效记录数, 实际插入数, 格式错误的行列表)
+    """
+    attached = bool(skip_duplicates and archive_file and os.path.exists(archive_file))
+    if attached:
+        conn.execute('ATTACH DATABASE ? AS archive', (archive_file,))  # ATTACH 不能在事务中执行
+    try:
+        if skip_duplicates:
+            tables = ['main.scores']
+            if has_table(conn, ARCHIVE_TABLE):
+                tables.append(f'main.{ARCHIVE_TABLE}')
+            if attached and has_table(conn, 'scores', 'archive'):
+                tables.append('archive.scores')
+            for table in tables[1:]:
+                _create_date_index(conn, table)
+            conditions = ' AND '.join(
+                f'NOT EXISTS (SELECT 1 FROM {table} '
+                f'WHERE date = ?3 AND player_name = ?1 AND score = ?2)' for table in tables)
+            sql = f'INSERT INTO scores (player_name, score, date) SELECT ?1, ?2, ?3 WHERE {conditions}'
+        else:
+            sql = 'INSERT INTO scores (player_name, score, date) VALUES (?, ?, ?)'
+        errors = []
+        read = inserted = 0
+        with transaction(conn):
+            for batch in batched(read_scores(path, errors), batch_size):
+                # rowcount 不包含触发器对统计表的改动
+                inserted += conn.executemany(sql, batch).rowcount
+                read += len(batch)
+    finally:
+        if attached:
+            conn.execute('DETACH DATABASE archive')
+    return read, inserted, errors
+
+
+def print_summary(conn):
+    """打印当前记录数、归档记录数和按月汇总"""
+    live = conn.execute('SELECT COUNT(*), MIN(date), MAX(date) FROM scores').fetchone()
+    print(f"当前记录: {live[0]} 条（{live[1] or '-'} ~ {live[2] or '-'}）")
+    if has_table(conn, ARCHIVE_TABLE):
+        archived = conn.execute(f'SELECT COUNT(*) FROM {ARCHIVE_TABLE}').fetchone()[0]
+        print(f"归档表记录: {archived} 条")
+    rows = conn.execute('''
+        SELECT month, SUM(games), SUM(total), MAX(best) FROM score_rollups
+        GROUP BY month ORDER BY month
+    ''').fetchall()
+    if rows:
+        print("已归档记录的月度汇总:")
+        for month, games, total, best in rows:
+            print(f"  {month}: {games}局 平均{total / games:.1f} 最高{best}")
+    page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+    pages = conn.execute('PRAGMA page_count').fetchone()[0]
+    free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    print(f"数据库大小: {pages * page_size / 1024:.0f}KB，空闲页 {free} 个")
+
+
+def option(args, name, default=None, convert=str):
+    """取出 --name 值 形式的参数（同时从args中移除）"""
+    if name not in args:
+        return default
+    index = args.index(name)
+    value = convert(args[index + 1])
+    del args[index:index + 2]
+    return value
+
+
+def main():
+    Config.load()
+    settings = Config.MAINTENANCE
+    args = sys.argv[1:]
+    if not args or args[0] not in ('archive', 'vacuum', 'export', 'import', 'summary'):
+        print(__doc__)
+        return
+    command = args.pop(0)
+    conn = open_db(Config.DB_NAME)
+    start = time.perf_counter()
+    try:
+        if command == 'archive':
+            days = option(args, '--days', settings['archive_days'], int)
+            archive_file = option(args, '--to', settings['archive_file'])
+            count = archive_scores(conn, days, settings['keep_top'], archive_file)
+            print(f"已归档 {count} 条 {days} 天前的记录到 {archive_file or ARCHIVE_TABLE}")
+        elif command == 'vacuum':
+            pages = option(args, '--pages', settings['vacuum_pages'], int)
+            before, after = vacuum(conn, pages)
+            print(f"空闲页: {before} -> {after}")
+        elif command == 'export':
+            table = ARCHIVE_TABLE if '--archive' in args else 'scores'
+            paths = [arg for arg in args if arg != '--archive']
+            if not paths:
+                print("请指定导出文件")
+                return
+            count = export_scores(conn, paths[0], settings['batch_size'], table)
+            print(f"已导出 {count} 条记录到 {paths[0]}")
+        elif command == 'import':
+            skip_duplicates = '--keep-duplicates' not in args
+            for path in (arg for arg in args if arg != '--keep-duplicates'):
+                read, inserted, errors = import_scores(conn, path, settings['batch_size'],
+                                                       skip_duplicates, settings['archive_file'])
+                print(f"{path}: 读取 {read} 条，导入 {inserted} 条，跳过重复 {read - inserted} 条")
+                for line_number, reason in errors[:10]:
+                    print(f"  第{line_number}行格式错误: {reason}")
+                if len(errors) > 10:
+                    print(f"  ……共 {len(errors)} 行格式错误")
+        else:
+            print_summary(conn)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"{command} 失败: {str(e)}")
+    else:
+        print(f"耗时 {time.perf_counter() - start:.2f}s")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
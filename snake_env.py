@@ -0,0 +1,193 @@
+"""
+贪吃蛇训练环境
+
+功能：
+- 提供 Gym 风格的 reset() / step(action) 接口，供强化学习训练使用
+- 规则与游戏一致：穿墙、撞到自己结束、吃到食物加一分并变长
+- 观测为 (3, 高, 宽) 的 uint8 数组，三个平面分别是蛇身、蛇头和食物
+- 观测缓冲区预先分配并在每一步中增量更新（只改动变化的几个格子），不复制位置列表
+- 可选用游戏的精灵绘制RGB画面（render_mode='rgb_array'）
+
+注意：step() 返回的观测就是环境内部的缓冲区，下一步会被原地修改；
+需要保存历史观测时请自行 copy()。
+"""
+
+import random
+import itertools
+from collections import deque
+import numpy as np
+from config import Config
+from board import Board, DIRECTIONS
+
+# 观测平面
+BODY, HEAD, FOOD = 0, 1, 2
+
+
+class SnakeEnv:
+    """
+    贪吃蛇环境
+
+    动作为 0~3，依次对应 上、下、左、右（与 board.DIRECTIONS 相同）。
+    掉头的动作会被忽略，蛇保持原方向，与游戏中的方向输入处理一致。
+
+    奖励：吃到食物 +1，死亡 -1，其余 0。
+    """
+
+    action_count = len(DIRECTIONS)
+
+    def __init__(self, width=None, height=None, seed=None, max_steps=0, render_mode=None):
+        if Config.snapshot is None:
+            Config.load()
+        self.width = width or Config.GRID_WIDTH
+        self.height = height or Config.GRID_HEIGHT
+        self.max_steps = max_steps
+        self.render_mode = render_mode
+        self.rng = random.Random(seed)
+
+        self.board = Board(self.width, self.height)
+        self.positions = deque()
+        self.obs = np.zeros((3, self.height, self.width), dtype=np.uint8)
+        self.info = {'score': 0, 'length': 1, 'steps': 0}
+
+        self._frame = None
+        self._canvas = None
+        self._sprites = None
+
+    @property
+    def observation_shape(self):
+        return self.obs.shape
+
+    def reset(self, seed=None):
+        """开始新的一局，返回初始观测"""
+        if seed is not None:
+            self.rng.seed(seed)
+        self.board.clear()
+        self.obs.fill(0)
+
+        head = (self.width // 2, self.height // 2)
+        self.positions = deque([head])
+        self.board.occupy(head, 1)
+        self.obs[HEAD, head[1], head[0]] = 1
+        self.direction = self.rng.choice(DIRECTIONS)
+        self.length = 1
+        self.score = 0
+        self.steps = 0
+        self.done = False
+        self.food = None
+        self._place_food()
+        self._update_info()
+        return self.obs
+
+    def _place_food(self):
+        """与游戏中的Food一样，在整个棋盘上随机放置食物"""
+        if self.food is not None:
+            self.obs[FOOD, self.food[1], self.food[0]] = 0
+        self.food = (self.rng.randrange(self.width), self.rng.randrange(self.height))
+        self.obs[FOOD, self.food[1], self.food[0]] = 1
+
+    def _update_info(self):
+        info = self.info
+        info['score'] = self.score
+        info['length'] = len(self.positions)
+        info['steps'] = self.steps
+
+    def step(self, action):
+        """
+        执行一个动作
+
+        Returns:
+            tuple: (观测, 奖励, 是否结束, 信息字典)，观测和信息字典都会在下一步被复用
+        """
+        if self.done:
+            raise RuntimeError("这一局已经结束，请先调用reset()")
+        self.steps += 1
+
+        direction = DIRECTIONS[action]
+        if (direction[0] + self.direction[0], direction[1] + self.direction[1]) != (0, 0):
+            self.direction = direction
+
+        board = self.board
+        positions = self.positions
+        obs = self.obs
+        head = positions[0]
+        new = board.step(head, self.direction)
+
+        # 碰撞规则与 Board.resolve_moves（Game.move_snakes 每一刻的结算）相同
+        if not board.is_free(new) and new not in itertools.islice(positions, 2):
+            self.done = True
+            self._update_info()
+            return obs, -1.0, True, self.info
+
+        obs[HEAD, head[1], head[0]] = 0
+        if len(positions) >= self.length:
+            tail = positions.pop()
+            board.release(tail, 1)
+            obs[BODY, tail[1], tail[0]] = 0
+        if positions:
+            obs[BODY, head[1], head[0]] = 1
+        positions.appendleft(new)
+        board.occupy(new, 1)
+        obs[HEAD, new[1], new[0]] = 1
+
+        reward = 0.0
+        if new == self.food:
+            self.length += 1
+            self.score += 1
+            reward = 1.0
+            self._place_food()
+
+        if self.max_steps and self.steps >= self.max_steps:
+            self.done = True
+        self._update_info()
+        return obs, reward, self.done, self.info
+
+    # ---- RGB渲染 ----
+
+    def _init_renderer(self):
+        import pygame
+        from resource_creator import (create_background, create_snake_body,
+                                      create_food, create_snake_head)
+        # 只在内存表面上绘制，不需要初始化显示
+        cell = Config.GRID_SIZE
+        size = (self.width * cell, self.height * cell)
+
+        # 背景直接按棋盘大小生成
+        self._background = create_background(Config, size)
+
+        names = {Config.UP: 'up', Config.DOWN: 'down', Config.LEFT: 'left', Config.RIGHT: 'right'}
+        self._sprites = {
+            'heads': {d: create_snake_head(Config, name) for d, name in names.items()},
+            'body': create_snake_body(Config),
+            'food': create_food(Config),
+        }
+        self._canvas = pygame.Surface(size)
+        self._frame = np.empty((size[1], size[0], 3), dtype=np.uint8)
+
+    def render(self):
+        """
+        用游戏的精灵绘制当前画面
+
+        Returns:
+            numpy.ndarray: (高, 宽, 3) 的RGB数组；未开启 rgb_array 模式时返回None。
+            数组同样是复用的缓冲区。
+        """
+        if self.render_mode != 'rgb_array':
+            return None
+        import pygame
+        if self._canvas is None:
+            self._init_renderer()
+
+        cell = Config.GRID_SIZE
+        canvas = self._canvas
+        canvas.blit(self._background, (0, 0))
+        body = self._sprites['body']
+        for x, y in itertools.islice(self.positions, 1, None):
+            canvas.blit(body, (x * cell + 2, y * cell + 2))
+        x, y = self.positions[0]
+        canvas.blit(self._sprites['heads'][self.direction], (x * cell, y * cell))
+        canvas.blit(self._sprites['food'], (self.food[0] * cell, self.food[1] * cell))
+
+        pixels = pygame.surfarray.pixels3d(canvas)
+        np.copyto(self._frame, pixels.transpose(1, 0, 2))
+        del pixels  # 释放表面锁
+        return self._frame
@@ -0,0 +1,468 @@
+"""
+联机对战服务器
+
+功能：
+- 基于asyncio的权威服务器：所有玩家在同一张环形棋盘上，按固定频率推进游戏
+- 客户端通过TCP连接，协议为每行一个JSON消息
+- 每一刻统一取出所有玩家的输入，在共享占用表上同时结算碰撞，再广播状态
+- 广播内容每刻只编码一次，所有客户端共用同一份字节；跟不上的客户端会被断开
+- ServerConnection 是供游戏作为瘦客户端使用的连接类（阻塞socket+后台读线程）
+- 观战端口发送二进制增量数据流（格式见 spectator.py）
+
+协议：
+    客户端 -> 服务器
+        {"type": "join", "name": "玩家名"}
+        {"type": "dir", "dir": "up" | "down" | "left" | "right"}
+    服务器 -> 客户端
+        {"type": "welcome", "id": 编号, "width": 宽, "height": 高, "tick_rate": 频率}
+        {"type": "state", "tick": 刻, "food": [[x, y], ...],
+         "snakes": [{"id", "name", "dir", "score", "body": [[x, y], ...]}, ...]}
+        {"type": "error", "message": 说明}
+
+用法：python snake_server.py [--host 地址] [--port 端口] [--spectator-port 观战端口]
+"""
+
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import threading
+from collections import deque
+from config import Config
+from board import Board
+from spectator import DeltaRecorder, encode_keyframe
+
+
+def direction_names():
+    """方向名称与方向向量的对应关系（方向向量来自配置）"""
+    return {'up': Config.UP, 'down': Config.DOWN, 'left': Config.LEFT, 'right': Config.RIGHT}
+
+
+def encode_message(message):
+    """编码为一行紧凑的JSON字节"""
+    return (json.dumps(message, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+class Player:
+    """服务器上的一个玩家"""
+
+    def __init__(self, player_id, name, writer):
+        self.id = player_id
+        self.name = name
+        self.writer = writer
+        self.inputs = deque(maxlen=3)  # 两刻之间收到的方向输入
+        self.positions = deque()
+        self.direction = Config.RIGHT
+        self.length = 1
+        self.score = 0
+        self.alive = False
+        self.respawn_tick = 0
+
+    def next_direction(self):
+        """取出下一个有效的方向输入（跳过重复和掉头）"""
+        while self.inputs:
+            direction = self.inputs.popleft()
+            if direction == self.direction:
+                continue
+            if len(self.positions) > 1 and (direction[0] + self.direction[0],
+                                            direction[1] + self.direction[1]) == (0, 0):
+                continue
+            return direction
+        return self.direction
+
+
+class GameServer:
+    """
+    权威游戏服务器
+
+    棋盘占用表中的编号就是玩家编号，因此同时在线的玩家最多254人。
+    """
+
+    MAX_PLAYER_ID = Board.MAX_OWNER
+
+    def __init__(self, settings, seed=None):
+        self.settings = settings
+        self.width = settings['width'] or Config.GRID_WIDTH
+        self.height = settings['height'] or Config.GRID_HEIGHT
+        self.tick_rate = settings['tick_rate']
+        self.max_players = min(settings['max_players'], self.MAX_PLAYER_ID)
+        self.max_buffer = settings['max_buffer_kb'] * 1024
+        self.board = Board(self.width, self.height)
+        self.rng = random.Random(seed)
+        self.directions = direction_names()
+        self.direction_names = {v: k for k, v in self.directions.items()}
+
+        self.players = {}
+        self.free_ids = deque(range(1, self.max_players + 1))
+        self.food = set()
+        self.tick_count = 0
+        self.tick_times = deque(maxlen=200)  # 最近的结算耗时（秒），用于统计
+        self.running = False
+
+        # 观众：新加入的观众在下一次广播时先收到关键帧
+        self.deltas = DeltaRecorder()
+        self.spectators = []
+        self.new_spectators = []
+        self.keyframe_interval = settings['keyframe_interval']
+        self.fill_food()
+
+    # ---- 玩家管理 ----
+
+    def add_player(self, name, writer):
+        if not self.free_ids:
+            return None
+        player = Player(self.free_ids.popleft(), name, writer)
+        self.players[player.id] = player
+        self.spawn(player)
+        return player
+
+    def remove_player(self, player):
+        if self.players.pop(player.id, None) is None:
+            return
+        self.kill(player)
+        self.free_ids.append(player.id)
+
+    def random_free_cell(self):
+        """随机找一个没有蛇也没有食物的格子，棋盘太满时返回None"""
+        for _ in range(100):
+            pos = (self.rng.randrange(self.width), self.rng.randrange(self.height))
+            if self.board.is_free(pos) and pos not in self.food:
+                return pos
+        return None
+
+    def spawn(self, player):
+        pos = self.random_free_cell()
+        if pos is None:
+            player.respawn_tick = self.tick_count + 1  # 下一刻再试
+            return
+        player.positions = deque([pos])
+        player.direction = self.rng.choice(list(self.directions.values()))
+        player.inputs.clear()
+        player.length = 1
+        player.score = 0
+        player.alive = True
+        self.board.occupy(pos, player.id)
+        self.deltas.spawn(player.id, player.direction, self.board.index(pos))
+
+    def kill(self, player):
+        if player.alive:
+            self.deltas.death(player.id)
+        for pos in player.positions:
+            self.board.release(pos, player.id)
+        player.positions = deque()
+        player.alive = False
+        player.respawn_tick = self.tick_count + self.settings['respawn_ticks']
+
+    def fill_food(self):
+        while len(self.food) < self.settings['food_count']:
+            pos = self.random_free_cell()
+            if pos is None:
+                break
+            self.food.add(pos)
+            self.deltas.food_add(self.board.index(pos))
+
+    # ---- 游戏推进 ----
+
+    def tick(self):
+        """推进一刻：统一取输入、同时结算碰撞、吃食物、复活"""
+        self.tick_count += 1
+        board = self.board
+
+        moves = []
+        movers = []
+        for player in self.players.values():
+            if not player.alive:
+                if self.tick_count >= player.respawn_tick:
+                    self.spawn(player)
+                continue
+            player.direction = player.next_direction()
+            moves.append((player.id, board.step(player.positions[0], player.direction)))
+            movers.append(player)
+
+        dead = board.resolve_moves(moves)
+
+        for player, (_, target) in zip(movers, moves):
+            if player.id in dead:
+                self.kill(player)
+                continue
+            tail_removed = len(player.positions) >= player.length
+            if tail_removed:
+                board.release(player.positions.pop(), player.id)
+            player.positions.appendleft(target)
+            board.occupy(target, player.id)
+            ate = target in self.food
+            if ate:
+                self.food.discard(target)
+                self.deltas.food_remove(board.index(target))
+                player.length += 1
+                player.score += 1
+            self.deltas.move(player.id, player.direction, board.index(target), tail_removed, ate)
+        self.fill_food()
+
+    def state_message(self):
+        names = self.direction_names
+        return {
+            'type': 'state',
+            'tick': self.tick_count,
+            'food': [list(pos) for pos in self.food],
+            'snakes': [
+                {'id': p.id, 'name': p.name, 'dir': names[p.direction], 'score': p.score,
+                 'body': [list(pos) for pos in p.positions]}
+                for p in self.players.values() if p.alive
+            ],
+        }
+
+    def broadcast(self, data):
+        """把同一份编码好的字节发给所有玩家；发送缓冲积压过多的客户端直接断开"""
+        for player in list(self.players.values()):
+            transport = player.writer.transport
+            if transport.is_closing():
+                continue
+            if transport.get_write_buffer_size() > self.max_buffer:
+                print(f"玩家 {player.name} 网络太慢，已断开")
+                transport.close()
+                continue
+            player.writer.write(data)
+
+    def keyframe(self):
+        index = self.board.index
+        return encode_keyframe(
+            self.tick_count, self.width, self.height, (index(pos) for pos in self.food),
+            [(p.id, p.direction, p.score, [index(pos) for pos in p.positions])
+             for p in self.players.values() if p.alive])
+
+    def broadcast_spectators(self):
+        """
+        把这一刻的变化发给观众
+
+        增量帧和关键帧都只编码一次，同一份字节发给所有观众。
+        每隔 keyframe_interval 刻所有观众收到关键帧；新加入的观众先收到当前的关键帧。
+        """
+        if not self.spectators and not self.new_spectators:
+            self.deltas.clear()
+            return
+        periodic = self.keyframe_interval and self.tick_count % self.keyframe_interval == 0
+        keyframe = self.keyframe() if periodic or self.new_spectators else None
+        if periodic:
+            self.deltas.clear()
+            self.send_spectators(self.spectators, keyframe)
+        else:
+            self.send_spectators(self.spectators, self.deltas.encode_delta(self.tick_count))
+        if self.new_spectators:
+            self.send_spectators(self.new_spectators, keyframe)
+            self.spectators.extend(self.new_spectators)
+            self.new_spectators.clear()
+
+    def send_spectators(self, writers, data):
+        for writer in list(writers):
+            transport = writer.transport
+            if transport.is_closing() or transport.get_write_buffer_size() > self.max_buffer:
+                transport.close()
+                writers.remove(writer)
+                continue
+            writer.write(data)
+
+    # ---- 网络 ----
+
+    async def handle_client(self, reader, writer):
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        player = None
+        try:
+            line = await reader.readline()
+            try:
+                message = json.loads(line)
+                name = str(message.get('name') or 'Player')[:20]
+            except (ValueError, AttributeError):
+                name = 'Player'
+            player = self.add_player(name, writer)
+            if player is None:
+                writer.write(encode_message({'type': 'error', 'message': '服务器已满'}))
+                return
+            writer.write(encode_message({'type': 'welcome', 'id': player.id,
+                                         'width': self.width, 'height': self.height,
+                                         'tick_rate': self.tick_rate}))
+            print(f"玩家 {name} 加入（编号 {player.id}，在线 {len(self.players)}）")
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(message, dict) and message.get('type') == 'dir':
+                    direction = self.directions.get(message.get('dir'))
+                    if direction is not None:
+                        player.inputs.append(direction)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            if player is not None:
+                self.remove_player(player)
+                print(f"玩家 {player.name} 离开（在线 {len(self.players)}）")
+            writer.close()
+
+    async def handle_spectator(self, reader, writer):
+        """观众只接收数据；连接断开时从观众列表中移除"""
+        self.new_spectators.append(writer)
+        try:
+            while await reader.read(1024):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            for writers in (self.spectators, self.new_spectators):
+                if writer in writers:
+                    writers.remove(writer)
+            writer.close()
+
+    async def tick_loop(self):
+        """按固定频率推进游戏；结算超时时不补帧，直接从当前时间重新对齐"""
+        interval = 1.0 / self.tick_rate
+        # get_running_loop 从Python 3.7开始提供；3.6在协程中用get_event_loop得到的也是正在运行的循环
+        loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)()
+        next_time = loop.time()
+        report_time = next_time + 10
+        while self.running:
+            start = time.perf_counter()
+            self.tick()
+            self.broadcast(encode_message(self.state_message()))
+            self.broadcast_spectators()
+            self.tick_times.append(time.perf_counter() - start)
+
+            now = loop.time()
+            if now >= report_time:
+                self.report()
+                report_time = now + 10
+            next_time += interval
+            if next_time < now:
+                next_time = now
+            await asyncio.sleep(next_time - now)
+
+    def report(self):
+        """打印最近的每刻耗时"""
+        if not self.tick_times or not self.players:
+            return
+        times = sorted(self.tick_times)
+        mean = sum(times) / len(times) * 1000
+        p95 = times[int(len(times) * 0.95) - 1] * 1000
+        print(f"第{self.tick_count}刻: 在线 {len(self.players)}, "
+              f"每刻耗时 平均 {mean:.2f}ms, P95 {p95:.2f}ms")
+
+    def run(self, host, port, spectator_port):
+        """启动服务器并运行到被中断（兼容Python 3.6，不使用asyncio.run）"""
+        # 没有正在运行的循环时调用 get_event_loop 在新版本Python中已被弃用，显式创建事件循环
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        servers = [
+            loop.run_until_complete(asyncio.start_server(self.handle_client, host, port)),
+            loop.run_until_complete(asyncio.start_server(self.handle_spectator, host,
+                                                         spectator_port)),
+        ]
+        print(f"服务器已启动: {host}:{port}（观战端口 {spectator_port}），"
+              f"棋盘 {self.width}x{self.height}，每秒 {self.tick_rate} 刻")
+        self.running = True
+        try:
+            loop.run_until_complete(self.tick_loop())
+        finally:
+            self.running = False
+            for server in servers:
+                server.close()
+                loop.run_until_complete(server.wait_closed())
+            asyncio.set_event_loop(None)
+            loop.close()
+
+
+class ServerConnection:
+    """
+    瘦客户端连接
+
+    游戏主循环是同步的，因此用阻塞socket和一个后台线程接收状态，
+    主线程每帧读取 state 属性（总是最新的一刻）并渲染。
+    """
+
+    def __init__(self, host, port, name='Player'):
+        self.sock = socket.create_connection((host, port), timeout=5)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.settimeout(None)
+        self.file = self.sock.makefile('rb')
+        self.directions = direction_names()
+        self.names = {v: k for k, v in self.directions.items()}
+        self.send({'type': 'join', 'name': name})
+
+        welcome = json.loads(self.file.readline() or b'{}')
+        if welcome.get('type') != 'welcome':
+            self.sock.close()
+            raise ConnectionError(welcome.get('message', '服务器没有响应'))
+        self.player_id = welcome['id']
+        self.width = welcome['width']
+        self.height = welcome['height']
+        self.tick_rate = welcome['tick_rate']
+        self.state = None
+        self.connected = True
+        self.thread = threading.Thread(target=self._read_loop, daemon=True)
+        self.thread.start()
+
+    def _read_loop(self):
+        try:
+            for line in self.file:
+                message = json.loads(line)
+                if message.get('type') == 'state':
+                    self.state = message
+        except (OSError, ValueError):
+            pass
+        self.connected = False
+
+    def send(self, message):
+        try:
+            self.sock.sendall(encode_message(message))
+        except OSError:
+            self.connected = False
+
+    def send_direction(self, direction):
+        self.send({'type': 'dir', 'dir': self.names[direction]})
+
+    def own_snake(self):
+        """当前状态中自己的蛇，已死亡（等待复活）时返回None"""
+        state = self.state
+        if state:
+            for snake in state['snakes']:
+                if snake['id'] == self.player_id:
+                    return snake
+        return None
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def main():
+    Config.load()
+    settings = Config.SERVER
+    args = sys.argv[1:]
+    host, port = settings['host'], settings['port']
+    if '--host' in args:
+        host = args[args.index('--host') + 1]
+    if '--port' in args:
+        port = int(args[args.index('--port') + 1])
+    spectator_port = settings['spectator_port']
+    if '--spectator-port' in args:
+        spectator_port = int(args[args.index('--spectator-port') + 1])
+
+    server = GameServer(settings)
+    try:
+        server.run(host, port, spectator_port)
+    except KeyboardInterrupt:
+        print("服务器已停止")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 import pygame
 import numpy as np
 import os
+import queue
+import threading
 from scipy.io import wavfile  # 用于保存WAV文件
 
 def create_sine_wave(frequency, duration, volume=0.5, sample_rate=44100):
@@ -48,24 +50,112 @@ def create_death_sound():
     fade = np.linspace(1, 0, len(wave))
     return (stereo * fade[:, np.newaxis] * 32767 * 0.4).astype(np.int16)
 
+class ProceduralMusic:
+    """
+    程序化背景音乐合成器
+    
+    分段生成与create_background_music相同的旋律和节奏，
+    相位在段与段之间连续，因此可以无缝地一段接一段播放。
+    tempo为节奏速度倍数，每段开始时读取，可随时修改。
+    """
+    
+    NOTES = ((440, 1.0), (550, 0.5), (660, 0.3))  # A4, C#5, E5
+    RHYTHM_FREQUENCY = 2  # 每秒的节拍数（tempo为1时）
+    
+    def __init__(self, sample_rate=44100, channels=2):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.tempo = 1.0
+        self.sample_index = 0  # 旋律相位由累计的采样数决定
+        self.rhythm_phase = 0.0
+    
+    def render(self, frames):
+        """生成接下来frames个采样的int16音频"""
+        t = (self.sample_index + np.arange(frames)) / self.sample_rate
+        melody = np.zeros(frames)
+        for frequency, amplitude in self.NOTES:
+            melody += amplitude * np.sin(2 * np.pi * frequency * t)
+        self.sample_index += frames
+        
+        # 节奏相位逐采样累加，改变tempo时不会跳变
+        step = 2 * np.pi * self.RHYTHM_FREQUENCY * self.tempo / self.sample_rate
+        phase = self.rhythm_phase + step * np.arange(frames)
+        self.rhythm_phase = (self.rhythm_phase + step * frames) % (2 * np.pi)
+        rhythm = np.where(np.sin(phase) > 0, 1, 0.5)
+        
+        wave = (melody * rhythm * 32767 * 0.3).astype(np.int16)
+        return np.repeat(wave[:, np.newaxis], self.channels, axis=1)
+
 def create_background_music():
     """创建背景音乐（简单的循环音乐）"""
     duration = 4.0  # 4秒循环
     sample_rate = 44100
-    t = np.linspace(0, duration, int(sample_rate * duration))
+    return ProceduralMusic(sample_rate).render(int(sample_rate * duration))
+
+class MusicStream:
+    """
+    流式背景音乐
     
-    # 创建基础旋律
-    melody = np.sin(2 * np.pi * 440 * t)  # A4
-    melody += 0.5 * np.sin(2 * np.pi * 550 * t)  # C#5
-    melody += 0.3 * np.sin(2 * np.pi * 660 * t)  # E5
+    工作线程用ProceduralMusic按小段生成音频放入有界队列，
+    主线程每帧调用pump()把生成好的段交给混音通道的播放队列。
+    内存占用只与段长和队列长度有关，与播放时长无关。
+    """
     
-    # 添加简单的节奏变化
-    rhythm = np.sin(2 * np.pi * 2 * t)
-    rhythm = np.where(rhythm > 0, 1, 0.5)
+    def __init__(self, channel, chunk_ms=500, buffer_chunks=3):
+        sample_rate, _, channels = pygame.mixer.get_init()
+        self.channel = channel
+        self.synth = ProceduralMusic(sample_rate, channels)
+        self.chunk_frames = int(sample_rate * chunk_ms / 1000)
+        self.chunks = queue.Queue(maxsize=buffer_chunks)
+        self.playing = False
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._generate_loop, daemon=True)
+        self.thread.start()
     
-    wave = melody * rhythm
-    stereo = np.vstack((wave, wave)).T
-    return (stereo * 32767 * 0.3).astype(np.int16)
+    def set_tempo(self, tempo):
+        """设置节奏速度倍数，从下一段开始生效"""
+        self.synth.tempo = tempo
+    
+    def _generate_loop(self):
+        while not self.stopped.is_set():
+            chunk = self.synth.render(self.chunk_frames)
+            # 队列满时在这里等待，定期检查是否需要退出
+            while not self.stopped.is_set():
+                try:
+                    self.chunks.put(chunk, timeout=0.5)
+                    break
+                except queue.Full:
+                    pass
+    
+    def start(self):
+        self.playing = True
+        self.pump()
+    
+    def stop(self):
+        self.playing = False
+        self.channel.stop()
+    
+    def pump(self):
+        """把生成好的音频段补充到通道（在主线程中每帧调用）"""
+        if not self.playing:
+            return
+        # 通道正在播放一段、队列中还有一段时就足够了
+        while self.channel.get_queue() is None:
+            try:
+                chunk = self.chunks.get_nowait()
+            except queue.Empty:
+                return
+            sound = pygame.sndarray.make_sound(chunk)
+            if self.channel.get_busy():
+                self.channel.queue(sound)
+            else:
+                self.channel.play(sound)
+    
+    def close(self):
+        """停止播放并等待工作线程退出（关闭混音器之前调用）"""
+        self.stop()
+        self.stopped.set()
+        self.thread.join()
 
 def create_all_sounds(config):
     """创建所有游戏音效"""
@@ -105,6 +195,7 @@ def create_all_sounds(config):
 if __name__ == '__main__':
     # 测试音效生成
     pygame.init()
-    from config import Config  # 假设你有一个config.py文件
+    from config import Config
+    Config.load()
     create_all_sounds(Config)
     pygame.quit() 
\ No newline at end of file
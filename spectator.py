@@ -0,0 +1,308 @@
+"""
+观战数据流
+
+功能：
+- 服务器每一刻只把变化编码成紧凑的二进制增量（新蛇头、是否去掉蛇尾、食物变化、死亡、复活）
+- 每隔固定刻数发送一次关键帧（完整状态），新加入的观众也从关键帧开始
+- 每一刻只编码一次，同一份字节发给所有观众
+- SpectatorState 根据数据流重建棋盘，观战客户端用游戏的精灵绘制
+
+数据格式（小端）：
+    帧 = 长度(uint32) + 内容
+    关键帧: kind=1, tick(uint32), 宽, 高, 食物数, 蛇数(uint16)
+            食物格子下标(uint32)...
+            每条蛇: 编号(uint8), 方向(uint8), 分数(uint16), 长度(uint32), 格子下标(uint32, 从头到尾)...
+    增量帧: kind=2, tick(uint32), 操作数(uint32), 操作...
+            复活  OP_SPAWN  编号, 方向, 格子
+            移动  OP_MOVE   编号, 标志(低2位方向, 第2位去掉蛇尾, 第3位吃到食物), 新蛇头格子
+            死亡  OP_DEATH  编号
+            食物  OP_FOOD_ADD / OP_FOOD_REMOVE  格子
+
+用法：python spectator.py [--host 地址] [--port 端口]
+"""
+
+import sys
+import struct
+import socket
+import threading
+from collections import deque
+from config import Config
+from board import DIRECTIONS
+
+KEYFRAME, DELTA = 1, 2
+OP_SPAWN, OP_MOVE, OP_DEATH, OP_FOOD_ADD, OP_FOOD_REMOVE = range(1, 6)
+
+MOVE_TAIL = 0x4
+MOVE_ATE = 0x8
+
+FRAME_SIZE = struct.Struct('<I')
+KEYFRAME_HEADER = struct.Struct('<BIHHHH')
+DELTA_HEADER = struct.Struct('<BII')
+SNAKE_HEADER = struct.Struct('<BBHI')
+CELL = struct.Struct('<I')
+OP_STRUCTS = {
+    OP_SPAWN: struct.Struct('<BBI'),
+    OP_MOVE: struct.Struct('<BBI'),
+    OP_DEATH: struct.Struct('<B'),
+    OP_FOOD_ADD: CELL,
+    OP_FOOD_REMOVE: CELL,
+}
+OP_CODE = struct.Struct('<B')
+
+
+def frame(payload):
+    """加上长度前缀"""
+    return FRAME_SIZE.pack(len(payload)) + payload
+
+
+class DeltaRecorder:
+    """
+    服务器一侧的变化记录
+
+    服务器在每次状态变化时调用 spawn / move / death / food_add / food_remove，
+    广播时 encode_delta() 把这期间的所有操作按发生顺序编码为一帧并清空记录。
+    """
+
+    def __init__(self):
+        self.ops = []
+        self.direction_index = {d: i for i, d in enumerate(DIRECTIONS)}
+
+    def spawn(self, player_id, direction, cell):
+        self.ops.append(OP_CODE.pack(OP_SPAWN)
+                        + OP_STRUCTS[OP_SPAWN].pack(player_id, self.direction_index[direction], cell))
+
+    def move(self, player_id, direction, cell, tail_removed, ate):
+        flags = self.direction_index[direction]
+        if tail_removed:
+            flags |= MOVE_TAIL
+        if ate:
+            flags |= MOVE_ATE
+        self.ops.append(OP_CODE.pack(OP_MOVE) + OP_STRUCTS[OP_MOVE].pack(player_id, flags, cell))
+
+    def death(self, player_id):
+        self.ops.append(OP_CODE.pack(OP_DEATH) + OP_STRUCTS[OP_DEATH].pack(player_id))
+
+    def food_add(self, cell):
+        self.ops.append(OP_CODE.pack(OP_FOOD_ADD) + CELL.pack(cell))
+
+    def food_remove(self, cell):
+        self.ops.append(OP_CODE.pack(OP_FOOD_REMOVE) + CELL.pack(cell))
+
+    def encode_delta(self, tick):
+        payload = DELTA_HEADER.pack(DELTA, tick, len(self.ops)) + b''.join(self.ops)
+        self.ops.clear()
+        return frame(payload)
+
+    def clear(self):
+        self.ops.clear()
+
+
+def encode_keyframe(tick, width, height, food_cells, snakes):
+    """
+    编码完整状态
+
+    Args:
+        food_cells: 食物格子下标
+        snakes: [(编号, 方向向量, 分数, [格子下标, 从头到尾]), ...]
+    """
+    direction_index = {d: i for i, d in enumerate(DIRECTIONS)}
+    food_cells = list(food_cells)
+    parts = [KEYFRAME_HEADER.pack(KEYFRAME, tick, width, height, len(food_cells), len(snakes)),
+             struct.pack(f'<{len(food_cells)}I', *food_cells)]
+    for player_id, direction, score, cells in snakes:
+        parts.append(SNAKE_HEADER.pack(player_id, direction_index[direction],
+                                       min(score, 0xFFFF), len(cells)))
+        parts.append(struct.pack(f'<{len(cells)}I', *cells))
+    return frame(b''.join(parts))
+
+
+class SpectatorSnake:
+    def __init__(self, direction, cells, score=0):
+        self.direction = direction
+        self.cells = deque(cells)
+        self.score = score
+
+
+class SpectatorState:
+    """
+    观众一侧根据数据流重建的棋盘状态
+
+    收到第一个关键帧之前的增量帧会被忽略。apply() 与读取状态的绘制代码
+    可能在不同线程，调用方用 lock 保护。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ready = False
+        self.tick = 0
+        self.width = 0
+        self.height = 0
+        self.food = set()
+        self.snakes = {}
+        self.bytes_received = 0
+
+    def apply(self, payload):
+        self.bytes_received += len(payload) + FRAME_SIZE.size
+        kind = payload[0]
+        if kind == KEYFRAME:
+            self._apply_keyframe(payload)
+        elif kind == DELTA and self.ready:
+            self._apply_delta(payload)
+
+    def _apply_keyframe(self, payload):
+        _, self.tick, self.width, self.height, food_count, snake_count = \
+            KEYFRAME_HEADER.unpack_from(payload)
+        offset = KEYFRAME_HEADER.size
+        self.food = set(struct.unpack_from(f'<{food_count}I', payload, offset))
+        offset += 4 * food_count
+        self.snakes = {}
+        for _ in range(snake_count):
+            player_id, direction, score, length = SNAKE_HEADER.unpack_from(payload, offset)
+            offset += SNAKE_HEADER.size
+            cells = struct.unpack_from(f'<{length}I', payload, offset)
+            offset += 4 * length
+            self.snakes[player_id] = SpectatorSnake(DIRECTIONS[direction], cells, score)
+        self.ready = True
+
+    def _apply_delta(self, payload):
+        _, self.tick, count = DELTA_HEADER.unpack_from(payload)
+        offset = DELTA_HEADER.size
+        snakes = self.snakes
+        for _ in range(count):
+            op = payload[offset]
+            offset += 1
+            if op == OP_MOVE:
+                player_id, flags, cell = OP_STRUCTS[OP_MOVE].unpack_from(payload, offset)
+                snake = snakes.get(player_id)
+                if snake is not None:
+                    snake.direction = DIRECTIONS[flags & 0x3]
+                    if flags & MOVE_TAIL:
+                        snake.cells.pop()
+                    snake.cells.appendleft(cell)
+                    if flags & MOVE_ATE:
+                        snake.score += 1
+            elif op == OP_SPAWN:
+                player_id, direction, cell = OP_STRUCTS[OP_SPAWN].unpack_from(payload, offset)
+                snakes[player_id] = SpectatorSnake(DIRECTIONS[direction], (cell,))
+            elif op == OP_DEATH:
+                player_id, = OP_STRUCTS[OP_DEATH].unpack_from(payload, offset)
+                snakes.pop(player_id, None)
+            elif op == OP_FOOD_ADD:
+                self.food.add(CELL.unpack_from(payload, offset)[0])
+            elif op == OP_FOOD_REMOVE:
+                self.food.discard(CELL.unpack_from(payload, offset)[0])
+            else:
+                raise ValueError(f"未知的观战数据操作: {op}")
+            offset += OP_STRUCTS[op].size
+
+
+def read_frames(sock_file):
+    """从阻塞的socket文件对象中逐帧读出内容，连接断开时结束"""
+    while True:
+        header = sock_file.read(FRAME_SIZE.size)
+        if len(header) < FRAME_SIZE.size:
+            return
+        size, = FRAME_SIZE.unpack(header)
+        payload = sock_file.read(size)
+        if len(payload) < size:
+            return
+        yield payload
+
+
+class SpectatorView:
+    """用游戏的精灵绘制观战画面；棋盘比窗口大时缩小格子"""
+
+    def __init__(self, width, height):
+        import pygame
+        from resource_creator import create_background
+        from sprite_cache import build_sprite_set
+        self.pygame = pygame
+        self.cell = max(2, min(Config.GRID_SIZE, Config.WINDOW_WIDTH // width,
+                               Config.WINDOW_HEIGHT // height))
+        self.size = (width * self.cell, height * self.cell)
+        self.width = width
+
+        # 精灵与窗口缩放时使用的同一套生成方式；背景的网格间距与观战的格子大小一致
+        sprites = build_sprite_set(Config, self.cell)
+        self.body_offset = sprites.body_offset
+        self.body = sprites.body
+        self.food = sprites.food
+        self.heads = sprites.heads
+        self.background = create_background(Config, self.size, self.cell)
+
+    def draw(self, surface, state):
+        cell = self.cell
+        width = self.width
+        surface.blit(self.background, (0, 0))
+        blits = []
+        offset = self.body_offset
+        for snake in state.snakes.values():
+            cells = iter(snake.cells)
+            head = next(cells, None)
+            if head is None:
+                continue
+            for i in cells:
+                blits.append((self.body, ((i % width) * cell + offset, (i // width) * cell + offset)))
+            blits.append((self.heads[snake.direction], ((head % width) * cell, (head // width) * cell)))
+        for i in state.food:
+            blits.append((self.food, ((i % width) * cell, (i // width) * cell)))
+        surface.blits(blits, doreturn=False)
+
+
+def main():
+    import os
+    Config.load()
+    settings = Config.SERVER
+    args = sys.argv[1:]
+    host, port = settings['host'], settings['spectator_port']
+    if '--host' in args:
+        host = args[args.index('--host') + 1]
+    if '--port' in args:
+        port = int(args[args.index('--port') + 1])
+    if Config.HEADLESS_MODE:
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+
+    try:
+        sock = socket.create_connection((host, port), timeout=5)
+    except OSError as e:
+        print(f"连接观战服务失败: {str(e)}")
+        return
+    sock.settimeout(None)
+    state = SpectatorState()
+
+    def receive():
+        for payload in read_frames(sock.makefile('rb')):
+            with state.lock:
+                state.apply(payload)
+
+    thread = threading.Thread(target=receive, daemon=True)
+    thread.start()
+
+    import pygame
+    pygame.init()
+    clock = pygame.time.Clock()
+    screen = view = None
+    running = True
+    while running and thread.is_alive():
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN
+                                             and event.key == pygame.K_ESCAPE):
+                running = False
+        with state.lock:
+            if state.ready:
+                if view is None:
+                    view = SpectatorView(state.width, state.height)
+                    screen = pygame.display.set_mode(view.size)
+                    pygame.display.set_caption('贪吃蛇 - 观战')
+                view.draw(screen, state)
+        if screen is not None:
+            pygame.display.update()
+        clock.tick(settings['tick_rate'])
+    if not thread.is_alive():
+        print("观战连接已断开")
+    sock.close()
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+精灵缓存
+
+功能：
+- 按格子大小生成整套精灵（四个方向的蛇头、蛇身、食物），窗口缩放后直接使用对应大小的精灵，
+  绘制时不再逐个缩放
+- 最近使用的若干套精灵和背景按LRU保留，在几种窗口大小之间来回切换时不需要重新生成
+- 新的大小交给一个后台线程生成，生成完成之前游戏继续使用当前的精灵，缩放窗口不会卡住游戏循环
+- 同一个键在生成中或已缓存时不会重复排队，拖动窗口边框产生的一连串缩放事件只生成实际需要的大小
+
+缓存的键：
+    ('sprites', 格子大小)             -> SpriteSet
+    ('background', (宽, 高), 格子大小) -> 背景表面
+"""
+
+import queue
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import pygame
+
+from config import sprite_geometry
+from resource_creator import (create_background, create_snake_body,
+                              create_food, create_snake_head)
+
+MIN_CELL = 4  # 窗口缩得再小，格子也不小于这个像素数
+
+
+class SpriteSet(NamedTuple):
+    cell: int
+    heads: dict  # 方向 -> 蛇头图片
+    body: pygame.Surface
+    body_offset: int  # 蛇身在格子内的偏移（蛇身比格子小）
+    food: pygame.Surface
+
+
+def build_sprite_set(config, cell):
+    """
+    生成格子大小为cell的一套精灵
+
+    不小于配置格子大小时按cell的几何尺寸直接绘制，保持清晰；
+    更小的格子放不下眼睛和高光的固定尺寸，先按配置的格子大小绘制再平滑缩小。
+    """
+    names = {config.UP: 'up', config.DOWN: 'down', config.LEFT: 'left', config.RIGHT: 'right'}
+    if cell >= config.GRID_SIZE:
+        geometry = sprite_geometry(cell)
+        return SpriteSet(cell,
+                         {d: create_snake_head(config, name, geometry) for d, name in names.items()},
+                         create_snake_body(config, geometry), 2,
+                         create_food(config, geometry))
+
+    def scaled(surface, size):
+        return pygame.transform.smoothscale(surface, (size, size))
+
+    geometry = sprite_geometry(config.GRID_SIZE)
+    body_offset = round(2 * cell / config.GRID_SIZE)
+    return SpriteSet(cell,
+                     {d: scaled(create_snake_head(config, name, geometry), cell)
+                      for d, name in names.items()},
+                     scaled(create_snake_body(config, geometry), max(1, cell - 2 * body_offset)),
+                     body_offset,
+                     scaled(create_food(config, geometry), cell))
+
+
+class SpriteCache:
+    """
+    精灵和背景的LRU缓存，缺少的条目在后台线程中生成
+
+    capacity 是条目数（精灵和背景各算一条）。get/put 在游戏线程中调用，request 把缺少的键交给后台线程；
+    条目字典由锁保护，生成本身不持有锁。
+    """
+
+    def __init__(self, config, capacity):
+        self.config = config
+        self.capacity = max(1, capacity)
+        self._entries = OrderedDict()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._requests = queue.Queue()
+        self._thread = None
+
+    def get(self, key):
+        """取出缓存的条目并标记为最近使用，没有时返回None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def request(self, key):
+        """在后台生成key对应的条目（已缓存或正在生成时什么也不做）"""
+        with self._lock:
+            if key in self._entries or key in self._pending:
+                return
+            self._pending.add(key)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._work, daemon=True)
+            self._thread.start()
+        self._requests.put(key)
+
+    def _build(self, key):
+        if key[0] == 'sprites':
+            return build_sprite_set(self.config, key[1])
+        _, size, cell = key
+        return create_background(self.config, size, cell)
+
+    def _work(self):
+        while True:
+            key = self._requests.get()
+            try:
+                value = self._build(key)
+            except Exception as e:
+                print(f"生成精灵时出错: {str(e)}")
+                value = None
+            with self._lock:
+                self._pending.discard(key)
+                if value is not None:
+                    self._store(key, value)